@@ -5,6 +5,9 @@ from .models import (
     Temporada,
     Ubicacion,
     Inventario,
+    PuntoReorden,
+    SecuenciaCodigo,
+    ProductoLectura,
     TransferenciaInventario,
     Atributo,
     ValorAtributo
@@ -55,6 +58,31 @@ class InventarioAdmin(admin.ModelAdmin):
     search_fields = ('producto__nombre', 'ubicacion__nombre')
 
 
+# -------------------- PUNTO DE REORDEN --------------------
+@admin.register(PuntoReorden)
+class PuntoReordenAdmin(admin.ModelAdmin):
+    list_display = ('inventario', 'minimo', 'maximo', 'salida_diaria', 'recalculado')
+    list_editable = ('minimo', 'maximo')
+    list_filter = ('inventario__ubicacion',)
+    search_fields = ('inventario__producto__nombre', 'inventario__ubicacion__nombre')
+    list_select_related = ('inventario__producto', 'inventario__ubicacion')
+    readonly_fields = ('salida_diaria', 'recalculado')
+
+
+# -------------------- SECUENCIAS DE CÓDIGOS --------------------
+@admin.register(SecuenciaCodigo)
+class SecuenciaCodigoAdmin(admin.ModelAdmin):
+    list_display = ('clave', 'ultimo')
+    readonly_fields = ('clave', 'ultimo')
+
+
+@admin.register(ProductoLectura)
+class ProductoLecturaAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'actualizado')
+    search_fields = ('producto__nombre', 'producto__codigo_barras')
+    readonly_fields = ('producto', 'datos', 'actualizado')
+
+
 # -------------------- TRANSFERENCIA --------------------
 @admin.register(TransferenciaInventario)
 class TransferenciaAdmin(admin.ModelAdmin):
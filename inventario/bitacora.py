@@ -0,0 +1,195 @@
+from django.db import transaction
+from django.db.models import Max
+from . import cache_reportes, lectura
+from .models import Inventario, MovimientoInventario, SnapshotInventario
+
+
+# -----------------------------
+# Bitácora de inventario: snapshots + movimientos
+# -----------------------------
+# Reglas de la bitácora (las mismas que aplica services.aplicar_movimiento_inventario):
+#   entrada → destino += cantidad
+#   salida  → origen  -= cantidad
+#   ajuste  → destino  = cantidad
+# Los movimientos se reproducen en orden de id, que es el orden en que se registraron.
+
+
+def aplicar_a_saldos(saldos, tipo, cantidad, producto_id, origen_id, destino_id):
+    """Aplica un movimiento sobre el diccionario {(producto_id, ubicacion_id): cantidad}."""
+    if tipo == "entrada" and destino_id:
+        clave = (producto_id, destino_id)
+        saldos[clave] = saldos.get(clave, 0) + cantidad
+    elif tipo == "salida" and origen_id:
+        clave = (producto_id, origen_id)
+        saldos[clave] = saldos.get(clave, 0) - cantidad
+    elif tipo == "ajuste" and destino_id:
+        saldos[(producto_id, destino_id)] = cantidad
+
+
+def ultimo_corte(hasta_fecha=None):
+    """Devuelve el movimiento_hasta del último snapshot (opcionalmente tomado antes de una fecha)."""
+    qs = SnapshotInventario.objects.all()
+    if hasta_fecha is not None:
+        qs = qs.filter(fecha__lte=hasta_fecha)
+    return qs.aggregate(corte=Max("movimiento_hasta"))["corte"]
+
+
+def calcular_saldos(hasta_id=None, hasta_fecha=None, producto_id=None, ubicacion_id=None, chunk_size=5000):
+    """
+    Saldos según la bitácora: último snapshot + movimientos posteriores.
+    El costo es proporcional a los movimientos desde el snapshot, no al historial completo.
+    """
+    corte = ultimo_corte(hasta_fecha)
+
+    saldos = {}
+    if corte is not None:
+        snapshots = SnapshotInventario.objects.filter(movimiento_hasta=corte)
+        if producto_id:
+            snapshots = snapshots.filter(producto_id=producto_id)
+        if ubicacion_id:
+            snapshots = snapshots.filter(ubicacion_id=ubicacion_id)
+        for p_id, u_id, cantidad in snapshots.values_list("producto_id", "ubicacion_id", "cantidad"):
+            saldos[(p_id, u_id)] = cantidad
+
+    movimientos = MovimientoInventario.objects.order_by("id")
+    if corte is not None:
+        movimientos = movimientos.filter(id__gt=corte)
+    if hasta_id is not None:
+        movimientos = movimientos.filter(id__lte=hasta_id)
+    if hasta_fecha is not None:
+        movimientos = movimientos.filter(fecha__lte=hasta_fecha)
+    if producto_id:
+        movimientos = movimientos.filter(producto_id=producto_id)
+
+    filas = movimientos.values_list("tipo", "cantidad", "producto_id", "origen_id", "destino_id")
+    for fila in filas.iterator(chunk_size=chunk_size):
+        aplicar_a_saldos(saldos, *fila)
+
+    if ubicacion_id:
+        saldos = {clave: v for clave, v in saldos.items() if clave[1] == ubicacion_id}
+    return saldos
+
+
+def stock_a_fecha(producto, ubicacion, fecha):
+    """Stock de un producto en una ubicación tal como estaba en la fecha indicada."""
+    saldos = calcular_saldos(
+        hasta_fecha=fecha,
+        producto_id=getattr(producto, "pk", producto),
+        ubicacion_id=getattr(ubicacion, "pk", ubicacion),
+    )
+    return sum(saldos.values())
+
+
+def tomar_snapshot(desde_inventario=False):
+    """
+    Guarda un nuevo corte con el saldo de cada (producto, ubicación).
+    - desde_inventario=False: el saldo sale de la bitácora (snapshot anterior + movimientos).
+    - desde_inventario=True: se toma Inventario.cantidad_actual tal cual (útil para el primer corte
+      cuando el historial de movimientos está incompleto).
+    Devuelve el movimiento_hasta del corte creado.
+    """
+    with transaction.atomic():
+        hasta = MovimientoInventario.objects.aggregate(ultimo=Max("id"))["ultimo"] or 0
+        if ultimo_corte() == hasta and not desde_inventario:
+            return hasta
+
+        if desde_inventario:
+            saldos = {
+                (p_id, u_id): cantidad
+                for p_id, u_id, cantidad in Inventario.objects.values_list(
+                    "producto_id", "ubicacion_id", "cantidad_actual"
+                )
+            }
+            SnapshotInventario.objects.filter(movimiento_hasta=hasta).delete()
+        else:
+            saldos = calcular_saldos(hasta_id=hasta)
+
+        SnapshotInventario.objects.bulk_create(
+            [
+                SnapshotInventario(producto_id=p_id, ubicacion_id=u_id, cantidad=cantidad, movimiento_hasta=hasta)
+                for (p_id, u_id), cantidad in saldos.items()
+            ],
+            batch_size=1000,
+        )
+    return hasta
+
+
+def comparar_saldos(saldos, actuales):
+    """
+    (producto_id, ubicacion_id, esperado, actual) de cada par donde la bitácora (saldos) y
+    Inventario (actuales) no coinciden; actual es None si falta la fila.
+    """
+    diferencias = []
+    for clave in saldos.keys() | actuales.keys():
+        esperado = saldos.get(clave, 0)
+        actual = actuales.get(clave)
+        if actual is None and esperado == 0:
+            continue
+        if actual != esperado:
+            diferencias.append((clave[0], clave[1], esperado, actual))
+    return sorted(diferencias)
+
+
+def diferencias_inventario(producto_id=None):
+    """
+    Compara Inventario contra la bitácora.
+    Devuelve una lista de (producto_id, ubicacion_id, esperado, actual); actual es None si falta la fila.
+    """
+    saldos = calcular_saldos(producto_id=producto_id)
+
+    inventarios = Inventario.objects.all()
+    if producto_id:
+        inventarios = inventarios.filter(producto_id=producto_id)
+    actuales = {
+        (p_id, u_id): cantidad
+        for p_id, u_id, cantidad in inventarios.values_list("producto_id", "ubicacion_id", "cantidad_actual")
+    }
+    return comparar_saldos(saldos, actuales)
+
+
+def reconstruir_inventario(producto_id=None):
+    """
+    Corrige Inventario para que coincida con la bitácora. Devuelve las diferencias corregidas.
+    Las filas se bloquean antes de leer la bitácora: una venta que llega mientras tanto espera
+    a que termine la reconstrucción (y se aplica encima) en lugar de quedar sobrescrita por un
+    saldo leído antes de ella. Sin producto_id se bloquea todo el inventario.
+    """
+    with transaction.atomic():
+        inventarios = (
+            Inventario.objects.select_for_update()
+            .only("id", "producto_id", "ubicacion_id", "cantidad_actual")
+            .order_by("pk")
+        )
+        if producto_id:
+            inventarios = inventarios.filter(producto_id=producto_id)
+        existentes = {(inv.producto_id, inv.ubicacion_id): inv for inv in inventarios}
+
+        diferencias = comparar_saldos(
+            calcular_saldos(producto_id=producto_id),
+            {clave: inv.cantidad_actual for clave, inv in existentes.items()},
+        )
+        negativos = [d for d in diferencias if d[2] < 0]
+        if negativos:
+            p_id, u_id, esperado, _ = negativos[0]
+            raise ValueError(
+                f"La bitácora deja el producto {p_id} en la ubicación {u_id} con {esperado} piezas."
+            )
+
+        actualizar, crear = [], []
+        for p_id, u_id, esperado, _ in diferencias:
+            inv = existentes.get((p_id, u_id))
+            if inv is None:
+                crear.append(Inventario(producto_id=p_id, ubicacion_id=u_id, cantidad_actual=esperado))
+            else:
+                inv.cantidad_actual = esperado
+                actualizar.append(inv)
+
+        Inventario.objects.bulk_update(actualizar, ["cantidad_actual"], batch_size=1000)
+        Inventario.objects.bulk_create(crear, batch_size=1000)
+
+        # bulk_update/bulk_create no pasan por services.despues_de_registrar: el stock por
+        # ubicación de la lectura y los reportes cacheados se refrescan aquí
+        if diferencias:
+            lectura.programar_stock({d[0] for d in diferencias})
+            cache_reportes.invalidar()
+    return diferencias
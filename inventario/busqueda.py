@@ -0,0 +1,175 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Producto
+
+
+# -----------------------------
+# Búsqueda de productos
+# -----------------------------
+# Producto.texto_busqueda guarda nombre, descripción, código, categoría y temporadas
+# normalizados (sin acentos, en minúsculas). Encima de esa columna hay un índice:
+#   - SQLite: tabla virtual FTS5 inventario_producto_fts sincronizada con triggers
+#   - PostgreSQL: índice GIN con pg_trgm
+# En cualquier otra base se cae a icontains sobre la misma columna.
+
+TABLA_FTS = "inventario_producto_fts"
+
+SQL_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        texto_busqueda, content='inventario_producto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON inventario_producto BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, texto_busqueda) VALUES (new.id, new.texto_busqueda);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON inventario_producto BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto_busqueda) VALUES ('delete', old.id, old.texto_busqueda);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF texto_busqueda ON inventario_producto BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto_busqueda) VALUES ('delete', old.id, old.texto_busqueda);
+        INSERT INTO {TABLA_FTS}(rowid, texto_busqueda) VALUES (new.id, new.texto_busqueda);
+    END""",
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')",
+]
+
+SQL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """CREATE INDEX IF NOT EXISTS inventario_producto_busqueda_trgm
+        ON inventario_producto USING gin (texto_busqueda gin_trgm_ops)""",
+]
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con espacios simples."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto.lower()).strip()
+
+
+def componer_texto(nombre, descripcion, codigo, categorias=(), temporadas=()):
+    """Texto de búsqueda a partir de los datos sueltos (sirve antes de que exista el producto)."""
+    partes = [nombre, descripcion, codigo, *categorias, *temporadas]
+    return normalizar(" ".join(p for p in partes if p))
+
+
+def texto_para(producto):
+    """Texto de búsqueda de un producto (usa categoria__padre y temporada ya cargados si los hay)."""
+    categorias = []
+    if producto.categoria_id:
+        categorias.append(producto.categoria.nombre)
+        if producto.categoria.padre_id:
+            categorias.append(producto.categoria.padre.nombre)
+    return componer_texto(
+        producto.nombre, producto.descripcion, producto.codigo_barras,
+        categorias, [t.nombre for t in producto.temporada.all()],
+    )
+
+
+def actualizar_texto_busqueda(producto_ids):
+    """Recalcula texto_busqueda de los productos indicados con una lectura y un bulk_update."""
+    productos = list(
+        Producto.objects.filter(id__in=list(producto_ids))
+        .select_related("categoria__padre")
+        .prefetch_related("temporada")
+    )
+    cambiados = []
+    for producto in productos:
+        texto = texto_para(producto)
+        if texto != producto.texto_busqueda:
+            producto.texto_busqueda = texto
+            cambiados.append(producto)
+    Producto.objects.bulk_update(cambiados, ["texto_busqueda"], batch_size=500)
+    return len(cambiados)
+
+
+def instalar_indice(schema_editor):
+    """Crea el índice de búsqueda según la base (idempotente)."""
+    vendor = schema_editor.connection.vendor
+    sentencias = SQL_SQLITE if vendor == "sqlite" else SQL_POSTGRES if vendor == "postgresql" else []
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def desinstalar_indice(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sufijo in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS inventario_producto_busqueda_trgm")
+
+
+def _terminos(consulta):
+    return [t for t in re.split(r"[^\w]+", normalizar(consulta)) if t]
+
+
+def _match_fts(terminos):
+    # Cada término como prefijo entre comillas: "camis"* "roj"*
+    return " ".join('"{}"*'.format(t.replace('"', '""')) for t in terminos)
+
+
+def filtrar_por_texto(queryset, consulta, campo="id"):
+    """
+    Filtra cualquier queryset cuyo `campo` apunte a Producto.id (ej. 'producto_id' en Inventario)
+    por los productos que coinciden con la búsqueda, usando el índice disponible.
+    """
+    terminos = _terminos(consulta)
+    if not terminos:
+        return queryset
+
+    if connection.vendor == "sqlite":
+        return queryset.filter(**{
+            f"{campo}__in": RawSQL(
+                f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", (_match_fts(terminos),)
+            )
+        })
+
+    prefijo = "texto_busqueda" if campo == "id" else f"{campo.rsplit('_id', 1)[0]}__texto_busqueda"
+    for termino in terminos:
+        queryset = queryset.filter(**{f"{prefijo}__icontains": termino})
+    return queryset
+
+
+def buscar_productos(consulta, pagina=1, por_pagina=20):
+    """
+    Búsqueda paginada y ordenada por relevancia.
+    Devuelve (productos, hay_mas).
+    """
+    terminos = _terminos(consulta)
+    if not terminos:
+        return [], False
+
+    inicio = (pagina - 1) * por_pagina
+    base = Producto.objects.select_related("categoria__padre").prefetch_related("temporada")
+
+    if connection.vendor == "sqlite":
+        # bm25 sobre todas las coincidencias (no sobre una ventana de recientes): el orden es el
+        # mismo en todas las páginas y un producto viejo que coincide mejor sale primero.
+        # rowid desempata para que los empates no cambien de página.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s
+                    ORDER BY rank, rowid DESC LIMIT %s OFFSET %s""",
+                [_match_fts(terminos), por_pagina + 1, inicio],
+            )
+            ids = [fila[0] for fila in cursor.fetchall()]
+        hay_mas = len(ids) > por_pagina
+        ids = ids[:por_pagina]
+        por_id = base.in_bulk(ids)
+        return [por_id[i] for i in ids if i in por_id], hay_mas
+
+    qs = filtrar_por_texto(base, consulta)
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramSimilarity
+        qs = qs.annotate(relevancia=TrigramSimilarity("texto_busqueda", " ".join(terminos)))
+        qs = qs.order_by("-relevancia", "nombre")
+    else:
+        qs = qs.order_by("nombre")
+
+    productos = list(qs[inicio:inicio + por_pagina + 1])
+    return productos[:por_pagina], len(productos) > por_pagina
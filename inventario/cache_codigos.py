@@ -0,0 +1,114 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from barcode import EAN13, Code128
+from barcode.writer import ImageWriter, SVGWriter
+from django.conf import settings
+
+
+# -----------------------------
+# Caché de imágenes de códigos de barras
+# -----------------------------
+# La imagen de un (código, tipo, formato, opciones) nunca cambia, así que la clave es un hash de
+# esos datos (direccionada por contenido). Dos niveles:
+#   1) memoria: LRU por proceso
+#   2) disco: MEDIA_ROOT/etiquetas/<2 primeros>/<clave>.<png|svg>
+# Si cambia el código de un producto cambia la clave; invalidar() solo limpia la imagen vieja.
+
+MAX_EN_MEMORIA = getattr(settings, "INVENTARIO_CACHE_CODIGOS_MAX", 512)
+CARPETA = "etiquetas"
+
+CLASES = {
+    "ean13": EAN13,
+    "code128": Code128,
+}
+
+FORMATOS = {
+    "png": ("image/png", ImageWriter),
+    "svg": ("image/svg+xml", SVGWriter),
+}
+
+_memoria = OrderedDict()
+_candado = threading.Lock()
+
+
+def clase_para_tipo(tipo):
+    """Clase de python-barcode según Producto.tipo_codigo (Code128 para el resto)."""
+    return CLASES.get(tipo, Code128)
+
+
+def clave_imagen(codigo, tipo, formato="png", opciones=None):
+    datos = json.dumps([codigo, tipo, formato, opciones or {}], sort_keys=True)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+def version(codigo, tipo):
+    """Valor de ?v= en las URLs de la imagen: cambia si cambia el código o su simbología."""
+    return f"{tipo}-{codigo}"
+
+
+def _ruta(clave, formato="png"):
+    return os.path.join(settings.MEDIA_ROOT, CARPETA, clave[:2], f"{clave}.{formato}")
+
+
+def _recordar(clave, contenido):
+    with _candado:
+        _memoria[clave] = contenido
+        _memoria.move_to_end(clave)
+        while len(_memoria) > MAX_EN_MEMORIA:
+            _memoria.popitem(last=False)
+
+
+def renderizar(codigo, tipo, formato="png", opciones=None):
+    """Genera la imagen sin caché (PNG con Pillow o SVG vectorial)."""
+    buffer = io.BytesIO()
+    writer = FORMATOS[formato][1]()
+    clase_para_tipo(tipo)(codigo, writer=writer).write(buffer, options=opciones)
+    return buffer.getvalue()
+
+
+def obtener_imagen(codigo, tipo, formato="png", opciones=None):
+    """
+    Devuelve (bytes, clave). Busca en memoria, luego en disco y solo
+    si no está renderiza y guarda en ambos niveles.
+    """
+    clave = clave_imagen(codigo, tipo, formato, opciones)
+
+    with _candado:
+        contenido = _memoria.get(clave)
+        if contenido is not None:
+            _memoria.move_to_end(clave)
+            return contenido, clave
+
+    ruta = _ruta(clave, formato)
+    try:
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+    except FileNotFoundError:
+        contenido = renderizar(codigo, tipo, formato, opciones)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)  # escritura atómica: nadie lee un archivo a medias
+
+    _recordar(clave, contenido)
+    return contenido, clave
+
+
+def invalidar(codigo, tipo, opciones=None):
+    """Borra de ambos niveles las imágenes (todos los formatos) de un código que ya no se usa."""
+    if not codigo:
+        return
+    for formato in FORMATOS:
+        clave = clave_imagen(codigo, tipo, formato, opciones)
+        with _candado:
+            _memoria.pop(clave, None)
+        try:
+            os.remove(_ruta(clave, formato))
+        except FileNotFoundError:
+            pass
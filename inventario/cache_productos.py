@@ -0,0 +1,101 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import cache_reportes, lectura
+from .models import Producto
+
+
+# -----------------------------
+# Caché de productos por código de barras (escáner)
+# -----------------------------
+# buscar_producto_por_codigo se llama en cada escaneo de nuevo_producto.js. Los datos del
+# formulario (producto, subcategoría y su padre, atributos con su valor) salen del modelo
+# de lectura (inventario.lectura, un SELECT) y se guardan por código:
+#   - guardar/borrar un producto o uno de sus valores de atributo borra su entrada
+#   - cambiar atributos o categorías cambia la generación (como en cache_reportes) y deja
+#     viejas todas las entradas
+# Los códigos que no existen no se guardan: el siguiente escaneo vuelve a consultar.
+# Los borrados se hacen al confirmar la transacción para no guardar datos a medias.
+# Un borrado solo llega a los demás workers si la caché es compartida (settings.CACHES): con
+# una caché por proceso las entradas duran TIEMPO_LOCAL segundos y no una hora, para que un
+# precio editado en un worker no siga saliendo viejo en el escáner de otro.
+
+PREFIJO = "inventario:producto_codigo"
+CLAVE_GENERACION = f"{PREFIJO}:generacion"
+TIEMPO = getattr(settings, "INVENTARIO_CACHE_PRODUCTOS_SEGUNDOS", 3600)
+TIEMPO_LOCAL = getattr(settings, "INVENTARIO_CACHE_PRODUCTOS_SEGUNDOS_LOCAL", 5)
+
+
+def generacion():
+    actual = cache.get(CLAVE_GENERACION)
+    if actual is None:
+        cache.add(CLAVE_GENERACION, time.time_ns(), timeout=None)
+        actual = cache.get(CLAVE_GENERACION)
+    return actual
+
+
+def clave(codigo):
+    # Hash: el código puede traer espacios o caracteres que Memcached no acepta en una clave
+    return f"{PREFIJO}:{generacion()}:{hashlib.sha256(codigo.encode('utf-8')).hexdigest()}"
+
+
+def datos_producto(codigo):
+    """Datos para llenar el formulario de producto con ese código, o None si no existe."""
+    if not codigo:
+        return None
+    llave = clave(codigo)
+    datos = cache.get(llave)
+    if datos is None:
+        datos = consultar(codigo)
+        if datos is not None:
+            cache.set(llave, datos, TIEMPO if cache_reportes.compartida() else TIEMPO_LOCAL)
+    return datos
+
+
+def consultar(codigo):
+    """Arma la respuesta del escáner a partir del modelo de lectura (un SELECT)."""
+    datos = lectura.por_codigo(codigo)
+    if datos is None:
+        return None
+    return {
+        "existe": True,
+        "producto_id": datos["id"],
+        "nombre": datos["nombre"],
+        "descripcion": datos["descripcion"],
+        "precio_menudeo": datos["precio_menudeo"],
+        "precio_mayoreo": datos["precio_mayoreo"],
+        "precio_docena": datos["precio_docena"],
+        "tipo_codigo": datos["tipo_codigo"],
+        "dueño_id": datos["dueño_id"],
+        "categoria_padre_id": datos["categoria_padre_id"],
+        "categoria_padre_nombre": datos["categoria_padre"],
+        "subcategoria_id": datos["subcategoria_id"],
+        "subcategoria_nombre": datos["subcategoria"],
+        "atributos": datos["atributos"],
+    }
+
+
+def invalidar_codigos(*codigos):
+    """Borra las entradas de esos códigos al confirmar la transacción actual."""
+    codigos = [c for c in codigos if c]
+    if codigos:
+        transaction.on_commit(lambda: cache.delete_many([clave(c) for c in codigos]))
+
+
+def invalidar_producto(producto_id):
+    codigo = Producto.objects.filter(pk=producto_id).values_list("codigo_barras", flat=True).first()
+    invalidar_codigos(codigo)
+
+
+def invalidar_todo():
+    """Cambia la generación al confirmar la transacción actual."""
+    transaction.on_commit(_subir_generacion)
+
+
+def _subir_generacion():
+    # Hora en ns y no incr, como en cache_reportes: en DatabaseCache incr no es atómico
+    cache.set(CLAVE_GENERACION, time.time_ns(), timeout=None)
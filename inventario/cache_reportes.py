@@ -0,0 +1,114 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+# -----------------------------
+# Caché de resultados de reportes
+# -----------------------------
+# La clave es la generación actual + los filtros normalizados de reports.parse_filtros.
+# Cada movimiento cambia la generación (invalidar, una vez en services.despues_de_registrar),
+# así que las entradas anteriores dejan de leerse y expiran solas. Como cada venta sube la
+# generación, en horario de tienda la caché casi no acierta: sirve sobre todo fuera de horario
+# y para reportes que se consultan varias veces entre una venta y otra. La generación tiene que verla cada worker:
+# con una caché por proceso (LocMemCache) los reportes no se cachean y se calculan siempre.
+# La generación nueva es la hora en ns y no un incr: en DatabaseCache incr es leer + escribir
+# y dos invalidaciones al mismo tiempo dejarían la misma generación.
+
+PREFIJO = "inventario:reportes"
+CLAVE_GENERACION = f"{PREFIJO}:generacion"
+CLAVE_ACIERTOS = f"{PREFIJO}:aciertos"
+CLAVE_FALLOS = f"{PREFIJO}:fallos"
+
+TIEMPO = getattr(settings, "INVENTARIO_CACHE_REPORTES_SEGUNDOS", 300)
+# Resultados más grandes no se guardan (se recalculan): no vale la pena copiar miles de filas
+MAX_FILAS = getattr(settings, "INVENTARIO_CACHE_REPORTES_MAX_FILAS", 5000)
+
+# Backends que no se comparten entre procesos
+POR_PROCESO = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+_SIN_VALOR = object()
+
+
+def compartida():
+    """True si todos los workers ven la misma caché (base de datos, Redis, Memcached, archivos)."""
+    return settings.CACHES["default"]["BACKEND"] not in POR_PROCESO
+
+
+def generacion():
+    # Si la clave se perdió (reinicio, desalojo) se arranca desde la hora actual
+    # y no desde 1, para no volver a leer entradas de una generación vieja
+    actual = cache.get(CLAVE_GENERACION)
+    if actual is None:
+        cache.add(CLAVE_GENERACION, time.time_ns(), timeout=None)
+        actual = cache.get(CLAVE_GENERACION)
+    return actual
+
+
+def invalidar():
+    """Sube la generación al confirmar la transacción actual (o de inmediato si no hay)."""
+    transaction.on_commit(_subir_generacion)
+
+
+def _subir_generacion():
+    cache.set(CLAVE_GENERACION, time.time_ns(), timeout=None)
+
+
+def clave_filtros(filtros):
+    """Hash de los filtros sin valores vacíos: {'a': 1, 'b': None} y {'a': 1} son la misma consulta."""
+    normalizados = {k: v for k, v in filtros.items() if v not in (None, "")}
+    datos = json.dumps(normalizados, sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+def obtener(nombre, filtros, calcular):
+    """
+    Devuelve el resultado cacheado de `nombre` para esos filtros o lo calcula con calcular().
+    Los querysets se convierten en lista antes de guardarse. Sin caché compartida solo calcula.
+    """
+    if not compartida():
+        return calcular()
+
+    clave = f"{PREFIJO}:{generacion()}:{nombre}:{clave_filtros(filtros)}"
+    valor = cache.get(clave, _SIN_VALOR)
+    if valor is not _SIN_VALOR:
+        _contar(CLAVE_ACIERTOS)
+        return valor
+
+    _contar(CLAVE_FALLOS)
+    valor = calcular()
+    if hasattr(valor, "__iter__") and not isinstance(valor, (str, dict)):
+        valor = list(valor)
+        if len(valor) > MAX_FILAS:
+            return valor
+    cache.set(clave, valor, TIEMPO)
+    return valor
+
+
+def _contar(clave):
+    # incr primero: la clave casi siempre existe y en DatabaseCache cada llamada es una consulta
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 1, timeout=None)
+
+
+def estadisticas():
+    aciertos = cache.get(CLAVE_ACIERTOS, 0)
+    fallos = cache.get(CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+    return {
+        "aciertos": aciertos,
+        "fallos": fallos,
+        "tasa_aciertos": round(aciertos / total, 3) if total else None,
+        "generacion": generacion(),
+        "backend": settings.CACHES["default"]["BACKEND"],
+        "compartida": compartida(),
+    }
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import Producto, SecuenciaCodigo
+
+
+# -----------------------------
+# Asignación de códigos de barras
+# -----------------------------
+# Cada tamaño de etiqueta tiene su propia secuencia (SecuenciaCodigo) y un prefijo fijo, así
+# que dos productos nunca reciben el mismo código y no hay que consultar Producto para
+# comprobarlo. Reservar N códigos es un solo UPDATE ultimo = ultimo + N dentro de una
+# transacción (la fila queda bloqueada hasta el commit). Los EAN-13 usan un prefijo GS1 de
+# circulación restringida (PREFIJO_EAN) y llevan su dígito de control calculado aquí.
+#
+# Riesgo del prefijo: GS1 reserva 20-29 para uso dentro de la tienda y muchas básculas
+# imprimen ahí sus etiquetas de peso o medida variable (el código lleva el precio o el peso).
+# Si el punto de venta interpreta ese prefijo como artículo pesado, leerá mal nuestros códigos.
+# Hay que elegir un prefijo que no usen las básculas de la tienda. Cambiarlo con productos ya
+# etiquetados no cambia sus códigos; la secuencia sigue en su último número.
+PREFIJO_EAN = getattr(settings, "INVENTARIO_PREFIJO_EAN", "29")
+
+# tamaño de etiqueta → (tipo_codigo, prefijo, dígitos del consecutivo)
+SIMBOLOGIAS = {
+    "chica": ("code128", "C", 8),
+    "mediana": ("code128", "M", 9),
+    "grande": ("ean13", PREFIJO_EAN, 12 - len(PREFIJO_EAN)),  # prefijo + consecutivo + dígito de control = 13
+}
+
+
+def digito_control_gs1(digitos):
+    """Dígito de control GS1 (EAN-8, EAN-13, UPC-A) de una cadena de dígitos sin el control."""
+    suma = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digitos)))
+    return str(-suma % 10)
+
+
+def formatear(tamaño, numero):
+    """Código del consecutivo `numero` en la secuencia de `tamaño`."""
+    tipo, prefijo, largo = SIMBOLOGIAS[tamaño]
+    codigo = f"{prefijo}{numero:0{largo}d}"
+    if tipo == "ean13":
+        codigo += digito_control_gs1(codigo)
+    return codigo
+
+
+def reservar_codigos(tamaño, cantidad=1):
+    """
+    Reserva `cantidad` códigos consecutivos para etiquetas de `tamaño` en una sola transacción.
+    Devuelve (tipo_codigo, [códigos]). Los códigos reservados no se vuelven a entregar aunque
+    no lleguen a guardarse en un producto.
+    """
+    if tamaño not in SIMBOLOGIAS:
+        raise ValueError(f"Tamaño de etiqueta desconocido: {tamaño}")
+    tipo, _, largo = SIMBOLOGIAS[tamaño]
+    if cantidad < 1:
+        return tipo, []
+
+    clave = _clave(tamaño)
+    with transaction.atomic():
+        secuencia = SecuenciaCodigo.objects.filter(clave=clave)
+        if not secuencia.update(ultimo=F("ultimo") + cantidad):
+            _crear_secuencia(tamaño)
+            secuencia.update(ultimo=F("ultimo") + cantidad)
+        ultimo = secuencia.values_list("ultimo", flat=True).get()
+        if ultimo >= 10 ** largo:
+            raise ValueError(f"Se agotaron los códigos de la secuencia {clave}")
+
+    return tipo, [formatear(tamaño, n) for n in range(ultimo - cantidad + 1, ultimo + 1)]
+
+
+def siguiente_codigo(tamaño):
+    """(código, tipo_codigo) de un solo producto."""
+    tipo, (codigo,) = reservar_codigos(tamaño)
+    return codigo, tipo
+
+
+def apartar_existentes(usados):
+    """
+    Adelanta las secuencias más allá de los códigos `usados` que tengan su formato (capturados
+    a mano o importados), para que nunca se vuelvan a entregar. Llamar antes de guardarlos.
+    """
+    for tamaño in SIMBOLOGIAS:
+        numeros = [n for n in (_consecutivo(tamaño, codigo) for codigo in usados) if n is not None]
+        if numeros:
+            with transaction.atomic():
+                _crear_secuencia(tamaño)
+                SecuenciaCodigo.objects.filter(clave=_clave(tamaño), ultimo__lt=max(numeros)).update(ultimo=max(numeros))
+
+
+def _clave(tamaño):
+    return f"{SIMBOLOGIAS[tamaño][0]}-{tamaño}"
+
+
+def _consecutivo(tamaño, codigo):
+    """Consecutivo de `codigo` si tiene el formato de la secuencia de `tamaño`; si no, None."""
+    tipo, prefijo, largo = SIMBOLOGIAS[tamaño]
+    numero = codigo[len(prefijo):]
+    if codigo.startswith(prefijo) and numero.isdigit() and len(numero) == largo + (tipo == "ean13"):
+        return int(numero[:largo])
+    return None
+
+
+def _crear_secuencia(tamaño):
+    clave = _clave(tamaño)
+    if not SecuenciaCodigo.objects.filter(clave=clave).exists():
+        SecuenciaCodigo.objects.get_or_create(clave=clave, defaults={"ultimo": _ultimo_existente(tamaño)})
+
+
+def _ultimo_existente(tamaño):
+    """
+    Consecutivo más alto ya usado con el formato de `tamaño` (capturado a mano o importado):
+    la secuencia nueva arranca después de él.
+    """
+    tipo, prefijo, largo = SIMBOLOGIAS[tamaño]
+    control = r"\d" if tipo == "ean13" else ""
+    mayor = (
+        Producto.objects
+        .filter(codigo_barras__regex=rf"^{prefijo}\d{{{largo}}}{control}$")
+        .aggregate(mayor=Max("codigo_barras"))["mayor"]
+    )
+    return int(mayor[len(prefijo):len(prefijo) + largo]) if mayor else 0
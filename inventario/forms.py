@@ -2,6 +2,8 @@ from django import forms
 
 from tienda.models import Empleado
 from .models import Categoria, TransferenciaInventario, Producto, Categoria, Ubicacion
+from .importacion import EXTENSIONES
+from .services import ETIQUETAS
 
 
 class CategoriaForm(forms.ModelForm):
@@ -165,3 +167,37 @@ class ProductoForm(forms.ModelForm):
         # Temporada es opcional → no validamos nada aquí
         return cleaned_data
 
+
+
+
+#Formulario para importar productos desde un archivo CSV o XLSX (inventario.importacion)
+class ImportarProductosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo (.csv o .xlsx)",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    ubicacion = forms.ModelChoiceField(
+        queryset=Ubicacion.objects.all(),
+        required=False,
+        label="Ubicación de la cantidad inicial",
+        help_text="Se usa en las filas que no indican ubicación",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    etiqueta = forms.ChoiceField(
+        label="Etiqueta para productos sin código",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    simular = forms.BooleanField(
+        required=False,
+        label="Solo validar (no guardar)"
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['etiqueta'].choices = [(e['tipo'], f"{e['nombre']} ({e['tamaño']})") for e in ETIQUETAS]
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(EXTENSIONES):
+            raise forms.ValidationError("El archivo debe ser .csv o .xlsx.")
+        return archivo
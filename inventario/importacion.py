@@ -0,0 +1,384 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from openpyxl import load_workbook
+
+from . import cache_reportes, codigos, lectura, rotacion
+from .busqueda import componer_texto, normalizar
+from .models import (
+    Atributo, Categoria, Empleado, Inventario, MovimientoInventario, Producto, Temporada, Ubicacion, ValorAtributo,
+)
+from .services import despues_de_registrar, detectar_tipo_codigo
+
+
+# -----------------------------
+# Importación masiva de productos (CSV / XLSX)
+# -----------------------------
+# El archivo se lee fila por fila y se procesa en lotes de LOTE filas:
+#   1) categorías, temporadas, dueños, ubicaciones y atributos se resuelven con diccionarios
+#      cargados una sola vez (una consulta por tabla para todo el archivo)
+#   2) cada fila se valida en memoria con las mismas reglas que nuevo_producto
+#   3) los códigos repetidos se buscan con una consulta por lote; los que faltan se reservan
+#      de golpe en inventario.codigos
+#   4) productos, temporadas, valores de atributo, inventario y movimientos iniciales se
+#      insertan con bulk_create en una transacción por lote
+# Las filas con errores se reportan con su número y no detienen el resto del archivo.
+#
+# Encabezados reconocidos (sin importar mayúsculas ni acentos): nombre, descripcion,
+# precio_menudeo, precio_mayoreo, precio_docena, categoria, subcategoria, dueño (usuario),
+# temporadas (separadas por ";"), codigo_barras, tipo_codigo, cantidad, ubicacion.
+# Cualquier otra columna es un atributo de la subcategoría con ese nombre.
+
+LOTE = 1000
+EXTENSIONES = (".csv", ".xlsx")
+
+# encabezado normalizado → campo
+COLUMNAS = {
+    "nombre": "nombre",
+    "descripcion": "descripcion",
+    "precio menudeo": "precio_menudeo",
+    "precio mayoreo": "precio_mayoreo",
+    "precio docena": "precio_docena",
+    "categoria": "categoria",
+    "subcategoria": "subcategoria",
+    "dueno": "dueño",
+    "temporada": "temporadas",
+    "temporadas": "temporadas",
+    "codigo barras": "codigo_barras",
+    "codigo de barras": "codigo_barras",
+    "tipo codigo": "tipo_codigo",
+    "cantidad": "cantidad",
+    "cantidad inicial": "cantidad",
+    "ubicacion": "ubicacion",
+}
+TIPOS_CODIGO = {valor for valor, _ in Producto._meta.get_field("tipo_codigo").choices}
+
+
+# -----------------------------
+# Lectura del archivo
+# -----------------------------
+def leer_filas(archivo, nombre):
+    """
+    Iterador de (número de fila, {campo: texto}) de un archivo binario CSV o XLSX.
+    La fila 1 es el encabezado; las filas vacías se saltan.
+    """
+    extension = Path(nombre).suffix.lower()
+    if extension == ".csv":
+        return _filas_csv(archivo)
+    if extension == ".xlsx":
+        return _filas_xlsx(archivo)
+    raise ValidationError(f"Formato no soportado: usa un archivo {' o '.join(EXTENSIONES)}.")
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    muestra = texto.read(8192)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    yield from _con_encabezado(csv.reader(texto, dialecto))
+
+
+def _filas_xlsx(archivo):
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from _con_encabezado(libro.active.iter_rows(values_only=True))
+    finally:
+        libro.close()
+
+
+def _con_encabezado(filas):
+    encabezado = None
+    for numero, valores in enumerate(filas, start=1):
+        valores = [_celda(v) for v in valores]
+        if encabezado is None:
+            encabezado = [_columna(v) for v in valores]
+            continue
+        if any(valores):
+            yield numero, {c: v for c, v in zip(encabezado, valores) if c and v}
+
+
+def _columna(titulo):
+    clave = normalizar(titulo.replace("_", " "))
+    return COLUMNAS.get(clave, clave)
+
+
+def _celda(valor):
+    # Excel guarda códigos y cantidades como números: 7501234567890.0 → "7501234567890"
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+# -----------------------------
+# Catálogo y validación
+# -----------------------------
+def cargar_catalogo():
+    """Todo lo que una fila puede nombrar, indexado por nombre normalizado (una consulta por tabla)."""
+    catalogo = {
+        "subcategorias": {},
+        "padres": set(),
+        "temporadas": {},
+        "dueños": {},
+        "ubicaciones": {},
+        "atributos": {},
+    }
+    for id, nombre, padre_nombre in Categoria.objects.values_list("id", "nombre", "padre__nombre"):
+        if padre_nombre is None:
+            catalogo["padres"].add(normalizar(nombre))
+        else:
+            catalogo["subcategorias"][normalizar(nombre)] = (id, nombre, padre_nombre)
+    for id, nombre in Temporada.objects.values_list("id", "nombre"):
+        catalogo["temporadas"][normalizar(nombre)] = (id, nombre)
+    for id, usuario in Empleado.objects.filter(rol="dueño").values_list("id", "user__username"):
+        catalogo["dueños"][normalizar(usuario)] = id
+    for id, nombre in Ubicacion.objects.values_list("id", "nombre"):
+        catalogo["ubicaciones"][normalizar(nombre)] = id
+    for id, nombre, categoria_id in Atributo.objects.values_list("id", "nombre", "categoria_id"):
+        catalogo["atributos"].setdefault(categoria_id, {})[normalizar(nombre)] = (id, nombre)
+    return catalogo
+
+
+def _precio(fila, campo, errores):
+    texto = fila.get(campo, "0").replace("$", "").replace(",", "")
+    try:
+        precio = Decimal(texto).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        precio = None
+    if precio is None or not precio.is_finite():
+        errores.append(f"{campo}: '{fila[campo]}' no es un precio válido")
+        return Decimal(0)
+    if precio < 0 or precio >= 10 ** 8:
+        errores.append(f"{campo}: fuera de rango")
+    return precio
+
+
+def validar_fila(fila, catalogo, ubicacion_id=None):
+    """
+    Datos listos para insertar de una fila o ValidationError con todos sus problemas.
+    Aplica las reglas de Producto.clean y de nuevo_producto (atributos obligatorios).
+    """
+    errores = []
+
+    nombre = fila.get("nombre", "")
+    descripcion = fila.get("descripcion", "")
+    if not nombre:
+        errores.append("Falta el nombre")
+    elif len(nombre) > Producto._meta.get_field("nombre").max_length:
+        errores.append("El nombre es demasiado largo")
+    if not descripcion:
+        errores.append("Falta la descripción")
+
+    menudeo = _precio(fila, "precio_menudeo", errores)
+    mayoreo = _precio(fila, "precio_mayoreo", errores)
+    docena = _precio(fila, "precio_docena", errores)
+    if mayoreo > menudeo:
+        errores.append("El precio de mayoreo no puede ser mayor que el precio de menudeo")
+    if docena > mayoreo:
+        errores.append("El precio por docena no puede ser mayor que el precio de mayoreo")
+
+    subcategoria = catalogo["subcategorias"].get(normalizar(fila.get("subcategoria", "")))
+    if not fila.get("subcategoria"):
+        errores.append("Falta la subcategoría")
+    elif subcategoria is None:
+        if normalizar(fila["subcategoria"]) in catalogo["padres"]:
+            errores.append(f"'{fila['subcategoria']}' es una categoría padre, no una subcategoría")
+        else:
+            errores.append(f"No existe la subcategoría '{fila['subcategoria']}'")
+    elif fila.get("categoria") and normalizar(fila["categoria"]) != normalizar(subcategoria[2]):
+        errores.append(f"La subcategoría '{subcategoria[1]}' no pertenece a '{fila['categoria']}'")
+
+    dueño_id = catalogo["dueños"].get(normalizar(fila.get("dueño", "")))
+    if dueño_id is None:
+        errores.append(f"No existe el dueño '{fila['dueño']}'" if fila.get("dueño") else "Falta el dueño")
+
+    temporadas = []
+    for nombre_temporada in filter(None, (t.strip() for t in fila.get("temporadas", "").split(";"))):
+        temporada = catalogo["temporadas"].get(normalizar(nombre_temporada))
+        if temporada is None:
+            errores.append(f"No existe la temporada '{nombre_temporada}'")
+        else:
+            temporadas.append(temporada)
+
+    codigo = fila.get("codigo_barras", "")
+    tipo_codigo = fila.get("tipo_codigo", "").lower() or (detectar_tipo_codigo(codigo) if codigo else None)
+    if len(codigo) > Producto._meta.get_field("codigo_barras").max_length:
+        errores.append("El código de barras es demasiado largo")
+    if tipo_codigo and tipo_codigo not in TIPOS_CODIGO:
+        errores.append(f"Tipo de código desconocido: '{tipo_codigo}'")
+    elif codigo and tipo_codigo == "ean13" and not (
+        len(codigo) == 13 and codigo.isdigit() and codigos.digito_control_gs1(codigo[:12]) == codigo[12]
+    ):
+        errores.append(f"El código EAN-13 '{codigo}' no es válido (dígito de control)")
+
+    try:
+        cantidad = int(fila.get("cantidad", "0"))
+        if cantidad < 0:
+            raise ValueError
+    except ValueError:
+        errores.append(f"cantidad: '{fila['cantidad']}' no es un número entero válido")
+        cantidad = 0
+    if fila.get("ubicacion"):
+        ubicacion_id = catalogo["ubicaciones"].get(normalizar(fila["ubicacion"]))
+        if ubicacion_id is None:
+            errores.append(f"No existe la ubicación '{fila['ubicacion']}'")
+    elif cantidad and not ubicacion_id:
+        errores.append("Falta la ubicación para la cantidad inicial")
+
+    # Atributos: columnas que no son campos; todos los de la subcategoría son obligatorios
+    valores = []
+    if subcategoria is not None:
+        atributos = catalogo["atributos"].get(subcategoria[0], {})
+        faltantes = []
+        for clave, (atributo_id, nombre_atributo) in atributos.items():
+            valor = fila.get(clave, "")
+            if valor:
+                valores.append((atributo_id, valor[:ValorAtributo._meta.get_field("valor").max_length]))
+            else:
+                faltantes.append(nombre_atributo)
+        if faltantes:
+            errores.append(f"Faltan valores para: {', '.join(faltantes)}")
+
+    if errores:
+        raise ValidationError(errores)
+
+    return {
+        "producto": {
+            "nombre": nombre,
+            "descripcion": descripcion,
+            "precio_menudeo": menudeo,
+            "precio_mayoreo": mayoreo,
+            "precio_docena": docena,
+            "categoria_id": subcategoria[0],
+            "dueño_id": dueño_id,
+        },
+        "categorias": subcategoria[1:],
+        "temporadas": temporadas,
+        "codigo": codigo or None,
+        "tipo_codigo": tipo_codigo,
+        "valores": valores,
+        "cantidad": cantidad,
+        "ubicacion_id": ubicacion_id,
+    }
+
+
+# -----------------------------
+# Importación
+# -----------------------------
+def importar_productos(filas, *, empleado=None, ubicacion=None, etiqueta="chica", simular=False, progreso=None):
+    """
+    Importa las filas de leer_filas. Los productos sin código reciben uno de la secuencia
+    de `etiqueta`; `ubicacion` se usa para la cantidad inicial de las filas que no traen una.
+    Con simular=True solo se valida. progreso(filas_leidas) se llama después de cada lote.
+    Devuelve {"filas", "creados", "errores": [(fila, mensaje), ...]}.
+    """
+    if etiqueta not in codigos.SIMBOLOGIAS:
+        raise ValidationError(f"Tamaño de etiqueta desconocido: {etiqueta}")
+    catalogo = cargar_catalogo()
+    ubicacion_id = ubicacion.pk if ubicacion else None
+    resultado = {"filas": 0, "creados": 0, "errores": []}
+    errores = resultado["errores"]
+    vistos = set()  # códigos que ya aparecieron en el archivo
+
+    filas = iter(filas)
+    while lote := list(islice(filas, LOTE)):
+        resultado["filas"] += len(lote)
+
+        validas = []
+        for numero, fila in lote:
+            try:
+                validas.append((numero, validar_fila(fila, catalogo, ubicacion_id)))
+            except ValidationError as e:
+                errores.append((numero, "; ".join(e.messages)))
+
+        # Códigos repetidos contra la base (una consulta por lote) y dentro del archivo
+        propios = [datos["codigo"] for _, datos in validas if datos["codigo"]]
+        existentes = set(
+            Producto.objects.filter(codigo_barras__in=propios).values_list("codigo_barras", flat=True)
+        ) if propios else set()
+        aceptadas = []
+        for numero, datos in validas:
+            codigo = datos["codigo"]
+            if codigo in existentes:
+                errores.append((numero, f"Ya existe un producto con el código {codigo}"))
+            elif codigo in vistos:
+                errores.append((numero, f"El código {codigo} está repetido en el archivo"))
+            else:
+                if codigo:
+                    vistos.add(codigo)
+                aceptadas.append((numero, datos))
+
+        if aceptadas and not simular:
+            try:
+                _guardar_lote([datos for _, datos in aceptadas], empleado, etiqueta)
+            except DatabaseError as e:
+                errores.extend((numero, f"No se pudo guardar el lote: {e}") for numero, _ in aceptadas)
+                aceptadas = []
+        resultado["creados"] += len(aceptadas)
+        if progreso:
+            progreso(resultado["filas"])
+
+    if resultado["creados"] and not simular:
+        cache_reportes.invalidar()
+    errores.sort()
+    return resultado
+
+
+def _guardar_lote(aceptadas, empleado, etiqueta):
+    """Inserta un lote ya validado; si algo falla no queda nada del lote (ni códigos reservados)."""
+    with transaction.atomic():
+        codigos.apartar_existentes([datos["codigo"] for datos in aceptadas if datos["codigo"]])
+        sin_codigo = [datos for datos in aceptadas if not datos["codigo"]]
+        if sin_codigo:
+            tipo, nuevos = codigos.reservar_codigos(etiqueta, len(sin_codigo))
+            for datos, codigo in zip(sin_codigo, nuevos):
+                datos["codigo"], datos["tipo_codigo"] = codigo, tipo
+
+        productos = Producto.objects.bulk_create([
+            Producto(
+                **datos["producto"],
+                codigo_barras=datos["codigo"],
+                tipo_codigo=datos["tipo_codigo"],
+                registrado_por=empleado,
+                texto_busqueda=componer_texto(
+                    datos["producto"]["nombre"], datos["producto"]["descripcion"], datos["codigo"],
+                    datos["categorias"], [nombre for _, nombre in datos["temporadas"]],
+                ),
+            )
+            for datos in aceptadas
+        ])
+
+        ProductoTemporada = Producto.temporada.through
+        temporadas, valores, inventarios, movimientos = [], [], [], []
+        for producto, datos in zip(productos, aceptadas):
+            temporadas.extend(ProductoTemporada(producto_id=producto.pk, temporada_id=t) for t, _ in datos["temporadas"])
+            valores.extend(ValorAtributo(producto_id=producto.pk, atributo_id=a, valor=v) for a, v in datos["valores"])
+            if datos["cantidad"] and datos["ubicacion_id"]:
+                inventarios.append(Inventario(
+                    producto_id=producto.pk, ubicacion_id=datos["ubicacion_id"], cantidad_actual=datos["cantidad"],
+                ))
+                movimientos.append(MovimientoInventario(
+                    producto_id=producto.pk, tipo="entrada", motivo="nuevo", cantidad=datos["cantidad"],
+                    destino_id=datos["ubicacion_id"], realizado_por=empleado,
+                ))
+
+        ProductoTemporada.objects.bulk_create(temporadas)
+        ValorAtributo.objects.bulk_create(valores)
+        Inventario.objects.bulk_create(inventarios)
+        movimientos = MovimientoInventario.objects.bulk_create(movimientos)
+        if movimientos:
+            despues_de_registrar(movimientos)
+        # bulk_create no dispara post_save: la lectura de los productos sin stock y su fila de
+        # rotación se piden aquí
+        con_stock = {mov.producto_id for mov in movimientos}
+        lectura.programar(p.pk for p in productos if p.pk not in con_stock)
+        rotacion.crear_filas(p.pk for p in productos if p.pk not in con_stock)
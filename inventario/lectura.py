@@ -0,0 +1,186 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Atributo, Inventario, Producto, ProductoLectura, ValorAtributo
+
+
+# -----------------------------
+# Modelo de lectura de productos
+# -----------------------------
+# ProductoLectura.datos guarda ya armado lo que las pantallas de consulta repiten: ruta de
+# categoría, temporadas, atributos de la subcategoría con su valor, dueño y existencias por
+# ubicación. Se regenera completo al confirmar la transacción (programar) desde las señales
+# de catálogo. Los movimientos (services.despues_de_registrar, bitacora.reconstruir_inventario)
+# solo cambian las existencias: programar_stock reescribe stock y stock_total sin volver a
+# armar lo demás. Leerlo es un SELECT por llave primaria; si falta la fila de un producto se
+# arma en ese momento.
+
+LOTE = 500  # productos por consulta (límite de variables de SQLite)
+
+
+def armar(producto_ids):
+    """{producto_id: datos} de los productos indicados, con cinco consultas por cada LOTE."""
+    ids = list(producto_ids)
+    resultado = {}
+    for inicio in range(0, len(ids), LOTE):
+        resultado.update(_armar_lote(ids[inicio:inicio + LOTE]))
+    return resultado
+
+
+def _armar_lote(ids):
+    productos = (
+        Producto.objects
+        .filter(id__in=ids)
+        .values(
+            "id", "nombre", "descripcion", "codigo_barras", "tipo_codigo",
+            "precio_menudeo", "precio_mayoreo", "precio_docena", "dueño_id",
+            "categoria_id", "categoria__nombre", "categoria__padre_id", "categoria__padre__nombre",
+            dueño_nombre=F("dueño__user__username"),
+        )
+    )
+    productos = list(productos)
+    if not productos:
+        return {}
+
+    temporadas = defaultdict(list)
+    for producto_id, nombre in (
+        Producto.temporada.through.objects
+        .filter(producto_id__in=ids)
+        .values_list("producto_id", "temporada__nombre")
+        .order_by("temporada__fecha_inicio", "temporada__nombre")
+    ):
+        temporadas[producto_id].append(nombre)
+
+    valores = {
+        (producto_id, atributo_id): valor
+        for producto_id, atributo_id, valor in
+        ValorAtributo.objects.filter(producto_id__in=ids).values_list("producto_id", "atributo_id", "valor")
+    }
+
+    atributos = defaultdict(list)
+    categorias = {p["categoria_id"] for p in productos if p["categoria_id"]}
+    for atributo_id, nombre, categoria_id in (
+        Atributo.objects.filter(categoria_id__in=categorias).values_list("id", "nombre", "categoria_id").order_by("id")
+    ):
+        atributos[categoria_id].append((atributo_id, nombre))
+
+    existencias = _existencias(ids)
+
+    resultado = {}
+    for p in productos:
+        ruta = [n for n in (p["categoria__padre__nombre"], p["categoria__nombre"]) if n]
+        stock = existencias[p["id"]]
+        resultado[p["id"]] = {
+            "id": p["id"],
+            "nombre": p["nombre"],
+            "descripcion": p["descripcion"],
+            "codigo_barras": p["codigo_barras"],
+            "tipo_codigo": p["tipo_codigo"],
+            "precio_menudeo": str(p["precio_menudeo"]),
+            "precio_mayoreo": str(p["precio_mayoreo"]),
+            "precio_docena": str(p["precio_docena"]),
+            "dueño_id": p["dueño_id"],
+            "dueño": p["dueño_nombre"],
+            "categoria_padre_id": p["categoria__padre_id"],
+            "categoria_padre": p["categoria__padre__nombre"],
+            "subcategoria_id": p["categoria_id"],
+            "subcategoria": p["categoria__nombre"],
+            "ruta_categoria": " / ".join(ruta),
+            "temporadas": temporadas[p["id"]],
+            "atributos": [
+                {"id": atributo_id, "nombre": nombre, "valor": valores.get((p["id"], atributo_id), "")}
+                for atributo_id, nombre in atributos[p["categoria_id"]]
+            ],
+            "stock": stock,
+            "stock_total": sum(stock.values()),
+        }
+    return resultado
+
+
+def _existencias(ids):
+    """{producto_id: {ubicación: cantidad}} de los productos indicados (una consulta)."""
+    existencias = defaultdict(dict)
+    for producto_id, ubicacion, cantidad in (
+        Inventario.objects
+        .filter(producto_id__in=ids)
+        .values_list("producto_id", "ubicacion__nombre", "cantidad_actual")
+        .order_by("ubicacion__nombre")
+    ):
+        existencias[producto_id][ubicacion] = cantidad
+    return existencias
+
+
+def actualizar(producto_ids):
+    """Arma y guarda (upsert) la lectura de esos productos. Devuelve {producto_id: datos}."""
+    datos = armar(producto_ids)
+    ahora = timezone.now()
+    ProductoLectura.objects.bulk_create(
+        [ProductoLectura(producto_id=i, datos=d, actualizado=ahora) for i, d in datos.items()],
+        update_conflicts=True,
+        unique_fields=["producto"],
+        update_fields=["datos", "actualizado"],
+        batch_size=LOTE,
+    )
+    return datos
+
+
+def actualizar_stock(producto_ids):
+    """
+    Reescribe solo stock y stock_total de esos productos: por cada LOTE, las filas de lectura
+    bloqueadas, una consulta a Inventario y un bulk_update. Los que no tienen fila se arman completos.
+    """
+    ids = list(set(producto_ids))
+    for inicio in range(0, len(ids), LOTE):
+        lote = ids[inicio:inicio + LOTE]
+        with transaction.atomic():
+            # Bloquear antes de leer Inventario: si dos ventas del mismo producto se cruzan, la
+            # última en escribir es la que leyó las existencias más nuevas
+            filas = list(ProductoLectura.objects.select_for_update().filter(producto_id__in=lote).order_by("pk"))
+            existencias = _existencias(lote)
+            ahora = timezone.now()
+            for fila in filas:
+                stock = existencias[fila.producto_id]
+                fila.datos["stock"] = stock
+                fila.datos["stock_total"] = sum(stock.values())
+                fila.actualizado = ahora
+            ProductoLectura.objects.bulk_update(filas, ["datos", "actualizado"])
+        faltantes = set(lote) - {fila.producto_id for fila in filas}
+        if faltantes:
+            actualizar(faltantes)
+
+
+def programar(producto_ids):
+    """Regenera la lectura de esos productos al confirmar la transacción actual."""
+    ids = set(producto_ids)
+    if ids:
+        transaction.on_commit(lambda: actualizar(ids))
+
+
+def programar_stock(producto_ids):
+    """Como programar, pero solo las existencias (después de movimientos de inventario)."""
+    ids = set(producto_ids)
+    if ids:
+        transaction.on_commit(lambda: actualizar_stock(ids))
+
+
+def datos_de(producto_ids):
+    """{producto_id: datos} con un SELECT por llave primaria; arma los que aún no tengan fila."""
+    ids = set(producto_ids)
+    datos = dict(ProductoLectura.objects.filter(producto_id__in=ids).values_list("producto_id", "datos"))
+    faltantes = ids - datos.keys()
+    if faltantes:
+        datos.update(actualizar(faltantes))
+    return datos
+
+
+def por_codigo(codigo):
+    """Datos del producto con ese código de barras o None si no existe."""
+    datos = ProductoLectura.objects.filter(producto__codigo_barras=codigo).values_list("datos", flat=True).first()
+    if datos is None:
+        producto_id = Producto.objects.filter(codigo_barras=codigo).values_list("id", flat=True).first()
+        if producto_id is not None:
+            datos = actualizar([producto_id]).get(producto_id)
+    return datos
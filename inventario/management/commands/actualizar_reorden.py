@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario import reorden
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula la salida diaria promedio de cada existencia (para los días de cobertura "
+        "del stock crítico). Correr una vez al día."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=reorden.DIAS_VELOCIDAD,
+            help="Días de salidas a promediar",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones["dias"] < 1:
+            raise CommandError("--dias debe ser al menos 1")
+        cambios = reorden.recalcular_salida_diaria(opciones["dias"])
+        self.stdout.write(self.style.SUCCESS(f"Salida diaria actualizada en {cambios} puntos de reorden."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from inventario import rotacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las ventanas de rotación (7/30/90 días) de cada producto. "
+        "Correr una vez al día; los movimientos nuevos ya se suman al registrarse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reconstruir",
+            action="store_true",
+            help="Reconstruir antes los contadores diarios desde todo el historial de movimientos",
+        )
+
+    def handle(self, *args, **opciones):
+        if opciones["reconstruir"]:
+            rotacion.reconstruir_rotacion_diaria()
+            self.stdout.write("Contadores diarios reconstruidos desde MovimientoInventario.")
+        rotacion.recalcular_ventanas()
+        self.stdout.write(self.style.SUCCESS("Ventanas de rotación actualizadas."))
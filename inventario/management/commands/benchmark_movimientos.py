@@ -0,0 +1,204 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from inventario.models import Categoria, MovimientoInventario, Producto, Ubicacion
+
+PREFIJO = "BENCH-"
+LIMITE_MS = 200
+NUM_UBICACIONES = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra movimientos de prueba y mide las consultas de reportes y dashboard "
+        "sin y con los índices compuestos de MovimientoInventario. Quita y vuelve a crear "
+        "índices y siembra millones de filas: correrlo contra una base dedicada (--database) "
+        "o, en la base principal, solo con --confirmar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movimientos", type=int, default=1_000_000, help="Movimientos a sembrar")
+        parser.add_argument("--productos", type=int, default=5000, help="Productos de prueba a crear")
+        parser.add_argument("--dias", type=int, default=365, help="Días de historial a repartir")
+        parser.add_argument("--repeticiones", type=int, default=5, help="Veces que se ejecuta cada consulta")
+        parser.add_argument("--sin-sembrar", action="store_true", help="Usar los datos ya sembrados")
+        parser.add_argument("--limpiar", action="store_true", help="Borrar los datos de prueba y salir")
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Alias de DATABASES donde sembrar y medir (una base dedicada al benchmark)",
+        )
+        parser.add_argument(
+            "--confirmar",
+            action="store_true",
+            help="Permite correrlo en la base 'default' (la de la tienda)",
+        )
+
+    def handle(self, *args, **opciones):
+        self.db = opciones["database"]
+        if self.db not in connections:
+            raise CommandError(f"No existe la base '{self.db}' en DATABASES")
+        if self.db == DEFAULT_DB_ALIAS and not opciones["confirmar"]:
+            raise CommandError(
+                "El benchmark quita índices y siembra datos de prueba. Usa --database con una base "
+                "dedicada o --confirmar para correrlo en la base 'default'."
+            )
+
+        if opciones["limpiar"]:
+            borrados = self.limpiar()
+            self.stdout.write(self.style.SUCCESS(f"{borrados} registros de prueba eliminados."))
+            return
+
+        if not opciones["sin_sembrar"]:
+            self.sembrar(opciones["movimientos"], opciones["productos"], opciones["dias"])
+
+        repeticiones = opciones["repeticiones"]
+        # Los índices se vuelven a crear aunque la medición falle o se interrumpa (Ctrl+C)
+        quitados = []
+        try:
+            with connections[self.db].schema_editor() as editor:
+                for indice in MovimientoInventario._meta.indexes:
+                    editor.remove_index(MovimientoInventario, indice)
+                    quitados.append(indice)
+            self.analizar()
+            antes = self.medir(repeticiones)
+        finally:
+            with connections[self.db].schema_editor() as editor:
+                for indice in quitados:
+                    editor.add_index(MovimientoInventario, indice)
+        self.analizar()
+        despues = self.medir(repeticiones)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'Consulta':<40}{'sin índices':>14}{'con índices':>14}")
+        for nombre in antes:
+            estilo = self.style.SUCCESS if despues[nombre] <= LIMITE_MS else self.style.ERROR
+            self.stdout.write(
+                f"{nombre:<40}{antes[nombre]:>11.1f} ms" + estilo(f"{despues[nombre]:>11.1f} ms")
+            )
+
+    # -----------------------------
+    # Datos de prueba
+    # -----------------------------
+    def sembrar(self, total, num_productos, dias):
+        # Ubicaciones propias del benchmark: nunca se siembra sobre las de la tienda
+        ubicaciones = [
+            Ubicacion.objects.using(self.db).get_or_create(nombre=f"{PREFIJO}{i}", defaults={"direccion": "-"})[0]
+            for i in range(NUM_UBICACIONES)
+        ]
+
+        padre, _ = Categoria.objects.using(self.db).get_or_create(nombre=f"{PREFIJO}Categoría", padre=None)
+        sub, _ = Categoria.objects.using(self.db).get_or_create(nombre=f"{PREFIJO}Subcategoría", padre=padre)
+
+        Producto.objects.using(self.db).bulk_create(
+            [
+                Producto(
+                    nombre=f"{PREFIJO}{i:06d}",
+                    descripcion="Producto de benchmark",
+                    precio_mayoreo=10, precio_menudeo=12, precio_docena=9,
+                    categoria=sub,
+                )
+                for i in range(num_productos)
+            ],
+            batch_size=1000,
+        )
+        producto_ids = list(
+            Producto.objects.using(self.db).filter(nombre__startswith=PREFIJO).values_list("id", flat=True)
+        )
+        ubicacion_ids = [u.id for u in ubicaciones]
+        motivos = list(MovimientoInventario.MAPEO_TIPO_POR_MOTIVO.items())
+        ahora = timezone.now()
+        segundos = dias * 24 * 3600
+
+        # fecha es auto_now_add: se inserta con la hora actual y luego se reparte el historial
+        lote = 10_000
+        for inicio in range(0, total, lote):
+            movimientos = []
+            for _ in range(min(lote, total - inicio)):
+                motivo, tipo = random.choice(motivos)
+                ubicacion_id = random.choice(ubicacion_ids)
+                movimientos.append(MovimientoInventario(
+                    producto_id=random.choice(producto_ids),
+                    tipo=tipo,
+                    motivo=motivo,
+                    cantidad=random.randint(1, 50),
+                    origen_id=ubicacion_id if tipo == "salida" else None,
+                    destino_id=ubicacion_id if tipo != "salida" else None,
+                ))
+            with transaction.atomic(using=self.db):
+                movimientos = MovimientoInventario.objects.using(self.db).bulk_create(movimientos)
+                for movimiento in movimientos:
+                    movimiento.fecha = ahora - timedelta(seconds=random.randint(0, segundos))
+                MovimientoInventario.objects.using(self.db).bulk_update(movimientos, ["fecha"], batch_size=1000)
+            self.stdout.write(f"  {inicio + len(movimientos)}/{total} movimientos sembrados", ending="\r")
+        self.stdout.write("")
+
+    def limpiar(self):
+        """
+        Borra productos, ubicaciones y categorías del benchmark. Movimientos, rotación,
+        resumen diario, snapshots y lectura de esos productos se van en cascada.
+        """
+        borrados, _ = Producto.objects.using(self.db).filter(nombre__startswith=PREFIJO).delete()
+        for modelo in (Ubicacion, Categoria):
+            n, _ = modelo.objects.using(self.db).filter(nombre__startswith=PREFIJO).delete()
+            borrados += n
+        return borrados
+
+    def analizar(self):
+        with connections[self.db].cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    # -----------------------------
+    # Consultas medidas
+    # -----------------------------
+    def consultas(self):
+        producto_id = (
+            MovimientoInventario.objects.using(self.db).order_by().values_list("producto_id", flat=True).first()
+        )
+        ubicacion_id = (
+            Ubicacion.objects.using(self.db).filter(nombre__startswith=PREFIJO).values_list("id", flat=True).first()
+        )
+        movimientos = MovimientoInventario.objects.using(self.db).order_by("-fecha")
+
+        return {
+            # reports.movimientos_por_tipo (primera página)
+            "movimientos_por_tipo (salida)": lambda: list(
+                movimientos.filter(tipo="salida").values("producto_id", "cantidad", "fecha")[:200]
+            ),
+            "movimientos de un producto": lambda: list(
+                movimientos.filter(producto_id=producto_id).values("tipo", "cantidad", "fecha")[:200]
+            ),
+            "salidas por ubicación origen": lambda: list(
+                movimientos.filter(origen_id=ubicacion_id).values("producto_id", "cantidad", "fecha")[:200]
+            ),
+            "entradas por ubicación destino": lambda: list(
+                movimientos.filter(destino_id=ubicacion_id).values("producto_id", "cantidad", "fecha")[:200]
+            ),
+            # reports.resumen_movimientos para un producto
+            "resumen_movimientos (producto)": lambda: list(
+                MovimientoInventario.objects.using(self.db).filter(producto_id=producto_id)
+                .values("tipo").annotate(total=Sum("cantidad")).order_by("tipo")
+            ),
+            # dashboard_inventario: menos rotación
+            "menos_rotacion": lambda: list(
+                Producto.objects.using(self.db).annotate(movimientos_count=Count("movimientos"))
+                .order_by("movimientos_count")[:10]
+            ),
+        }
+
+    def medir(self, repeticiones):
+        resultados = {}
+        for nombre, consulta in self.consultas().items():
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                consulta()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nombre] = sorted(tiempos)[len(tiempos) // 2]
+        return resultados
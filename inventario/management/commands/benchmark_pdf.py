@@ -0,0 +1,84 @@
+import io
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from inventario import reports
+from inventario.pdf_reportes import HojaReporte
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide páginas por segundo de la plantilla de reportes PDF con filas sintéticas "
+        "(sin base de datos) y, opcionalmente, de un reporte real."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=10_000, help="Filas de la tabla sintética")
+        parser.add_argument("--repeticiones", type=int, default=3, help="Veces que se genera cada PDF")
+        parser.add_argument(
+            "--tipo",
+            choices=["general", "movimientos", "resumen_movimientos", "reabastecimiento", "criticos"],
+            help="Medir también este reporte con los datos de la base",
+        )
+
+    def handle(self, *args, **opciones):
+        filas = self.filas_sinteticas(opciones["filas"])
+        encabezados = ["Producto", "Tipo", "Dueño", "Categoría", "Subcategoría", "Cantidad", "Origen", "Destino", "Fecha"]
+
+        def sintetico(archivo):
+            hoja = HojaReporte(archivo, "benchmark")
+            hoja.tabla(encabezados, filas)
+            hoja.terminar()
+            return hoja.pagina
+
+        self.medir(f"Sintético ({len(filas)} filas)", sintetico, opciones["repeticiones"])
+
+        tipo = opciones["tipo"]
+        if tipo:
+            def real(archivo):
+                if tipo == "criticos":
+                    reports.escribir_pdf_criticos(archivo, "benchmark")
+                else:
+                    reports.escribir_pdf_reporte(archivo, tipo, {}, "benchmark")
+                return None
+
+            self.medir(f"Reporte {tipo}", real, opciones["repeticiones"])
+
+    def filas_sinteticas(self, total):
+        aleatorio = random.Random(0)
+        inicio = datetime(2025, 1, 1)
+        return [
+            [
+                f"Producto de prueba {i:06d} talla {aleatorio.choice(['CH', 'M', 'G', 'XG'])}",
+                aleatorio.choice(["entrada", "salida", "ajuste"]),
+                aleatorio.choice(["ana", "luis", "maria.fernanda"]),
+                "Ropa",
+                aleatorio.choice(["Playeras", "Pantalones", "Sudaderas de temporada"]),
+                aleatorio.randint(1, 500),
+                "Bodega Interna",
+                "Piso",
+                inicio + timedelta(minutes=i),
+            ]
+            for i in range(total)
+        ]
+
+    def medir(self, nombre, generar, repeticiones):
+        tiempos, paginas, tamaño = [], None, 0
+        for _ in range(repeticiones):
+            archivo = io.BytesIO()
+            inicio = time.perf_counter()
+            paginas = generar(archivo) or paginas
+            tiempos.append(time.perf_counter() - inicio)
+            tamaño = archivo.tell()
+            if paginas is None:
+                paginas = len(re.findall(rb"/Type /Page\b(?!s)", archivo.getvalue()))
+        mejor = min(tiempos)
+        self.stdout.write(
+            f"{nombre:<40}{mejor:>8.2f} s  {paginas:>6} páginas  "
+            + self.style.SUCCESS(f"{paginas / mejor:>8.1f} páginas/s")
+            + f"  {tamaño / 1024:>8.0f} KB"
+        )
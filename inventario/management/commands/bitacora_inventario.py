@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from datetime import datetime, time
+
+from inventario import bitacora
+
+
+class Command(BaseCommand):
+    help = (
+        "Bitácora de inventario: toma snapshots periódicos y verifica o reconstruye "
+        "Inventario a partir del último snapshot más los movimientos posteriores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "accion",
+            choices=["snapshot", "verificar", "reconstruir", "stock"],
+            help="snapshot | verificar | reconstruir | stock (stock a una fecha)",
+        )
+        parser.add_argument("--producto", type=int, help="Limitar a un producto (id)")
+        parser.add_argument("--ubicacion", type=int, help="Ubicación (id) para la acción 'stock'")
+        parser.add_argument("--fecha", help="Fecha para la acción 'stock' (AAAA-MM-DD o ISO 8601)")
+        parser.add_argument(
+            "--desde-inventario",
+            action="store_true",
+            help="Tomar el snapshot desde Inventario.cantidad_actual en lugar de la bitácora",
+        )
+
+    def handle(self, *args, **opciones):
+        accion = opciones["accion"]
+
+        if accion == "snapshot":
+            corte = bitacora.tomar_snapshot(desde_inventario=opciones["desde_inventario"])
+            self.stdout.write(self.style.SUCCESS(f"Snapshot guardado hasta el movimiento {corte}."))
+
+        elif accion == "verificar":
+            diferencias = bitacora.diferencias_inventario(opciones["producto"])
+            for p_id, u_id, esperado, actual in diferencias:
+                self.stdout.write(
+                    f"Producto {p_id} / ubicación {u_id}: bitácora={esperado} inventario={actual}"
+                )
+            if diferencias:
+                raise CommandError(f"{len(diferencias)} diferencias entre Inventario y la bitácora.")
+            self.stdout.write(self.style.SUCCESS("Inventario coincide con la bitácora."))
+
+        elif accion == "reconstruir":
+            try:
+                diferencias = bitacora.reconstruir_inventario(opciones["producto"])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"{len(diferencias)} registros de Inventario corregidos."))
+
+        elif accion == "stock":
+            if not (opciones["producto"] and opciones["ubicacion"] and opciones["fecha"]):
+                raise CommandError("La acción 'stock' requiere --producto, --ubicacion y --fecha.")
+            fecha = self.parse_fecha(opciones["fecha"])
+            cantidad = bitacora.stock_a_fecha(opciones["producto"], opciones["ubicacion"], fecha)
+            self.stdout.write(str(cantidad))
+
+    def parse_fecha(self, valor):
+        fecha = parse_datetime(valor)
+        if fecha is None:
+            dia = parse_date(valor)
+            if dia is None:
+                raise CommandError(f"Fecha inválida: {valor}")
+            fecha = datetime.combine(dia, time.max)
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
@@ -0,0 +1,67 @@
+import time
+from zipfile import BadZipFile
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario import importacion
+from inventario.codigos import SIMBOLOGIAS
+from inventario.models import Ubicacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos desde un archivo CSV o XLSX (encabezados en la primera fila; "
+        "ver inventario.importacion). Las filas con errores se listan y no se importan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del archivo .csv o .xlsx")
+        parser.add_argument("--ubicacion", help="Ubicación de la cantidad inicial para las filas que no indican una")
+        parser.add_argument(
+            "--etiqueta",
+            choices=list(SIMBOLOGIAS),
+            default="chica",
+            help="Tamaño de etiqueta de los códigos que se generan para productos sin código",
+        )
+        parser.add_argument("--usuario", help="Usuario (empleado) que queda como quien registró los productos")
+        parser.add_argument("--simular", action="store_true", help="Solo validar, sin guardar nada")
+
+    def handle(self, *args, **opciones):
+        ubicacion = None
+        if opciones["ubicacion"]:
+            ubicacion = Ubicacion.objects.filter(nombre=opciones["ubicacion"]).first()
+            if ubicacion is None:
+                raise CommandError(f"No existe la ubicación '{opciones['ubicacion']}'")
+
+        empleado = None
+        if opciones["usuario"]:
+            usuario = get_user_model().objects.filter(username=opciones["usuario"]).select_related("empleado").first()
+            empleado = getattr(usuario, "empleado", None)
+            if empleado is None:
+                raise CommandError(f"'{opciones['usuario']}' no es un empleado")
+
+        inicio = time.perf_counter()
+        try:
+            with open(opciones["archivo"], "rb") as archivo:
+                resultado = importacion.importar_productos(
+                    importacion.leer_filas(archivo, opciones["archivo"]),
+                    empleado=empleado,
+                    ubicacion=ubicacion,
+                    etiqueta=opciones["etiqueta"],
+                    simular=opciones["simular"],
+                    progreso=lambda filas: self.stdout.write(f"{filas} filas leídas…"),
+                )
+        except (OSError, ValueError, BadZipFile, ValidationError) as e:
+            raise CommandError(" ".join(getattr(e, "messages", [str(e)])))
+        segundos = time.perf_counter() - inicio
+
+        for fila, mensaje in resultado["errores"]:
+            self.stderr.write(f"Fila {fila}: {mensaje}")
+        accion = "válidos (simulación)" if opciones["simular"] else "importados"
+        ritmo = resultado["filas"] / segundos * 60 if segundos else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['creados']} de {resultado['filas']} productos {accion}, "
+            f"{len(resultado['errores'])} filas con errores ({segundos:.1f} s, {ritmo:,.0f} filas/min)."
+        ))
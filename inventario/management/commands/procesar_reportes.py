@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from inventario import trabajos
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de reportes: toma los ReporteJob pendientes y genera sus PDF en un pool "
+        "de procesos, fuera de los workers web. Ejecutar un solo worker por servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--procesos", type=int, default=2, help="Reportes generados en paralelo")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre revisiones de la cola")
+        parser.add_argument("--una-vez", action="store_true", help="Procesar lo pendiente y salir")
+
+    def handle(self, *args, **opciones):
+        procesos = max(opciones["procesos"], 1)
+        intervalo = opciones["intervalo"]
+
+        reencolados = trabajos.reencolar_interrumpidos()
+        if reencolados:
+            self.stdout.write(f"{reencolados} trabajos interrumpidos regresaron a la cola.")
+
+        en_curso = {}
+        with ProcessPoolExecutor(max_workers=procesos, initializer=trabajos.inicializar_proceso) as pool:
+            while True:
+                while len(en_curso) < procesos:
+                    trabajo = trabajos.reclamar_siguiente()
+                    if trabajo is None:
+                        break
+                    # Los procesos hijos no deben heredar la conexión abierta del padre
+                    connections.close_all()
+                    en_curso[pool.submit(trabajos.ejecutar_reporte, trabajo.pk)] = trabajo.pk
+                    self.stdout.write(f"Reporte #{trabajo.pk} ({trabajo.tipo}) en proceso…")
+
+                if not en_curso:
+                    if opciones["una_vez"]:
+                        break
+                    time.sleep(intervalo)
+                    continue
+
+                terminados, _ = wait(en_curso, timeout=intervalo, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    pk = en_curso.pop(futuro)
+                    try:
+                        _, estado = futuro.result()
+                    except Exception as e:
+                        # El proceso hijo murió o no pudo guardar el resultado
+                        trabajos.marcar_error(pk, e)
+                        estado = "error"
+                    estilo = self.style.SUCCESS if estado == "terminado" else self.style.ERROR
+                    self.stdout.write(estilo(f"Reporte #{pk}: {estado}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from inventario import lectura
+from inventario.models import Producto, ProductoLectura
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera ProductoLectura (modelo de lectura de productos) para todo el catálogo. "
+        "Correr después de migrar o de cambios hechos sin señales (SQL directo, QuerySet.update)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--faltantes", action="store_true", help="Solo los productos que aún no tienen fila")
+
+    def handle(self, *args, **opciones):
+        ids = Producto.objects.order_by("id").values_list("id", flat=True)
+        if opciones["faltantes"]:
+            ids = ids.exclude(id__in=ProductoLectura.objects.values("producto_id"))
+
+        total = 0
+        pendientes = []
+        for producto_id in ids.iterator(chunk_size=lectura.LOTE * 10):
+            pendientes.append(producto_id)
+            if len(pendientes) == lectura.LOTE * 10:
+                total += len(lectura.actualizar(pendientes))
+                pendientes = []
+        if pendientes:
+            total += len(lectura.actualizar(pendientes))
+        self.stdout.write(self.style.SUCCESS(f"Lectura regenerada para {total} productos."))
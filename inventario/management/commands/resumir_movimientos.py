@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from inventario import resumen_diario
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza ResumenMovimientoDiario con los días cerrados desde la última marca de agua. "
+        "Pensado para correr una vez al día (cron) después de medianoche."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", help="Volver a resumir desde este día (AAAA-MM-DD), p. ej. tras corregir movimientos")
+        parser.add_argument("--reconstruir", action="store_true", help="Borrar el resumen y recalcularlo completo")
+
+    def handle(self, *args, **opciones):
+        if opciones["reconstruir"]:
+            resultado = resumen_diario.reconstruir_resumen()
+        elif opciones["desde"]:
+            desde = parse_date(opciones["desde"])
+            if desde is None:
+                raise CommandError(f"Fecha inválida: {opciones['desde']}")
+            hasta = max(resumen_diario.cerrado_hasta() or desde, resumen_diario.ultimo_dia_cerrable())
+            resultado = (desde, hasta, resumen_diario.resumir_dias(desde, hasta))
+        else:
+            resultado = resumen_diario.actualizar_resumen()
+
+        if resultado is None:
+            self.stdout.write("El resumen ya estaba al día.")
+            return
+        desde, hasta, filas = resultado
+        self.stdout.write(self.style.SUCCESS(f"Resumen del {desde} al {hasta}: {filas} filas."))
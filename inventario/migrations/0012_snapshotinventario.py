@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_alter_inventario_ubicacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(default=0)),
+                ('movimiento_hasta', models.PositiveBigIntegerField(db_index=True)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventario.producto')),
+                ('ubicacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventario.ubicacion')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Inventario',
+                'verbose_name_plural': 'Snapshots de Inventario',
+                'ordering': ['-movimiento_hasta'],
+                'unique_together': {('movimiento_hasta', 'producto', 'ubicacion')},
+            },
+        ),
+    ]
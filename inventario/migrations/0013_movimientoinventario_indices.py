@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_snapshotinventario'),
+        ('tienda', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', '-fecha'], name='mov_producto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['tipo', '-fecha'], name='mov_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['origen', '-fecha'], name='mov_origen_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['destino', '-fecha'], name='mov_destino_fecha_idx'),
+        ),
+    ]
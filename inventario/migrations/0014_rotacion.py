@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0013_movimientoinventario_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RotacionProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rotacion', serialize=False, to='inventario.producto')),
+                ('movimientos_7d', models.PositiveIntegerField(db_index=True, default=0)),
+                ('movimientos_30d', models.PositiveIntegerField(db_index=True, default=0)),
+                ('movimientos_90d', models.PositiveIntegerField(db_index=True, default=0)),
+                ('movimientos_total', models.PositiveIntegerField(db_index=True, default=0)),
+                ('ultimo_movimiento', models.DateTimeField(blank=True, null=True)),
+                ('recalculado', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Rotación de producto',
+                'verbose_name_plural': 'Rotación de productos',
+            },
+        ),
+        migrations.CreateModel(
+            name='RotacionDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('movimientos', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rotacion_diaria', to='inventario.producto')),
+            ],
+            options={
+                'verbose_name': 'Rotación diaria',
+                'verbose_name_plural': 'Rotación diaria',
+                'unique_together': {('producto', 'dia')},
+            },
+        ),
+    ]
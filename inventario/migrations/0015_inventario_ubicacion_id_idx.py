@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0014_rotacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['ubicacion', 'id'], name='inv_ubicacion_id_idx'),
+        ),
+    ]
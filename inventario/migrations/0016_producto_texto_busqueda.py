@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+from inventario.busqueda import desinstalar_indice, instalar_indice, normalizar
+
+
+def llenar_texto_busqueda(apps, schema_editor):
+    Producto = apps.get_model('inventario', 'Producto')
+    productos = list(Producto.objects.select_related('categoria__padre').prefetch_related('temporada'))
+    for producto in productos:
+        partes = [producto.nombre, producto.descripcion, producto.codigo_barras]
+        if producto.categoria_id:
+            partes.append(producto.categoria.nombre)
+            if producto.categoria.padre_id:
+                partes.append(producto.categoria.padre.nombre)
+        partes.extend(t.nombre for t in producto.temporada.all())
+        producto.texto_busqueda = normalizar(" ".join(p for p in partes if p))
+    Producto.objects.bulk_update(productos, ['texto_busqueda'], batch_size=500)
+
+
+def crear_indice(apps, schema_editor):
+    instalar_indice(schema_editor)
+
+
+def borrar_indice(apps, schema_editor):
+    desinstalar_indice(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0015_inventario_ubicacion_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='texto_busqueda',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(llenar_texto_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
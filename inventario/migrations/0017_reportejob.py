@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0016_producto_texto_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('general', 'Inventario general'), ('movimientos', 'Movimientos'), ('resumen_movimientos', 'Resumen de movimientos'), ('criticos', 'Productos bajo stock')], max_length=30)),
+                ('filtros', models.JSONField(blank=True, default=dict)),
+                ('clave', models.CharField(db_index=True, max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('terminado', 'Terminado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=20)),
+                ('progreso', models.PositiveSmallIntegerField(default=0)),
+                ('archivo', models.FileField(blank=True, upload_to='reportes/')),
+                ('error', models.TextField(blank=True)),
+                ('usuario_nombre', models.CharField(blank=True, max_length=150)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes_solicitados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reporte en segundo plano',
+                'verbose_name_plural': 'Reportes en segundo plano',
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
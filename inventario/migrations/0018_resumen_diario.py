@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0017_reportejob'),
+        ('tienda', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMovimientoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(db_index=True)),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida'), ('ajuste', 'Ajuste')], max_length=20)),
+                ('motivo', models.CharField(blank=True, default='', max_length=30)),
+                ('cantidad', models.PositiveBigIntegerField(default=0)),
+                ('movimientos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de movimientos',
+                'verbose_name_plural': 'Resumen diario de movimientos',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['-fecha', '-id'], name='mov_fecha_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='resumenmovimientodiario',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_diario', to='inventario.producto'),
+        ),
+        migrations.AddField(
+            model_name='resumenmovimientodiario',
+            name='ubicacion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumen_diario', to='inventario.ubicacion'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenmovimientodiario',
+            index=models.Index(fields=['producto', 'dia'], name='resumen_producto_dia_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resumenmovimientodiario',
+            unique_together={('dia', 'producto', 'ubicacion', 'tipo', 'motivo')},
+        ),
+    ]
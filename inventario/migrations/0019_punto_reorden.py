@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0018_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoReorden',
+            fields=[
+                ('inventario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='punto_reorden', serialize=False, to='inventario.inventario')),
+                ('minimo', models.PositiveIntegerField(blank=True, db_index=True, null=True)),
+                ('maximo', models.PositiveIntegerField(blank=True, null=True)),
+                ('salida_diaria', models.FloatField(default=0)),
+                ('recalculado', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Punto de reorden',
+                'verbose_name_plural': 'Puntos de reorden',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['cantidad_actual'], name='inv_cantidad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['ubicacion', 'cantidad_actual'], name='inv_ubicacion_cantidad_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0019_punto_reorden'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportejob',
+            name='tipo',
+            field=models.CharField(choices=[('general', 'Inventario general'), ('movimientos', 'Movimientos'), ('resumen_movimientos', 'Resumen de movimientos'), ('reabastecimiento', 'Sugerencias de reabastecimiento'), ('criticos', 'Productos bajo stock')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0020_reportejob_reabastecimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCodigo',
+            fields=[
+                ('clave', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('ultimo', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de códigos',
+                'verbose_name_plural': 'Secuencias de códigos',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0021_secuencia_codigo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoLectura',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lectura', serialize=False, to='inventario.producto')),
+                ('datos', models.JSONField(default=dict)),
+                ('actualizado', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Producto (lectura)',
+                'verbose_name_plural': 'Productos (lectura)',
+            },
+        ),
+    ]
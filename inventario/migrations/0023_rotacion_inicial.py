@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+VENTANAS = (7, 30, 90)
+
+
+def llenar_rotacion(apps, schema_editor):
+    """
+    Los contadores de 0014 solo crecían con movimientos nuevos: se llenan desde el historial
+    (mismo cálculo que rotacion.reconstruir_rotacion_diaria + recalcular_ventanas).
+    """
+    Producto = apps.get_model('inventario', 'Producto')
+    MovimientoInventario = apps.get_model('inventario', 'MovimientoInventario')
+    RotacionDiaria = apps.get_model('inventario', 'RotacionDiaria')
+    RotacionProducto = apps.get_model('inventario', 'RotacionProducto')
+
+    RotacionDiaria.objects.all().delete()
+    filas = (
+        MovimientoInventario.objects.order_by()
+        .annotate(dia=TruncDate('fecha'))
+        .values('producto_id', 'dia')
+        .annotate(n=Count('id'))
+    )
+    RotacionDiaria.objects.bulk_create(
+        (RotacionDiaria(producto_id=f['producto_id'], dia=f['dia'], movimientos=f['n']) for f in filas.iterator()),
+        batch_size=1000,
+    )
+
+    RotacionProducto.objects.bulk_create(
+        [RotacionProducto(producto_id=p) for p in Producto.objects.values_list('id', flat=True)],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+    def suma(desde=None):
+        diarias = RotacionDiaria.objects.filter(producto_id=OuterRef('producto_id'))
+        if desde is not None:
+            diarias = diarias.filter(dia__gte=desde)
+        return Coalesce(Subquery(diarias.order_by().values('producto_id').annotate(n=Sum('movimientos')).values('n')), 0)
+
+    ultimo = (
+        MovimientoInventario.objects.filter(producto_id=OuterRef('producto_id'))
+        .order_by().values('producto_id').annotate(ultimo=Max('fecha')).values('ultimo')
+    )
+    hoy = timezone.localdate()
+    RotacionProducto.objects.update(
+        ultimo_movimiento=Subquery(ultimo),
+        recalculado=hoy,
+        movimientos_total=suma(),
+        **{f'movimientos_{dias}d': suma(hoy - timedelta(days=dias - 1)) for dias in VENTANAS},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0022_producto_lectura'),
+    ]
+
+    operations = [
+        migrations.RunPython(llenar_rotacion, migrations.RunPython.noop),
+    ]
@@ -110,6 +110,9 @@ class Producto(models.Model):
         related_name='productos_registrados'
     )
     fecha_registro = models.DateTimeField(auto_now_add=True)
+
+    # Texto normalizado (sin acentos, minúsculas) para el buscador; lo mantiene inventario.busqueda
+    texto_busqueda = models.TextField(blank=True, default='', editable=False)
     
 
     def __str__(self):
@@ -182,12 +185,43 @@ class Inventario(models.Model):
 
     class Meta:
         unique_together = ('producto', 'ubicacion')
+        # Columnas del Kanban: filtro por ubicación y paginación keyset por id
+        indexes = [
+            models.Index(fields=['ubicacion', 'id'], name='inv_ubicacion_id_idx'),
+            # Stock crítico: rango por cantidad_actual (global o por ubicación)
+            models.Index(fields=['cantidad_actual'], name='inv_cantidad_idx'),
+            models.Index(fields=['ubicacion', 'cantidad_actual'], name='inv_ubicacion_cantidad_idx'),
+        ]
 
     def __str__(self):
         return f"{self.producto.nombre} en {self.ubicacion.nombre}: {self.cantidad_actual} piezas"
     
     
     
+#Punto de reorden por existencia (producto en una ubicación): mínimo, máximo y velocidad de salida reciente
+class PuntoReorden(models.Model):
+    inventario = models.OneToOneField(Inventario, on_delete=models.CASCADE, primary_key=True, related_name='punto_reorden')
+    # Vacío = se usa INVENTARIO_STOCK_MINIMO
+    minimo = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    # Hasta dónde reabastecer; vacío = sin cantidad sugerida
+    maximo = models.PositiveIntegerField(null=True, blank=True)
+    # Piezas que salen por día en promedio (comando actualizar_reorden)
+    salida_diaria = models.FloatField(default=0)
+    recalculado = models.DateField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Punto de reorden"
+        verbose_name_plural = "Puntos de reorden"
+
+    def __str__(self):
+        return f"{self.inventario_id}: mínimo {self.minimo}, máximo {self.maximo}"
+
+    def clean(self):
+        if self.minimo is not None and self.maximo is not None and self.maximo < self.minimo:
+            raise ValidationError("El máximo no puede ser menor que el mínimo.")
+
+
+
 class TransferenciaInventario(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     cantidad = models.PositiveIntegerField()
@@ -292,6 +326,14 @@ class MovimientoInventario(models.Model):
         ordering = ['-fecha']
         verbose_name = "Movimiento de Inventario"
         verbose_name_plural = "Movimientos de Inventario"
+        # Índices según los accesos de reportes y dashboard (producto/tipo/ubicación + fecha desc)
+        indexes = [
+            models.Index(fields=['producto', '-fecha'], name='mov_producto_fecha_idx'),
+            models.Index(fields=['tipo', '-fecha'], name='mov_tipo_fecha_idx'),
+            models.Index(fields=['origen', '-fecha'], name='mov_origen_fecha_idx'),
+            models.Index(fields=['destino', '-fecha'], name='mov_destino_fecha_idx'),
+            models.Index(fields=['-fecha', '-id'], name='mov_fecha_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.producto.nombre} ({self.cantidad})"
@@ -313,3 +355,159 @@ class MovimientoInventario(models.Model):
         if self.tipo == 'ajuste' and not self.destino:
             raise ValidationError("Los ajustes requieren una ubicación destino.")
 
+
+
+
+#Foto periódica del stock por (producto, ubicación) para reconstruir Inventario desde la bitácora
+class SnapshotInventario(models.Model):
+    producto = models.ForeignKey("Producto", on_delete=models.CASCADE, related_name='snapshots')
+    ubicacion = models.ForeignKey("Ubicacion", on_delete=models.CASCADE, related_name='snapshots')
+    cantidad = models.IntegerField(default=0)
+    # Último MovimientoInventario.id incluido en la foto (todas las filas de un corte comparten el valor)
+    movimiento_hasta = models.PositiveBigIntegerField(db_index=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('movimiento_hasta', 'producto', 'ubicacion')
+        ordering = ['-movimiento_hasta']
+        verbose_name = "Snapshot de Inventario"
+        verbose_name_plural = "Snapshots de Inventario"
+
+    def __str__(self):
+        return f"{self.producto_id}@{self.ubicacion_id}: {self.cantidad} (hasta mov. {self.movimiento_hasta})"
+
+
+
+#Rotación por producto: contadores por día y resumen con ventanas móviles para el dashboard
+class RotacionDiaria(models.Model):
+    producto = models.ForeignKey("Producto", on_delete=models.CASCADE, related_name='rotacion_diaria')
+    dia = models.DateField()
+    movimientos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('producto', 'dia')
+        verbose_name = "Rotación diaria"
+        verbose_name_plural = "Rotación diaria"
+
+    def __str__(self):
+        return f"{self.producto_id} {self.dia}: {self.movimientos}"
+
+
+class RotacionProducto(models.Model):
+    VENTANAS = (7, 30, 90)
+
+    producto = models.OneToOneField("Producto", on_delete=models.CASCADE, primary_key=True, related_name='rotacion')
+    movimientos_7d = models.PositiveIntegerField(default=0, db_index=True)
+    movimientos_30d = models.PositiveIntegerField(default=0, db_index=True)
+    movimientos_90d = models.PositiveIntegerField(default=0, db_index=True)
+    movimientos_total = models.PositiveIntegerField(default=0, db_index=True)
+    ultimo_movimiento = models.DateTimeField(null=True, blank=True)
+    # Día en que se recalcularon las ventanas por última vez (actualizar_rotacion)
+    recalculado = models.DateField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Rotación de producto"
+        verbose_name_plural = "Rotación de productos"
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.movimientos_30d} movimientos en 30 días"
+
+
+
+#Contador de códigos de barras generados por simbología y tamaño de etiqueta (inventario.codigos)
+class SecuenciaCodigo(models.Model):
+    clave = models.CharField(max_length=40, primary_key=True)  # p. ej. "code128-chica"
+    ultimo = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Secuencia de códigos"
+        verbose_name_plural = "Secuencias de códigos"
+
+    def __str__(self):
+        return f"{self.clave}: {self.ultimo}"
+
+
+
+#Vista desnormalizada de un producto para pantallas de solo lectura (inventario.lectura); la regeneran las señales
+class ProductoLectura(models.Model):
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='lectura')
+    # Ruta de categoría, temporadas, atributos, dueño y existencias por ubicación (ver lectura.armar)
+    datos = models.JSONField(default=dict)
+    actualizado = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Producto (lectura)"
+        verbose_name_plural = "Productos (lectura)"
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.datos.get('nombre', '')}"
+
+
+
+#Reportes PDF generados en segundo plano (comando procesar_reportes) y descargados desde MEDIA_ROOT
+class ReporteJob(models.Model):
+    TIPOS = [
+        ('general', 'Inventario general'),
+        ('movimientos', 'Movimientos'),
+        ('resumen_movimientos', 'Resumen de movimientos'),
+        ('reabastecimiento', 'Sugerencias de reabastecimiento'),
+        ('criticos', 'Productos bajo stock'),
+    ]
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('terminado', 'Terminado'),
+        ('error', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPOS)
+    filtros = models.JSONField(default=dict, blank=True)
+    # Hash de tipo + filtros: dos solicitudes iguales pendientes comparten el mismo trabajo
+    clave = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', db_index=True)
+    progreso = models.PositiveSmallIntegerField(default=0)
+    archivo = models.FileField(upload_to='reportes/', blank=True)
+    error = models.TextField(blank=True)
+    solicitado_por = models.ForeignKey(
+        "tienda.Usuario",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes_solicitados'
+    )
+    usuario_nombre = models.CharField(max_length=150, blank=True)  # nombre impreso en el PDF
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-creado']
+        verbose_name = "Reporte en segundo plano"
+        verbose_name_plural = "Reportes en segundo plano"
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.estado}, {self.progreso}%)"
+
+
+
+#Totales diarios de movimientos (comando resumir_movimientos) para reportes históricos sin leer cada movimiento
+class ResumenMovimientoDiario(models.Model):
+    dia = models.DateField(db_index=True)
+    producto = models.ForeignKey("Producto", on_delete=models.CASCADE, related_name='resumen_diario')
+    # destino en entradas y ajustes, origen en salidas
+    ubicacion = models.ForeignKey("Ubicacion", on_delete=models.SET_NULL, null=True, blank=True, related_name='resumen_diario')
+    tipo = models.CharField(max_length=20, choices=MovimientoInventario.TIPO_MOVIMIENTO)
+    motivo = models.CharField(max_length=30, blank=True, default='')  # '' cuando el movimiento no tiene motivo
+    cantidad = models.PositiveBigIntegerField(default=0)
+    movimientos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('dia', 'producto', 'ubicacion', 'tipo', 'motivo')
+        indexes = [
+            models.Index(fields=['producto', 'dia'], name='resumen_producto_dia_idx'),
+        ]
+        verbose_name = "Resumen diario de movimientos"
+        verbose_name_plural = "Resumen diario de movimientos"
+
+    def __str__(self):
+        return f"{self.dia} {self.producto_id} {self.tipo}: {self.cantidad}"
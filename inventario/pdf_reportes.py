@@ -0,0 +1,230 @@
+import logging
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Plantilla común de los reportes PDF
+# -----------------------------
+# HojaReporte dibuja el encabezado (logo, empresa, usuario, fecha), numera las páginas y
+# tiene una primitiva de tabla: los anchos de columna se miden con stringWidth sobre el
+# encabezado y las primeras filas, el texto que no cabe se recorta con "…" y el encabezado
+# de la tabla se repite en cada página. El logo se decodifica una sola vez por proceso.
+
+LOGO = Path(settings.BASE_DIR) / "static" / "img" / "logotienda.png"
+EMPRESA = "Comercializadora Modelo"
+
+FUENTE = "Helvetica"
+FUENTE_NEGRITA = "Helvetica-Bold"
+TAMAÑO = 9
+ALTO_FILA = 15
+RELLENO = 2       # espacio entre el borde de la celda y el texto
+MARGEN = 50
+MUESTRA = 200     # filas que se miden para calcular los anchos
+
+
+@lru_cache(maxsize=None)
+def logo():
+    """ImageReader del logo ya decodificado (None si el archivo no existe o no es una imagen)."""
+    try:
+        imagen = ImageReader(str(LOGO))
+        imagen.getSize()  # fuerza la lectura aquí y no en el primer drawImage
+        return imagen
+    except OSError as e:
+        logger.warning("No se pudo cargar el logo de los reportes (%s): %s", LOGO, e)
+        return None
+
+
+# Ancho del glifo más ancho de Helvetica ("@", 1015/1000 em): si len(texto) * esto cabe, no hay que medir
+ANCHO_MAXIMO_GLIFO = 1.015
+
+
+@lru_cache(maxsize=8192)
+def ancho_texto(texto, fuente=FUENTE, tamaño=TAMAÑO):
+    """stringWidth con caché: categorías, ubicaciones, tipos y fechas se repiten fila tras fila."""
+    return stringWidth(texto, fuente, tamaño)
+
+
+def recortar(texto, ancho, fuente=FUENTE, tamaño=TAMAÑO):
+    """Texto que cabe en `ancho` puntos; si no cabe completo termina en '…'."""
+    if len(texto) * ANCHO_MAXIMO_GLIFO * tamaño <= ancho:
+        return texto
+    completo = ancho_texto(texto, fuente, tamaño)
+    if completo <= ancho:
+        return texto
+    # Se estima el corte por proporción y se ajusta de a un carácter (casi siempre 1 o 2 medidas)
+    ancho -= ancho_texto("…", fuente, tamaño)
+    corte = max(int(len(texto) * ancho / completo), 0)
+    while corte > 0 and stringWidth(texto[:corte], fuente, tamaño) > ancho:
+        corte -= 1
+    while corte < len(texto) and stringWidth(texto[:corte + 1], fuente, tamaño) <= ancho:
+        corte += 1
+    return texto[:corte].rstrip() + "…"
+
+
+def medir_columnas(encabezados, filas, disponible):
+    """
+    Anchos de columna proporcionales al texto más ancho de cada una (encabezado en negrita
+    incluido). Si no caben, se reducen solo las columnas más anchas que el reparto parejo.
+    """
+    naturales = [ancho_texto(str(e), FUENTE_NEGRITA) + 2 * RELLENO for e in encabezados]
+    for fila in filas:
+        for i, valor in enumerate(fila):
+            naturales[i] = max(naturales[i], ancho_texto(_texto(valor)) + 2 * RELLENO)
+
+    total = sum(naturales)
+    if total <= disponible:
+        extra = (disponible - total) / len(naturales)
+        return [ancho + extra for ancho in naturales]
+
+    # Las columnas angostas se quedan como están; las anchas se reparten el resto
+    anchos = list(naturales)
+    angostas = set()
+    while True:
+        restante = disponible - sum(anchos[i] for i in angostas)
+        anchas = [i for i in range(len(anchos)) if i not in angostas]
+        parejo = restante / len(anchas)
+        nuevas = {i for i in anchas if naturales[i] <= parejo}
+        if not nuevas or len(nuevas) == len(anchas):
+            break
+        angostas |= nuevas
+    suma_anchas = sum(naturales[i] for i in anchas)
+    for i in anchas:
+        anchos[i] = restante * naturales[i] / suma_anchas
+    return anchos
+
+
+def _texto(valor):
+    if valor is None:
+        return "-"
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y %H:%M")
+    if isinstance(valor, float):
+        return f"{valor:.2f}".rstrip("0").rstrip(".")
+    return str(valor)
+
+
+class HojaReporte:
+    """
+    Canvas de un reporte con la plantilla de la tienda.
+    Uso: hoja = HojaReporte(archivo, usuario); hoja.linea(...); hoja.tabla(...); hoja.terminar()
+    """
+
+    def __init__(self, archivo, usuario, pagesize=A4, detalles=()):
+        self.c = canvas.Canvas(archivo, pagesize=pagesize)
+        self.ancho, self.alto = pagesize
+        self.pagina = 1
+        self._encabezado(usuario, detalles)
+        self.y = self.alto - 120
+        self._inicio_tabla = self.y
+
+    def _encabezado(self, usuario, detalles):
+        c, ancho, alto = self.c, self.ancho, self.alto
+        imagen = logo()
+        if imagen is not None:
+            c.drawImage(imagen, MARGEN, alto - 80, width=60, height=60, preserveAspectRatio=True, mask="auto")
+
+        c.setFont(FUENTE_NEGRITA, 16)
+        c.drawRightString(ancho - MARGEN, alto - 50, EMPRESA)
+
+        c.setFont(FUENTE, 10)
+        renglones = [f"Reporte generado por: {usuario}", f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}"]
+        for i, texto in enumerate(renglones + list(detalles)):
+            c.drawRightString(ancho - MARGEN, alto - 70 - 15 * i, texto)
+
+    def linea(self, texto, fuente="Helvetica-Oblique", tamaño=10):
+        """Renglón de texto a lo ancho de la hoja (recortado si no cabe)."""
+        self.c.setFont(fuente, tamaño)
+        self.c.drawString(MARGEN, self.y, recortar(texto, self.ancho - 2 * MARGEN, fuente, tamaño))
+        self.y -= tamaño + 6
+
+    def espacio(self, puntos):
+        self.y -= puntos
+
+    def nueva_pagina(self):
+        self._pie()
+        self.c.showPage()
+        self.pagina += 1
+        self.y = self.alto - 100
+
+    def _pie(self):
+        self.c.setFont(FUENTE, 9)
+        self.c.drawRightString(self.ancho - 30, 20, f"Página {self.pagina}")
+
+    def tabla(self, encabezados, filas, anchos=None, progreso=None):
+        """
+        Dibuja una tabla con las filas (listas de valores) de cualquier iterable, sin cargarlas todas.
+        anchos: lista fija en puntos; si no se da, se miden con las primeras MUESTRA filas.
+        Los números se alinean a la derecha. progreso(filas) se llama cada 1000 filas.
+        Devuelve el número de filas dibujadas.
+        """
+        filas = iter(filas)
+        muestra = list(islice(filas, MUESTRA))
+        if anchos is None:
+            anchos = medir_columnas(encabezados, muestra, self.ancho - 2 * MARGEN)
+
+        posiciones = [MARGEN]
+        for ancho in anchos:
+            posiciones.append(posiciones[-1] + ancho)
+
+        self._fila_encabezado(encabezados, anchos, posiciones)
+        dibujadas = 0
+        for lote in (muestra, filas):
+            for fila in lote:
+                if self.y < 80:
+                    self._cuadricula(posiciones)
+                    self.nueva_pagina()
+                    self._fila_encabezado(encabezados, anchos, posiciones)
+                self._fila(fila, anchos, posiciones, FUENTE)
+                dibujadas += 1
+                if progreso and dibujadas % 1000 == 0:
+                    progreso(dibujadas)
+        self._cuadricula(posiciones)
+        return dibujadas
+
+    def _fila_encabezado(self, encabezados, anchos, posiciones):
+        self._inicio_tabla = self.y + ALTO_FILA
+        self._fila(encabezados, anchos, posiciones, FUENTE_NEGRITA)
+
+    def _cuadricula(self, posiciones):
+        """Líneas de la tabla en la página actual, en un solo trazo (no un rect por celda)."""
+        arriba, abajo = self._inicio_tabla, self.y + ALTO_FILA
+        renglones = round((arriba - abajo) / ALTO_FILA)
+        horizontales = [
+            (posiciones[0], arriba - i * ALTO_FILA, posiciones[-1], arriba - i * ALTO_FILA)
+            for i in range(renglones + 1)
+        ]
+        verticales = [(x, abajo, x, arriba) for x in posiciones]
+        self.c.lines(horizontales + verticales)
+
+    def _fila(self, celdas, anchos, posiciones, fuente):
+        y = self.y
+        # Todas las celdas en un solo objeto de texto (un BT/ET por fila y no por celda)
+        texto_fila = self.c.beginText()
+        texto_fila.setFont(fuente, TAMAÑO)
+        for valor, ancho, x in zip(celdas, anchos, posiciones):
+            texto = recortar(_texto(valor), ancho - 2 * RELLENO, fuente)
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                x += ancho - RELLENO - ancho_texto(texto, fuente)
+            else:
+                x += RELLENO
+            texto_fila.setTextOrigin(x, y + 3)
+            texto_fila.textOut(texto)
+        self.c.drawText(texto_fila)
+        self.y -= ALTO_FILA
+
+    def terminar(self):
+        """Numera la última página y escribe el PDF."""
+        self._pie()
+        self.c.showPage()
+        self.c.save()
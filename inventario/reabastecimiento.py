@@ -0,0 +1,166 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Inventario, MovimientoInventario, Producto, ResumenMovimientoDiario, Ubicacion
+from .resumen_diario import cerrado_hasta, inicio_del_dia
+
+
+# -----------------------------
+# Sugerencias de reabastecimiento
+# -----------------------------
+# Se arma una matriz productos × días con las ventas (salidas con motivo 'venta') de los
+# últimos HISTORIA días y se pronostica la demanda diaria de todos los productos a la vez
+# con NumPy (promedio móvil o suavizado exponencial simple). Con esa demanda:
+#   transferir = lo que falta en Piso para DIAS_PISO días (o su mínimo), limitado a lo que hay en Bodega Interna
+#   comprar    = lo que falta entre Piso y Bodega Interna para DIAS_COMPRA días
+# Los días cerrados se leen de ResumenMovimientoDiario y solo los posteriores de MovimientoInventario.
+
+HISTORIA = getattr(settings, "INVENTARIO_REABASTO_DIAS_HISTORIA", 56)
+VENTANA = getattr(settings, "INVENTARIO_REABASTO_VENTANA", 28)  # días del promedio móvil
+ALFA = getattr(settings, "INVENTARIO_REABASTO_ALFA", 0.3)       # peso del día más reciente en el suavizado
+DIAS_PISO = getattr(settings, "INVENTARIO_REABASTO_DIAS_PISO", 7)
+DIAS_COMPRA = getattr(settings, "INVENTARIO_REABASTO_DIAS_COMPRA", 30)
+UBICACION_PISO = getattr(settings, "INVENTARIO_UBICACION_PISO", "Piso")
+UBICACION_BODEGA = getattr(settings, "INVENTARIO_UBICACION_BODEGA", "Bodega Interna")
+
+METODOS = ("promedio", "suavizado")
+VENTAS = {"tipo": "salida", "motivo": "venta"}
+LOTE_IDS = 5000
+
+
+def ventas_diarias(filtro, desde, hasta):
+    """(producto_id, día, piezas vendidas) de los días [desde, hasta]."""
+    corte = cerrado_hasta()
+    if corte is not None and corte >= desde:
+        yield from (
+            ResumenMovimientoDiario.objects
+            .filter(filtro, dia__gte=desde, dia__lte=min(corte, hasta), **VENTAS)
+            .values_list("producto_id", "dia")
+            .annotate(total=Sum("cantidad"))
+            .order_by()
+            .iterator(chunk_size=10000)
+        )
+        desde = corte + timedelta(days=1)
+    if desde <= hasta:
+        yield from (
+            MovimientoInventario.objects
+            .filter(filtro, fecha__gte=inicio_del_dia(desde), fecha__lt=inicio_del_dia(hasta + timedelta(days=1)), **VENTAS)
+            .annotate(dia=TruncDate("fecha"))
+            .values_list("producto_id", "dia")
+            .annotate(total=Sum("cantidad"))
+            .order_by()
+            .iterator(chunk_size=10000)
+        )
+
+
+def pronosticar(matriz, metodo="promedio"):
+    """Demanda diaria esperada por fila de `matriz` (productos × días, del más viejo al más reciente)."""
+    dias = matriz.shape[1]
+    if metodo == "suavizado":
+        # nivel_t = ALFA * x_t + (1 - ALFA) * nivel_(t-1), con nivel_0 = x_0, desarrollado
+        # como un solo producto matriz · pesos en lugar de recorrer los días
+        pesos = ALFA * (1 - ALFA) ** np.arange(dias - 1, -1, -1, dtype=float)
+        pesos[0] = (1 - ALFA) ** (dias - 1)
+        return matriz @ pesos
+    return matriz[:, -VENTANA:].mean(axis=1)
+
+
+def sugerencias(filtro, metodo="promedio", hoy=None):
+    """
+    Lista de dicts (uno por producto con algo que transferir o comprar), ordenada por
+    días de cobertura en Piso. `filtro` es un Q con prefijo 'producto__' (reports.filtro_productos).
+    """
+    hoy = hoy or timezone.localdate()
+    desde, hasta = hoy - timedelta(days=HISTORIA), hoy - timedelta(days=1)
+    ubicaciones = dict(Ubicacion.objects.filter(nombre__in=[UBICACION_PISO, UBICACION_BODEGA]).values_list("nombre", "id"))
+    piso_id, bodega_id = ubicaciones.get(UBICACION_PISO), ubicaciones.get(UBICACION_BODEGA)
+
+    # --- Ventas por (producto, día) ---
+    v_producto, v_dia, v_total = [], [], []
+    for producto_id, dia, total in ventas_diarias(filtro, desde, hasta):
+        v_producto.append(producto_id)
+        v_dia.append((dia - desde).days)
+        v_total.append(total)
+
+    # --- Existencias en Piso y Bodega Interna (con el mínimo de Piso si tiene punto de reorden) ---
+    s_producto, s_piso, s_cantidad, s_minimo = [], [], [], []
+    existencias = (
+        Inventario.objects
+        .filter(filtro, ubicacion_id__in=[i for i in (piso_id, bodega_id) if i])
+        .values_list("producto_id", "ubicacion_id", "cantidad_actual", "punto_reorden__minimo")
+        .order_by()
+    )
+    for producto_id, ubicacion_id, cantidad, minimo in existencias.iterator(chunk_size=10000):
+        s_producto.append(producto_id)
+        s_piso.append(ubicacion_id == piso_id)
+        s_cantidad.append(cantidad)
+        s_minimo.append(minimo or 0)
+
+    productos = np.unique(np.array(v_producto + s_producto, dtype=np.int64))
+    if not len(productos):
+        return []
+
+    matriz = np.zeros((len(productos), HISTORIA), dtype=float)
+    np.add.at(matriz, (np.searchsorted(productos, v_producto), np.array(v_dia, dtype=np.int64)), v_total)
+
+    filas_stock = np.searchsorted(productos, np.array(s_producto, dtype=np.int64))
+    en_piso = np.array(s_piso, dtype=bool)
+    cantidades = np.array(s_cantidad, dtype=float)
+    piso = np.zeros(len(productos))
+    bodega = np.zeros(len(productos))
+    minimo_piso = np.zeros(len(productos))
+    np.add.at(piso, filas_stock[en_piso], cantidades[en_piso])
+    np.add.at(bodega, filas_stock[~en_piso], cantidades[~en_piso])
+    np.maximum.at(minimo_piso, filas_stock[en_piso], np.array(s_minimo, dtype=float)[en_piso])
+
+    # --- Pronóstico y cantidades sugeridas (todos los productos a la vez) ---
+    demanda = pronosticar(matriz, metodo)
+    objetivo_piso = np.maximum(np.ceil(demanda * DIAS_PISO), minimo_piso) if piso_id else piso
+    transferir = np.clip(objetivo_piso - piso, 0, bodega)
+    comprar = np.maximum(np.ceil(demanda * DIAS_COMPRA) - piso - bodega, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cobertura = np.where(demanda > 0, piso / demanda, np.inf)
+
+    seleccion = np.flatnonzero((transferir > 0) | (comprar > 0))
+    seleccion = seleccion[np.lexsort((productos[seleccion], cobertura[seleccion]))]
+    if not len(seleccion):
+        return []
+
+    nombres = _datos_productos(productos[seleccion].tolist())
+    return [
+        {
+            "producto_id": int(productos[i]),
+            **nombres.get(int(productos[i]), {}),
+            "demanda_diaria": round(float(demanda[i]), 2),
+            "stock_piso": int(piso[i]),
+            "stock_bodega": int(bodega[i]),
+            "dias_cobertura": round(float(cobertura[i]), 1) if np.isfinite(cobertura[i]) else None,
+            "transferir": int(transferir[i]),
+            "comprar": int(comprar[i]),
+        }
+        for i in seleccion
+    ]
+
+
+def _datos_productos(ids):
+    datos = {}
+    for inicio in range(0, len(ids), LOTE_IDS):
+        filas = (
+            Producto.objects
+            .filter(id__in=ids[inicio:inicio + LOTE_IDS])
+            .values(
+                "id",
+                producto_nombre=F("nombre"),
+                dueño_nombre=F("dueño__user__username"),
+                categoria_nombre=F("categoria__padre__nombre"),
+                subcategoria_nombre=F("categoria__nombre"),
+            )
+        )
+        for fila in filas:
+            datos[fila.pop("id")] = fila
+    return datos
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Inventario, MovimientoInventario, PuntoReorden
+from .resumen_diario import inicio_del_dia
+
+
+# -----------------------------
+# Stock crítico y puntos de reorden
+# -----------------------------
+# Una existencia (Inventario) es crítica si cantidad_actual <= su mínimo: el de su
+# PuntoReorden o INVENTARIO_STOCK_MINIMO si no tiene. Los días de cobertura salen de
+# la salida diaria promedio que actualizar_reorden precalcula una vez al día.
+# El dashboard y el PDF de críticos usan la misma consulta (criticos).
+
+STOCK_MINIMO = getattr(settings, "INVENTARIO_STOCK_MINIMO", 100)
+# Días de salidas que se promedian para la velocidad
+DIAS_VELOCIDAD = getattr(settings, "INVENTARIO_REORDEN_DIAS", 30)
+
+
+def tope_minimo():
+    """Mayor mínimo posible: acota la consulta a un rango de cantidad_actual que usa el índice."""
+    maximo = PuntoReorden.objects.aggregate(tope=Max("minimo"))["tope"]
+    return max(STOCK_MINIMO, maximo or 0)
+
+
+def criticos(ubicacion_id=None):
+    """
+    Existencias en o por debajo de su mínimo, con producto y ubicación en el mismo SELECT.
+    Ordenadas por días de cobertura (las que se acaban primero) y luego por stock.
+    """
+    minimo = Coalesce(F("punto_reorden__minimo"), Value(STOCK_MINIMO))
+    salida = F("punto_reorden__salida_diaria")
+
+    qs = Inventario.objects.filter(cantidad_actual__lte=tope_minimo())
+    if ubicacion_id:
+        qs = qs.filter(ubicacion_id=ubicacion_id)
+
+    return (
+        qs
+        .annotate(minimo=minimo)
+        .filter(cantidad_actual__lte=F("minimo"))
+        .annotate(
+            maximo=F("punto_reorden__maximo"),
+            salida_diaria=Coalesce(salida, Value(0.0)),
+            dias_cobertura=Case(
+                When(punto_reorden__salida_diaria__gt=0, then=F("cantidad_actual") * 1.0 / salida),
+                default=None,
+                output_field=FloatField(),
+            ),
+            # Piezas para llegar al máximo (o al mínimo si no hay máximo)
+            sugerido=Greatest(Coalesce(F("punto_reorden__maximo"), F("minimo")) - F("cantidad_actual"), Value(0)),
+        )
+        .values(
+            "id", "producto_id", "ubicacion_id", "cantidad_actual",
+            "minimo", "maximo", "salida_diaria", "dias_cobertura", "sugerido",
+            producto_nombre=F("producto__nombre"),
+            ubicacion_nombre=F("ubicacion__nombre"),
+        )
+        .order_by(F("dias_cobertura").asc(nulls_last=True), "cantidad_actual", "id")
+    )
+
+
+def recalcular_salida_diaria(dias=DIAS_VELOCIDAD, hoy=None):
+    """
+    Promedio de piezas que salen por día de cada existencia en los últimos `dias` días completos.
+    Un solo GROUP BY sobre las salidas (índice mov_tipo_fecha_idx) y bulk_update por lotes.
+    """
+    if dias < 1:
+        raise ValueError("Se necesita al menos un día de salidas para calcular el promedio.")
+    hoy = hoy or timezone.localdate()
+    salidas = (
+        MovimientoInventario.objects
+        .filter(
+            tipo="salida",
+            fecha__gte=inicio_del_dia(hoy - timedelta(days=dias)),
+            fecha__lt=inicio_del_dia(hoy),
+        )
+        .values("producto_id", "origen_id")
+        .annotate(total=Sum("cantidad"))
+        .order_by()
+    )
+    velocidad = {(f["producto_id"], f["origen_id"]): f["total"] / dias for f in salidas}
+
+    with transaction.atomic():
+        # Toda existencia tiene su punto de reorden (sin mínimo propio = INVENTARIO_STOCK_MINIMO)
+        PuntoReorden.objects.bulk_create(
+            [PuntoReorden(inventario_id=i) for i in Inventario.objects.values_list("id", flat=True)],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        puntos = (
+            PuntoReorden.objects
+            .values_list("inventario_id", "inventario__producto_id", "inventario__ubicacion_id", "salida_diaria")
+        )
+        cambios = []
+        for inventario_id, producto_id, ubicacion_id, anterior in puntos.iterator(chunk_size=5000):
+            nueva = velocidad.get((producto_id, ubicacion_id), 0.0)
+            if nueva != anterior:
+                cambios.append(PuntoReorden(inventario_id=inventario_id, salida_diaria=nueva, recalculado=hoy))
+        PuntoReorden.objects.bulk_update(cambios, ["salida_diaria", "recalculado"], batch_size=1000)
+        PuntoReorden.objects.exclude(recalculado=hoy).update(recalculado=hoy)
+    return len(cambios)
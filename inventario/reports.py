@@ -1,50 +1,92 @@
-from django.db.models import Sum, F
+from django.db.models import Q, Sum, F
 from .models import Producto, Inventario, MovimientoInventario
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import mm 
-from datetime import datetime
-from django.http import HttpResponse
+from datetime import datetime, timedelta
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.conf import settings
+import csv
 from django.contrib.postgres.aggregates import ArrayAgg
-from .models import Categoria, Atributo, Producto, ValorAtributo, Ubicacion, Empleado, Inventario, Temporada, MovimientoInventario
+from reportlab.graphics import shapes
+from reportlab.graphics.barcode import code128
+from reportlab.graphics.barcode.eanbc import Ean13BarcodeWidget
+from tempfile import SpooledTemporaryFile
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from .models import Categoria, Atributo, Producto, ValorAtributo, Ubicacion, Empleado, Inventario, Temporada, MovimientoInventario, ResumenMovimientoDiario
+from . import reabastecimiento, reorden, resumen_diario
+from .pdf_reportes import HojaReporte
 
 
 # -----------------------------
 # Helper para filtros
 # -----------------------------
-def filtrar_productos(categoria_id=None, subcategoria_id=None,
-                      temporada_id=None, dueño_id=None):
+def filtro_productos(categoria_id=None, subcategoria_id=None,
+                     temporada_id=None, dueño_id=None, prefijo="producto__"):
     """
-    Devuelve un queryset de productos filtrado según los parámetros recibidos.
-    - categoria_id: ID de la categoría padre
-    - subcategoria_id: ID de la subcategoría
-    - temporada_id: ID de la temporada (M2M)
-    - dueño_id: ID del dueño (Empleado)
+    Q con los filtros de producto para aplicarse directo sobre Inventario o
+    MovimientoInventario (prefijo 'producto__') o sobre Producto (prefijo '').
+    Se filtra por el join en la misma consulta, sin subconsulta producto__in ni DISTINCT:
+    temporada es un solo id, así que el join M2M no duplica filas.
     """
-
-    qs = (
-        Producto.objects
-        .select_related("categoria", "dueño")   # relaciones directas
-        .prefetch_related("temporada")          # relación M2M
-    )
+    q = Q()
 
     # Filtrar por categoría padre
     if categoria_id:
-        qs = qs.filter(categoria__padre_id=categoria_id)
+        q &= Q(**{f"{prefijo}categoria__padre_id": categoria_id})
 
     # Filtrar por subcategoría
     if subcategoria_id:
-        qs = qs.filter(categoria_id=subcategoria_id)
+        q &= Q(**{f"{prefijo}categoria_id": subcategoria_id})
 
     # Filtrar por temporada (M2M)
     if temporada_id:
-        qs = qs.filter(temporada__id=temporada_id)
+        q &= Q(**{f"{prefijo}temporada__id": temporada_id})
 
     # Filtrar por dueño
     if dueño_id:
-        qs = qs.filter(dueño_id=dueño_id)
+        q &= Q(**{f"{prefijo}dueño_id": dueño_id})
+
+    return q
 
-    return qs.distinct()
+
+def filtro_fechas(desde=None, hasta=None):
+    """
+    Q por rango de días sobre MovimientoInventario.fecha (ambos extremos inclusive).
+    Se compara contra el inicio de cada día local para que el índice por fecha siga sirviendo.
+    """
+    q = Q()
+    if desde:
+        q &= Q(fecha__gte=resumen_diario.inicio_del_dia(_como_fecha(desde)))
+    if hasta:
+        q &= Q(fecha__lt=resumen_diario.inicio_del_dia(_como_fecha(hasta) + timedelta(days=1)))
+    return q
+
+
+def _como_fecha(valor):
+    return parse_date(valor) if isinstance(valor, str) else valor
+
+
+def filtrar_productos(categoria_id=None, subcategoria_id=None,
+                      temporada_id=None, dueño_id=None):
+    """
+    Devuelve un queryset de productos filtrado según los parámetros recibidos.
+    - categoria_id: ID de la categoría padre
+    - subcategoria_id: ID de la subcategoría
+    - temporada_id: ID de la temporada (M2M)
+    - dueño_id: ID del dueño (Empleado)
+    """
+
+    return (
+        Producto.objects
+        .select_related("categoria", "dueño")   # relaciones directas
+        .prefetch_related("temporada")          # relación M2M
+        .filter(filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id, prefijo=""))
+    )
 
 
 def parse_filtros(request):
@@ -60,11 +102,23 @@ def parse_filtros(request):
         except (ValueError, TypeError):
             return None
 
+    def to_fecha(value):
+        # Se guarda como texto AAAA-MM-DD: los filtros también son clave de caché y JSON de ReporteJob
+        try:
+            fecha = parse_date((value or "").strip())
+        except ValueError:
+            return None
+        return fecha.isoformat() if fecha else None
+
     # Tipo de reporte: solo aceptamos los definidos
     tipo = (request.GET.get("tipo") or "general").strip()
-    if tipo not in {"general", "movimientos", "resumen_movimientos"}:
+    if tipo not in {"general", "movimientos", "resumen_movimientos", "reabastecimiento"}:
         tipo = "general"
 
+    pronostico = (request.GET.get("pronostico") or "").strip()
+    if pronostico not in reabastecimiento.METODOS:
+        pronostico = None
+
     return {
         "ubicacion": to_int(request.GET.get("ubicacion")),       # FK → Ubicacion.id
         "categoria": to_int(request.GET.get("categoria")),       # FK → Categoria.id (padre)
@@ -72,6 +126,9 @@ def parse_filtros(request):
         "temporada": to_int(request.GET.get("temporada")),       # FK → Temporada.id (M2M)
         "dueño": to_int(request.GET.get("dueño")),               # FK → Empleado.id
         "movimiento": (request.GET.get("movimiento") or "").strip(),  # campo tipo/motivo en MovimientoInventario
+        "desde": to_fecha(request.GET.get("desde")),             # día inicial (inclusive) de los movimientos
+        "hasta": to_fecha(request.GET.get("hasta")),             # día final (inclusive) de los movimientos
+        "pronostico": pronostico,                                # método de reabastecimiento (promedio/suavizado)
         "tipo": tipo,
     }
 
@@ -84,21 +141,19 @@ def parse_filtros(request):
 
 def inventario_general(categoria_id=None, subcategoria_id=None,
                        temporada_id=None, dueño_id=None, ubicacion_id=None):
-    # Filtrar productos según los parámetros
-    productos = filtrar_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
-
-    inventario = (
-        Inventario.objects
-        .filter(producto__in=productos)
-        .select_related("producto__categoria__padre", "producto__dueño", "ubicacion")
-        .prefetch_related("producto__temporada")
-    )
+    filtro = filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
+    filas = list(_consulta_inventario_general(filtro, ubicacion_id))
+    return _con_temporadas(filas, "producto_id")
+
+
+def _consulta_inventario_general(filtro, ubicacion_id=None):
+    inventario = Inventario.objects.filter(filtro)
 
     # ✅ aplicar filtro de ubicación si está presente
     if ubicacion_id:
         inventario = inventario.filter(ubicacion_id=ubicacion_id)
 
-    qs = (
+    return (
         inventario
         .values(
             "producto_id",   # FK real en Inventario
@@ -113,46 +168,74 @@ def inventario_general(categoria_id=None, subcategoria_id=None,
         .order_by("producto__nombre")
     )
 
-    # Resolver temporadas sin N+1
-    producto_map = {
-        p.id: ", ".join([t.nombre for t in p.temporada.all()]) or "N/A"
-        for p in productos
-    }
-    for item in qs:
-        item["temporada_nombres"] = producto_map.get(item["producto_id"], "N/A")
 
-    return qs
 
 
 
 
 
+def movimientos_por_tipo(tipo=None, categoria_id=None, subcategoria_id=None,
+                         temporada_id=None, dueño_id=None, desde=None, hasta=None):
+    filtro = filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id) & filtro_fechas(desde, hasta)
+    filas = list(_consulta_movimientos(filtro, tipo))
+    return _con_temporadas(filas, "producto_id")
 
 
-def movimientos_por_tipo(tipo=None, categoria_id=None, subcategoria_id=None,
-                         temporada_id=None, dueño_id=None):
-    # Filtrar productos según los parámetros
-    productos = filtrar_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
-
-    queryset = (
-        MovimientoInventario.objects
-        .filter(producto__in=productos)
-        .select_related(
-            "producto__categoria__padre",
-            "producto__dueño__user",
-            "origen",
-            "destino"
-        )
-        .prefetch_related("producto__temporada")
-    )
+# Movimientos por página en el reporte HTML
+MOVIMIENTOS_POR_PAGINA = 100
+
+
+def pagina_movimientos(tipo=None, categoria_id=None, subcategoria_id=None,
+                       temporada_id=None, dueño_id=None, desde=None, hasta=None,
+                       despues=None, limite=MOVIMIENTOS_POR_PAGINA):
+    """
+    Una página de movimientos (más recientes primero) con paginación por llave (fecha, id):
+    en lugar de OFFSET se piden los movimientos anteriores al último de la página previa,
+    así cada página lee solo `limite` filas del índice mov_fecha_id_idx sin importar qué tan atrás esté.
+    despues: cursor devuelto por la página anterior (None para la primera).
+    Devuelve {"filas": [...], "siguiente": cursor o None si ya no hay más}.
+    """
+    filtro = filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id) & filtro_fechas(desde, hasta)
+    qs = _consulta_movimientos(filtro, tipo)
+
+    llave = leer_cursor(despues)
+    if llave:
+        fecha, mov_id = llave
+        # fecha <= x va aparte para que el planificador lo use como rango sobre el índice
+        qs = qs.filter(Q(fecha__lte=fecha), Q(fecha__lt=fecha) | Q(id__lt=mov_id))
+
+    filas = list(qs[:limite + 1])
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = f"{filas[-1]['fecha'].isoformat()}_{filas[-1]['id']}"
+    return {"filas": _con_temporadas(filas, "producto_id"), "siguiente": siguiente}
+
+
+def leer_cursor(cursor):
+    """(fecha, id) de un cursor 'fecha-iso_id'; None si falta o no es válido."""
+    fecha, _, mov_id = (cursor or "").rpartition("_")
+    try:
+        fecha = datetime.fromisoformat(fecha)
+        mov_id = int(mov_id)
+    except ValueError:
+        return None
+    if settings.USE_TZ and timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha, mov_id
+
+
+def _consulta_movimientos(filtro, tipo=None):
+    queryset = MovimientoInventario.objects.filter(filtro)
 
     # Filtro por tipo de movimiento (entrada, salida, ajuste, transferencia)
     if tipo:
         queryset = queryset.filter(tipo=tipo)
-        
-    qs = (
+
+    return (
         queryset
         .values(
+            "id",
             "producto_id",
             "tipo",       # campo directo
             "motivo",     # campo directo
@@ -166,63 +249,67 @@ def movimientos_por_tipo(tipo=None, categoria_id=None, subcategoria_id=None,
             destino_nombre=F("destino__nombre"),
         )
 
-        .order_by("-fecha")
+        .order_by("-fecha", "-id")  # desempate estable para la paginación, mismo orden que mov_fecha_id_idx
     )
 
 
-    # Resolver temporadas sin N+1
-    producto_map = {
-        p.id: ", ".join([t.nombre for t in p.temporada.all()]) or "N/A"
-        for p in productos
-    }
-    for item in qs:
-        item["temporada_nombres"] = producto_map.get(item["producto_id"], "N/A")
-
-    return qs
+def resumen_movimientos(categoria_id=None, subcategoria_id=None,
+                        temporada_id=None, dueño_id=None, desde=None, hasta=None):
+    filtro = filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
+    return _con_temporadas(_filas_resumen(filtro, desde, hasta), "producto__id")
 
 
-def resumen_movimientos(categoria_id=None, subcategoria_id=None,
-                        temporada_id=None, dueño_id=None):
-    productos = filtrar_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
-
-    movimientos = (
-        MovimientoInventario.objects
-        .filter(producto__in=productos)
-        .select_related(
-            'producto__categoria__padre',
-            'producto__dueño'
-        )
-        .prefetch_related('producto__temporada')
-    )
+CAMPOS_RESUMEN = (
+    'tipo',                                # campo real en MovimientoInventario
+    'producto__id',                        # id del producto
+    'producto__nombre',                    # nombre del producto
+    'producto__categoria__padre__nombre',  # categoría padre
+    'producto__categoria__nombre',         # subcategoría
+    "producto__dueño__user__username",     # nombre del dueño
+)
 
-    qs = (
-        movimientos
-        .values(
-            'tipo',                                # campo real en MovimientoInventario
-            'producto__id',                        # id del producto
-            'producto__nombre',                    # nombre del producto
-            'producto__categoria__padre__nombre',  # categoría padre
-            'producto__categoria__nombre',         # subcategoría
-            "producto__dueño__user__username",             # nombre del dueño (ajusta al campo real en Empleado)
-        )
-        .annotate(total=Sum('cantidad'))           # cantidad real del modelo
-        .order_by('tipo')
-    )
 
-    # Resolver temporadas sin N+1
-    producto_map = {
-        p.id: ", ".join([t.nombre for t in p.temporada.all()]) or "N/A"
-        for p in productos
-    }
-    for item in qs:
-        item["temporada_nombres"] = producto_map.get(item["producto__id"], "N/A")
-    return qs
+def _filas_resumen(filtro, desde=None, hasta=None):
+    """
+    Totales por (tipo, producto): ResumenMovimientoDiario hasta el último día resumido
+    y MovimientoInventario solo después (normalmente los movimientos de hoy).
+    """
+    corte = resumen_diario.cerrado_hasta()
+    movimientos = MovimientoInventario.objects.filter(filtro & filtro_fechas(desde, hasta))
+    partes = [movimientos]
+    if corte is not None:
+        dias = Q(dia__lte=corte)
+        if desde:
+            dias &= Q(dia__gte=_como_fecha(desde))
+        if hasta:
+            dias &= Q(dia__lte=_como_fecha(hasta))
+        partes = [
+            ResumenMovimientoDiario.objects.filter(filtro, dias),
+            movimientos.filter(fecha__gte=resumen_diario.inicio_del_dia(corte + timedelta(days=1))),
+        ]
+
+    filas = {}
+    for qs in partes:
+        for item in qs.values(*CAMPOS_RESUMEN).annotate(total=Sum('cantidad')).order_by():
+            clave = (item['tipo'], item['producto__id'])
+            if clave in filas:
+                filas[clave]['total'] += item['total']
+            else:
+                filas[clave] = item
+    return sorted(filas.values(), key=lambda item: (item['tipo'], item['producto__nombre']))
+
+
+def sugerencias_reabastecimiento(categoria_id=None, subcategoria_id=None,
+                                 temporada_id=None, dueño_id=None, pronostico=None):
+    filtro = filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
+    filas = reabastecimiento.sugerencias(filtro, pronostico or "promedio")
+    return _con_temporadas(filas, "producto_id")
 
 
 def total_global(categoria_id=None, subcategoria_id=None,
                  temporada_id=None, dueño_id=None):
-    productos = filtrar_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
-    inventario = Inventario.objects.filter(producto__in=productos)
+    # Mismo filtro que los reportes, sobre el join (sin volver a correr la subconsulta de productos)
+    inventario = Inventario.objects.filter(filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id))
     return inventario.aggregate(total=Sum('cantidad_actual'))['total'] or 0
 
 
@@ -237,7 +324,10 @@ def get_datos_reporte(tipo,
                       temporada_id=None,
                       ubicacion_id=None,
                       dueño_id=None,
-                      movimiento_tipo=None):
+                      movimiento_tipo=None,
+                      desde=None,
+                      hasta=None,
+                      pronostico=None):
     """
     Dispatcher central de reportes.
     Según el tipo, llama a la función correspondiente en reports.py
@@ -260,7 +350,9 @@ def get_datos_reporte(tipo,
             categoria_id=categoria_id,
             subcategoria_id=subcategoria_id,
             temporada_id=temporada_id,
-            dueño_id=dueño_id
+            dueño_id=dueño_id,
+            desde=desde,
+            hasta=hasta
         )
 
     elif tipo == 'resumen_movimientos':
@@ -269,13 +361,256 @@ def get_datos_reporte(tipo,
             categoria_id=categoria_id,
             subcategoria_id=subcategoria_id,
             temporada_id=temporada_id,
-            dueño_id=dueño_id
+            dueño_id=dueño_id,
+            desde=desde,
+            hasta=hasta
+        )
+
+    elif tipo == 'reabastecimiento':
+        # Transferencias Bodega Interna → Piso y compras sugeridas
+        return sugerencias_reabastecimiento(
+            categoria_id=categoria_id,
+            subcategoria_id=subcategoria_id,
+            temporada_id=temporada_id,
+            dueño_id=dueño_id,
+            pronostico=pronostico
         )
 
     # Si no coincide con ninguno, devuelve lista vacía
     return []
 
 
+# Máximo de ids por IN (...) al resolver temporadas (límite de parámetros de SQLite)
+LOTE_IDS = 5000
+
+
+def temporadas_por_producto(producto_ids):
+    """
+    {producto_id: "Temporada A, Temporada B"} solo para los ids dados, con una consulta
+    a la tabla intermedia por cada LOTE_IDS ids (una sola en reportes normales).
+    """
+    producto_ids = sorted(set(producto_ids))
+    nombres = {}
+    for inicio in range(0, len(producto_ids), LOTE_IDS):
+        filas = (
+            Producto.temporada.through.objects
+            .filter(producto_id__in=producto_ids[inicio:inicio + LOTE_IDS])
+            .order_by("producto_id", "temporada__nombre")
+            .values_list("producto_id", "temporada__nombre")
+        )
+        for producto_id, nombre in filas:
+            nombres.setdefault(producto_id, []).append(nombre)
+    return {producto_id: ", ".join(lista) for producto_id, lista in nombres.items()}
+
+
+def iterar_datos_reporte(tipo,
+                         categoria_id=None,
+                         subcategoria_id=None,
+                         temporada_id=None,
+                         ubicacion_id=None,
+                         dueño_id=None,
+                         movimiento_tipo=None,
+                         desde=None,
+                         hasta=None,
+                         pronostico=None,
+                         chunk_size=2000):
+    """
+    Igual que get_datos_reporte pero como generador: recorre la consulta con
+    .iterator(chunk_size) y resuelve las temporadas de cada lote, así la memoria
+    no crece con el número de filas (reportes de un año de movimientos).
+    """
+    qs, campo_producto = _consulta_reporte(
+        tipo, categoria_id, subcategoria_id, temporada_id, ubicacion_id, dueño_id, movimiento_tipo,
+        desde, hasta, pronostico
+    )
+    if qs is None:
+        return
+
+    # El resumen y el reabastecimiento ya vienen calculados como lista
+    filas = qs if isinstance(qs, list) else qs.iterator(chunk_size=chunk_size)
+    lote = []
+    for item in filas:
+        lote.append(item)
+        if len(lote) == chunk_size:
+            yield from _con_temporadas(lote, campo_producto)
+            lote = []
+    yield from _con_temporadas(lote, campo_producto)
+
+
+def contar_datos_reporte(tipo,
+                         categoria_id=None,
+                         subcategoria_id=None,
+                         temporada_id=None,
+                         ubicacion_id=None,
+                         dueño_id=None,
+                         movimiento_tipo=None,
+                         desde=None,
+                         hasta=None,
+                         pronostico=None):
+    """Número de filas que produce iterar_datos_reporte (para mostrar el progreso)."""
+    qs, _ = _consulta_reporte(
+        tipo, categoria_id, subcategoria_id, temporada_id, ubicacion_id, dueño_id, movimiento_tipo,
+        desde, hasta, pronostico
+    )
+    if qs is None:
+        return 0
+    return len(qs) if isinstance(qs, list) else qs.count()
+
+
+def _consulta_reporte(tipo, categoria_id, subcategoria_id, temporada_id,
+                      ubicacion_id, dueño_id, movimiento_tipo, desde=None, hasta=None, pronostico=None):
+    """(queryset de valores, campo con el id del producto) según el tipo de reporte."""
+    filtro = filtro_productos(categoria_id, subcategoria_id, temporada_id, dueño_id)
+
+    if tipo == 'general':
+        return _consulta_inventario_general(filtro, ubicacion_id), "producto_id"
+    elif tipo == 'movimientos':
+        return _consulta_movimientos(filtro & filtro_fechas(desde, hasta), movimiento_tipo), "producto_id"
+    elif tipo == 'resumen_movimientos':
+        return _filas_resumen(filtro, desde, hasta), "producto__id"
+    elif tipo == 'reabastecimiento':
+        return reabastecimiento.sugerencias(filtro, pronostico or "promedio"), "producto_id"
+    return None, None
+
+
+def _con_temporadas(lote, campo_producto):
+    nombres = temporadas_por_producto({item[campo_producto] for item in lote})
+    for item in lote:
+        item["temporada_nombres"] = nombres.get(item[campo_producto], "N/A")
+    return lote
+
+
+
+
+# -----------------------------
+# Exportación CSV / XLSX
+# -----------------------------
+# Columnas de cada reporte: (encabezado, clave en las filas de iterar_datos_reporte)
+COLUMNAS_EXPORTACION = {
+    "general": [
+        ("Producto", "producto_nombre"),
+        ("Dueño", "dueño_nombre"),
+        ("Categoría", "categoria_nombre"),
+        ("Subcategoría", "subcategoria_nombre"),
+        ("Temporada", "temporada_nombres"),
+        ("Ubicación", "ubicacion_nombre"),
+        ("Cantidad", "total"),
+    ],
+    "movimientos": [
+        ("Fecha", "fecha"),
+        ("Producto", "producto_nombre"),
+        ("Tipo", "tipo"),
+        ("Motivo", "motivo"),
+        ("Cantidad", "cantidad"),
+        ("Origen", "origen_nombre"),
+        ("Destino", "destino_nombre"),
+        ("Dueño", "dueño_nombre"),
+        ("Categoría", "categoria_nombre"),
+        ("Subcategoría", "subcategoria_nombre"),
+        ("Temporada", "temporada_nombres"),
+    ],
+    "resumen_movimientos": [
+        ("Tipo", "tipo"),
+        ("Producto", "producto__nombre"),
+        ("Dueño", "producto__dueño__user__username"),
+        ("Categoría", "producto__categoria__padre__nombre"),
+        ("Subcategoría", "producto__categoria__nombre"),
+        ("Temporada", "temporada_nombres"),
+        ("Total", "total"),
+    ],
+    "reabastecimiento": [
+        ("Producto", "producto_nombre"),
+        ("Dueño", "dueño_nombre"),
+        ("Categoría", "categoria_nombre"),
+        ("Subcategoría", "subcategoria_nombre"),
+        ("Temporada", "temporada_nombres"),
+        ("Venta diaria estimada", "demanda_diaria"),
+        ("Stock Piso", "stock_piso"),
+        ("Stock Bodega Interna", "stock_bodega"),
+        ("Días de cobertura", "dias_cobertura"),
+        ("Transferir a Piso", "transferir"),
+        ("Comprar", "comprar"),
+    ],
+}
+
+
+def filas_exportacion(tipo_reporte, filtros):
+    """Encabezados y filas (listas de valores) del reporte, leyendo la base por lotes."""
+    columnas = COLUMNAS_EXPORTACION[tipo_reporte]
+    yield [encabezado for encabezado, _ in columnas]
+
+    datos = iterar_datos_reporte(
+        tipo_reporte,
+        categoria_id=filtros.get("categoria"),
+        subcategoria_id=filtros.get("subcategoria"),
+        temporada_id=filtros.get("temporada"),
+        ubicacion_id=filtros.get("ubicacion"),
+        dueño_id=filtros.get("dueño"),
+        movimiento_tipo=filtros.get("movimiento"),
+        desde=filtros.get("desde"),
+        hasta=filtros.get("hasta"),
+        pronostico=filtros.get("pronostico"),
+    )
+    for item in datos:
+        fila = []
+        for _, clave in columnas:
+            valor = item.get(clave)
+            if isinstance(valor, datetime) and timezone.is_aware(valor):
+                # Hora local y sin zona: así la entienden Excel y openpyxl
+                valor = timezone.localtime(valor).replace(tzinfo=None)
+            fila.append("" if valor is None else valor)
+        yield fila
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo."""
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(tipo_reporte, filtros):
+    """CSV en streaming: cada fila se escribe en la respuesta conforme sale de la base."""
+    escritor = csv.writer(_Eco())
+
+    def contenido():
+        yield "\ufeff"  # BOM para que Excel abra bien los acentos
+        for fila in filas_exportacion(tipo_reporte, filtros):
+            yield escritor.writerow(
+                [v.strftime("%Y-%m-%d %H:%M") if isinstance(v, datetime) else v for v in fila]
+            )
+
+    response = StreamingHttpResponse(contenido(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="reporte_{tipo_reporte}.csv"'
+    return response
+
+
+def exportar_xlsx(tipo_reporte, filtros):
+    """
+    XLSX con openpyxl en modo write_only: las filas se vuelcan a disco conforme se agregan,
+    así la memoria no depende del número de filas.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=tipo_reporte[:31])
+
+    filas = filas_exportacion(tipo_reporte, filtros)
+    encabezados = []
+    for texto in next(filas):
+        celda = WriteOnlyCell(hoja, value=texto)
+        celda.font = Font(bold=True)
+        encabezados.append(celda)
+    hoja.append(encabezados)
+    for fila in filas:
+        hoja.append(fila)
+
+    archivo = SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+    libro.save(archivo)
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"reporte_{tipo_reporte}.xlsx",
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
 
 
 def nombres_filtros(filtros):
@@ -326,34 +661,30 @@ def nombres_filtros(filtros):
 
 
 def generar_pdf(tipo_reporte, filtros, usuario):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="reporte_{tipo_reporte}.pdf"'
-
-    pagesize = landscape(A4) if tipo_reporte == "movimientos" else A4
-    p = canvas.Canvas(response, pagesize=pagesize)
-    width, height = pagesize
-    pagina = 1
-
-    # --- Encabezado con logo y metadatos ---
-    logo_path = "static/img/logotienda.png"
-    try:
-        p.drawImage(logo_path, 50, height - 80, width=60, height=60,
-                    preserveAspectRatio=True, mask='auto')
-    except Exception:
-        pass
+    # El PDF se escribe en un archivo temporal (en memoria hasta 10 MB, luego a disco)
+    # y se envía por partes con FileResponse
+    archivo = SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+    escribir_pdf_reporte(archivo, tipo_reporte, filtros, usuario)
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"reporte_{tipo_reporte}.pdf",
+        content_type="application/pdf",
+    )
 
-    p.setFont("Helvetica-Bold", 16)
-    p.drawRightString(width - 50, height - 50, "Comercializadora Modelo")
 
-    p.setFont("Helvetica", 10)
-    p.drawRightString(width - 50, height - 70, f"Reporte generado por: {usuario}")
-    p.drawRightString(width - 50, height - 85, f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+def escribir_pdf_reporte(archivo, tipo_reporte, filtros, usuario, progreso=None):
+    """
+    Dibuja el reporte en `archivo` (cualquier objeto tipo archivo).
+    progreso: callback opcional progreso(filas_dibujadas) que se llama cada 1000 filas.
+    """
+    pagesize = landscape(A4) if tipo_reporte in ("movimientos", "reabastecimiento") else A4
+    hoja = HojaReporte(archivo, usuario, pagesize=pagesize)
 
     filtros_nombres = nombres_filtros(filtros)
 
     # --- Mensajes informativos según filtros ---
-    p.setFont("Helvetica-Oblique", 10)
-    y_info = height - 120
     mensajes = []
     if filtros_nombres.get("temporada"):
         mensajes.append(f"de la temporada {filtros_nombres['temporada']}")
@@ -365,167 +696,225 @@ def generar_pdf(tipo_reporte, filtros, usuario):
         mensajes.append(f"de la subcategoría {filtros_nombres['subcategoria']}")
     if filtros_nombres.get("dueño"):
         mensajes.append(f"del dueño {filtros_nombres['dueño']}")
+    if tipo_reporte != "general" and (filtros.get("desde") or filtros.get("hasta")):
+        mensajes.append(f"con movimientos del {filtros.get('desde') or 'inicio'} al {filtros.get('hasta') or 'día de hoy'}")
 
     if mensajes:
-        texto = "Estos productos son " + ", ".join(mensajes)
-        p.drawString(50, y_info, texto)
-
-    # --- Helpers internos ---
-    y = height - 190
-    def nueva_pagina():
-        nonlocal y, pagina
-        p.setFont("Helvetica", 9)
-        p.drawRightString(width - 30, 20, f"Página {pagina}")
-        p.showPage()
-        pagina += 1
-        y = height - 100
-
-    def dibujar_fila(celdas, negrita=False):
-        nonlocal y
-        if y < 80:
-            nueva_pagina()
-        p.setFont("Helvetica-Bold" if negrita else "Helvetica", 9)
-        x = 50
-        ancho_disponible = width - 100
-        ancho_columna = ancho_disponible / len(celdas)
-        for texto in celdas:
-            p.rect(x, y, ancho_columna, 15, stroke=1, fill=0)
-            p.drawString(x + 2, y + 3, str(texto))
-            x += ancho_columna
-        y -= 15
-
-    # --- Datos del reporte ---
-    datos = get_datos_reporte(
+        hoja.linea("Estos productos son " + ", ".join(mensajes))
+    hoja.espacio(40)
+
+    # --- Datos del reporte (por lotes, sin cargar todo en memoria) ---
+    datos = iterar_datos_reporte(
         tipo_reporte,
         categoria_id=filtros.get("categoria"),
         subcategoria_id=filtros.get("subcategoria"),
         temporada_id=filtros.get("temporada"),
         ubicacion_id=filtros.get("ubicacion"),
         dueño_id=filtros.get("dueño"),
-        movimiento_tipo=filtros.get("movimiento")
+        movimiento_tipo=filtros.get("movimiento"),
+        desde=filtros.get("desde"),
+        hasta=filtros.get("hasta"),
+        pronostico=filtros.get("pronostico")
     )
 
-    # --- Renderizado según tipo ---
+    # --- Columnas según tipo: (encabezado, valor de la fila) ---
     if tipo_reporte in ["general", "movimientos"]:
-        columnas = ["Producto"]
+        columnas = [("Producto", lambda item: item.get("producto_nombre", "N/A"))]
         if tipo_reporte == "movimientos" and not filtros.get("movimiento"):
-            columnas.append("Tipo")
+            columnas.append(("Tipo", lambda item: item.get("tipo", "N/A")))
         if not filtros.get("dueño"):
-            columnas.append("Dueño")
+            columnas.append(("Dueño", lambda item: item.get("dueño_nombre", "N/A")))
         if not filtros.get("categoria"):
-            columnas.append("Categoría")
+            columnas.append(("Categoría", lambda item: item.get("categoria_nombre", "N/A")))
         if not filtros.get("subcategoria"):
-            columnas.append("Subcategoría")
+            columnas.append(("Subcategoría", lambda item: item.get("subcategoria_nombre", "N/A")))
         if not filtros.get("temporada"):
-            columnas.append("Temporada")
+            columnas.append(("Temporada", lambda item: item.get("temporada_nombres", "N/A")))
         if not filtros.get("ubicacion") and tipo_reporte == "general":
-            columnas.append("Ubicación")
-
-        columnas.append("Cantidad")
-        if tipo_reporte == "movimientos":
-            columnas += ["Origen", "Destino", "Fecha"]
-
-        dibujar_fila(columnas, negrita=True)
-
-        for item in datos:
-            fila = [item.get("producto_nombre", "N/A")]
-            if tipo_reporte == "movimientos" and not filtros.get("movimiento"):
-                fila.append(item.get("tipo", "N/A"))
-            if not filtros.get("dueño"):
-                fila.append(item.get("dueño_nombre", "N/A"))
-            if not filtros.get("categoria"):
-                fila.append(item.get("categoria_nombre", "N/A"))
-            if not filtros.get("subcategoria"):
-                fila.append(item.get("subcategoria_nombre", "N/A"))
-            if not filtros.get("temporada"):
-                fila.append(item.get("temporada_nombres", "N/A"))
-            if not filtros.get("ubicacion") and tipo_reporte == "general":
-                fila.append(item.get("ubicacion_nombre", "N/A"))
-
-            # Cantidad
-            if tipo_reporte == "general":
-                fila.append(item.get("total", 0))
-            else:  # movimientos
-                fila.append(item.get("cantidad", 0))
-
-            if tipo_reporte == "movimientos":
-                fecha = item.get("fecha")
-                fila += [
-                    item.get("origen_nombre", "-"),
-                    item.get("destino_nombre", "-"),
-                    fecha.strftime("%d/%m/%Y %H:%M") if isinstance(fecha, datetime) else "-"
-                ]
-            dibujar_fila(fila)
+            columnas.append(("Ubicación", lambda item: item.get("ubicacion_nombre", "N/A")))
+
+        # Cantidad
+        if tipo_reporte == "general":
+            columnas.append(("Cantidad", lambda item: item.get("total", 0)))
+        else:  # movimientos
+            columnas += [
+                ("Cantidad", lambda item: item.get("cantidad", 0)),
+                ("Origen", lambda item: item.get("origen_nombre") or "-"),
+                ("Destino", lambda item: item.get("destino_nombre") or "-"),
+                ("Fecha", lambda item: _fecha_local(item.get("fecha"))),
+            ]
+
+    elif tipo_reporte == "reabastecimiento":
+        columnas = [
+            ("Producto", lambda item: item.get("producto_nombre", "N/A")),
+            ("Venta diaria", lambda item: item.get("demanda_diaria", 0)),
+            ("Piso", lambda item: item.get("stock_piso", 0)),
+            ("Bodega Interna", lambda item: item.get("stock_bodega", 0)),
+            ("Días de cobertura", lambda item: item["dias_cobertura"] if item.get("dias_cobertura") is not None else "Sin ventas"),
+            ("Transferir a Piso", lambda item: item.get("transferir", 0)),
+            ("Comprar", lambda item: item.get("comprar", 0)),
+        ]
+
+    else:
+        columnas = []
+
+    if columnas:
+        hoja.tabla(
+            [encabezado for encabezado, _ in columnas],
+            ([valor(item) for _, valor in columnas] for item in datos),
+            progreso=progreso,
+        )
+    hoja.terminar()
 
-    p.save()
-    return response
 
+def _fecha_local(fecha):
+    if isinstance(fecha, datetime):
+        return timezone.localtime(fecha).strftime("%d/%m/%Y %H:%M") if timezone.is_aware(fecha) else fecha.strftime("%d/%m/%Y %H:%M")
+    return "-"
 
 
 def exportar_criticos_pdf(usuario, ubicacion_id=None):
-    criticos = Inventario.objects.filter(cantidad_actual__lte=100)
-    if ubicacion_id:
-        criticos = criticos.filter(ubicacion_id=ubicacion_id)
-
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = 'attachment; filename="productos_bajo_stock.pdf"'
+    escribir_pdf_criticos(response, usuario, ubicacion_id)
+    return response
 
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-    pagina = 1
-    y = height - 100
-
-    # --- Encabezado con logo ---
-    logo_path = "static/img/logotienda.png"
-    try:
-        p.drawImage(logo_path, 50, height - 80, width=60, height=60,
-                    preserveAspectRatio=True, mask='auto')
-    except:
-        pass
 
-    p.setFont("Helvetica-Bold", 16)
-    p.drawRightString(width - 50, height - 50, "Comercializadora Modelo")
+def escribir_pdf_criticos(archivo, usuario, ubicacion_id=None):
+    # Producto y ubicación vienen en la misma consulta (antes eran 2 consultas por fila)
+    criticos = reorden.criticos(ubicacion_id)
 
-    p.setFont("Helvetica", 10)
-    p.drawRightString(width - 50, height - 70, f"Reporte generado por: {usuario}")
-    p.drawRightString(width - 50, height - 85, f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+    detalles = []
     if ubicacion_id:
-        ubicacion = Ubicacion.objects.filter(id=ubicacion_id).first()
-        if ubicacion:
-            p.drawRightString(width - 50, height - 100, f"Ubicación: {ubicacion.nombre}")
-
-    # --- Tabla de críticos ---
-    y = height - 160
-    def nueva_pagina():
-        nonlocal y, pagina
-        p.setFont("Helvetica", 9)
-        p.drawRightString(width - 30, 20, f"Página {pagina}")
-        p.showPage()
-        pagina += 1
-        y = height - 100
-
-    def dibujar_fila(celdas, anchos, negrita=False):
-        nonlocal y
-        if y < 80:
-            nueva_pagina()
-        p.setFont("Helvetica-Bold" if negrita else "Helvetica", 9)
-        x = 50
-        for texto, ancho in zip(celdas, anchos):
-            p.rect(x, y, ancho, 15, stroke=1, fill=0)
-            p.drawString(x + 2, y + 3, str(texto))
-            x += ancho
-        y -= 15
-
-    # Encabezados
-    dibujar_fila(["Producto", "Stock actual", "Ubicación"], [200, 100, 200], negrita=True)
-
-    # Filas
-    for inv in criticos:
-        dibujar_fila([inv.producto.nombre, inv.cantidad_actual, inv.ubicacion.nombre],
-                     [200, 100, 200])
+        nombre = Ubicacion.objects.filter(id=ubicacion_id).values_list("nombre", flat=True).first()
+        if nombre:
+            detalles.append(f"Ubicación: {nombre}")
+
+    hoja = HojaReporte(archivo, usuario, detalles=detalles)
+    hoja.espacio(40)
+    hoja.tabla(
+        ["Producto", "Ubicación", "Stock", "Mínimo", "Pedir", "Días de cobertura"],
+        (
+            [
+                inv["producto_nombre"],
+                inv["ubicacion_nombre"],
+                inv["cantidad_actual"],
+                inv["minimo"],
+                inv["sugerido"],
+                round(inv["dias_cobertura"], 1) if inv["dias_cobertura"] is not None else "Sin salidas",
+            ]
+            for inv in criticos.iterator(chunk_size=2000)
+        ),
+    )
+    hoja.terminar()
+
 
+
+
+
+# -----------------------------
+# Hoja de etiquetas (muchos productos a la vez)
+# -----------------------------
+def _forma_codigo(p, producto, ancho, alto, fuente):
+    """
+    Dibuja el código de barras del producto una sola vez como Form XObject del PDF
+    y devuelve su nombre; cada copia de la etiqueta solo lo referencia (doForm).
+    """
+    nombre = f"codigo-{producto.tipo_codigo}-{producto.codigo_barras}"
+    if p.hasForm(nombre):
+        return nombre
+
+    p.beginForm(nombre)
+    if producto.tipo_codigo == "ean13":
+        # El widget calcula barras y dígitos; se pintan directo en el canvas sin pasar por renderPDF
+        widget = Ean13BarcodeWidget(producto.codigo_barras[:12], barHeight=alto, fontSize=fuente)
+        widget.barWidth = min(widget.barWidth, ancho / 113)  # 95 módulos + zonas de silencio
+        for nodo in widget.draw().getContents():
+            if isinstance(nodo, shapes.Rect):
+                p.rect(nodo.x, nodo.y, nodo.width, nodo.height, stroke=0, fill=1)
+            elif isinstance(nodo, shapes.String):
+                p.setFont(nodo.fontName, nodo.fontSize)
+                dibujar = p.drawCentredString if nodo.textAnchor == "middle" else p.drawString
+                dibujar(nodo.x, nodo.y, nodo.text)
+    else:
+        # Code128 dibuja sus barras con canvas.rect; el texto legible va debajo de y=0
+        alto_texto = fuente * 1.2
+        codigo = code128.Code128(producto.codigo_barras, quiet=False)
+        modulos = codigo.width / codigo.barWidth
+        codigo = code128.Code128(
+            producto.codigo_barras, quiet=False, humanReadable=True, fontSize=fuente,
+            barWidth=min(codigo.barWidth, ancho / modulos), barHeight=alto - alto_texto,
+        )
+        codigo.drawOn(p, (ancho - codigo.width) / 2, alto_texto)
+    p.endForm()
+    return nombre
+
+
+def generar_etiquetas_pdf(items, tamaño):
+    """
+    items: lista de (producto, copias). tamaño: 'chica' | 'mediana' | 'grande'.
+    Acomoda las etiquetas en hojas A4 y dibuja los códigos como vectores con los
+    widgets de código de barras de ReportLab. El PDF se escribe en un archivo temporal
+    y se envía por partes.
+    """
+    from .services import ETIQUETAS
+
+    etiqueta = next((e for e in ETIQUETAS if e["tipo"] == tamaño), ETIQUETAS[0])
+    ancho, alto = etiqueta["ancho_mm"] * mm, etiqueta["alto_mm"] * mm
+    margen, separacion = 10 * mm, 3 * mm
+
+    width, height = A4
+    columnas = max(int((width - 2 * margen + separacion) // (ancho + separacion)), 1)
+    filas = max(int((height - 2 * margen + separacion) // (alto + separacion)), 1)
+    por_hoja = columnas * filas
+
+    archivo = SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+    p = canvas.Canvas(archivo, pagesize=A4)
+
+    # Tamaños de letra proporcionales a la altura de la etiqueta
+    fuente = max(min(alto / mm * 0.3, 9), 5)
+    alto_codigo = alto - 1.6 * fuente - 2 * mm
+
+    posicion = 0
+    for producto, copias in items:
+        if not producto.codigo_barras:
+            continue
+        forma = _forma_codigo(p, producto, ancho - 4 * mm, alto_codigo, fuente * 0.9)
+        precio = f"${producto.precio_menudeo}"
+        disponible = ancho - 5 * mm - p.stringWidth(precio, "Helvetica", fuente)
+        nombre = producto.nombre
+        while nombre and p.stringWidth(nombre, "Helvetica-Bold", fuente) > disponible:
+            nombre = nombre[:-1]
+
+        for _ in range(copias):
+            if posicion and posicion % por_hoja == 0:
+                p.showPage()
+            indice = posicion % por_hoja
+            x = margen + (indice % columnas) * (ancho + separacion)
+            y = height - margen - (indice // columnas + 1) * alto - (indice // columnas) * separacion
+
+            p.setLineWidth(0.25)
+            p.rect(x, y, ancho, alto, stroke=1, fill=0)
+            p.setFont("Helvetica-Bold", fuente)
+            p.drawString(x + 2 * mm, y + alto - fuente - 1 * mm, nombre)
+            p.setFont("Helvetica", fuente)
+            p.drawRightString(x + ancho - 2 * mm, y + alto - fuente - 1 * mm, precio)
+            p.saveState()
+            p.translate(x + 2 * mm, y + 1 * mm)
+            p.doForm(forma)
+            p.restoreState()
+            posicion += 1
+
+    if not posicion:
+        p.setFont("Helvetica", 12)
+        p.drawString(margen, height - margen - 12, "No hay productos con código de barras para imprimir.")
     p.showPage()
     p.save()
-    return response
-
 
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"etiquetas_{tamaño}.pdf",
+        content_type="application/pdf",
+    )
@@ -0,0 +1,117 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import MovimientoInventario, ResumenMovimientoDiario
+
+
+# -----------------------------
+# Resumen diario de movimientos
+# -----------------------------
+# ResumenMovimientoDiario guarda, por día cerrado, el total de cada (producto, ubicación, tipo, motivo).
+# La marca de agua es el último día resumido: los reportes leen el resumen hasta ese día
+# y los movimientos crudos después (normalmente solo los de hoy).
+# Un día se resume completo (borrar + insertar), así que volver a correrlo es seguro.
+# Solo se cierran días terminados hace más de MARGEN, para no dejar fuera
+# transacciones que empezaron antes de medianoche y confirmaron después.
+
+MARGEN = timedelta(minutes=getattr(settings, "INVENTARIO_RESUMEN_MARGEN_MINUTOS", 10))
+# Con INVENTARIO_RESUMEN_EN_LINEA el primer movimiento de cada día cierra los días pendientes
+EN_LINEA = getattr(settings, "INVENTARIO_RESUMEN_EN_LINEA", False)
+DIAS_POR_LOTE = 31
+
+_cerrado_hasta = None  # última marca de agua vista por este proceso
+
+
+def inicio_del_dia(dia):
+    inicio = datetime.combine(dia, time.min)
+    return timezone.make_aware(inicio) if settings.USE_TZ else inicio
+
+
+def ultimo_dia_cerrable(ahora=None):
+    ahora = ahora or timezone.now()
+    return timezone.localdate(ahora - MARGEN) - timedelta(days=1)
+
+
+def cerrado_hasta():
+    """Último día incluido en el resumen (None si nunca se ha resumido)."""
+    return ResumenMovimientoDiario.objects.aggregate(dia=Max("dia"))["dia"]
+
+
+def resumir_dias(desde, hasta):
+    """Recalcula el resumen de los días [desde, hasta], un GROUP BY por bloque de DIAS_POR_LOTE días."""
+    global _cerrado_hasta
+    creadas = 0
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=DIAS_POR_LOTE - 1), hasta)
+        filas = (
+            MovimientoInventario.objects
+            .filter(fecha__gte=inicio_del_dia(inicio), fecha__lt=inicio_del_dia(fin + timedelta(days=1)))
+            .values(
+                "producto_id", "tipo", "motivo",
+                dia_mov=TruncDate("fecha"),
+                ubicacion_mov=Coalesce("origen_id", "destino_id"),
+            )
+            .annotate(total=Sum("cantidad"), num=Count("id"))
+            .order_by()
+        )
+        with transaction.atomic():
+            ResumenMovimientoDiario.objects.filter(dia__gte=inicio, dia__lte=fin).delete()
+            resumen = ResumenMovimientoDiario.objects.bulk_create(
+                [
+                    ResumenMovimientoDiario(
+                        dia=fila["dia_mov"],
+                        producto_id=fila["producto_id"],
+                        ubicacion_id=fila["ubicacion_mov"],
+                        tipo=fila["tipo"],
+                        motivo=fila["motivo"] or "",
+                        cantidad=fila["total"],
+                        movimientos=fila["num"],
+                    )
+                    for fila in filas.iterator(chunk_size=5000)
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,  # otro proceso cerró el mismo día al mismo tiempo
+            )
+        creadas += len(resumen)
+        inicio = fin + timedelta(days=1)
+    _cerrado_hasta = hasta
+    return creadas
+
+
+def actualizar_resumen(hasta=None):
+    """
+    Resume los días cerrados que faltan desde la marca de agua.
+    Devuelve (desde, hasta, filas creadas) o None si no había nada pendiente.
+    """
+    global _cerrado_hasta
+    hasta = hasta or ultimo_dia_cerrable()
+    marca = cerrado_hasta()
+    if marca is not None:
+        desde = marca + timedelta(days=1)
+    else:
+        primero = MovimientoInventario.objects.aggregate(fecha=Min("fecha"))["fecha"]
+        desde = (timezone.localdate(primero) if settings.USE_TZ else primero.date()) if primero else None
+    if desde is None or desde > hasta:
+        _cerrado_hasta = hasta
+        return None
+    return desde, hasta, resumir_dias(desde, hasta)
+
+
+def reconstruir_resumen(hasta=None):
+    ResumenMovimientoDiario.objects.all().delete()
+    return actualizar_resumen(hasta)
+
+
+def programar_cierre():
+    """Hook de services.despues_de_registrar: cierra los días pendientes si cambió el día."""
+    if not EN_LINEA:
+        return
+    if _cerrado_hasta is not None and _cerrado_hasta >= ultimo_dia_cerrable():
+        return
+    transaction.on_commit(actualizar_resumen)
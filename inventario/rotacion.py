@@ -0,0 +1,166 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from .models import MovimientoInventario, Producto, RotacionDiaria, RotacionProducto
+
+
+# -----------------------------
+# Contadores de rotación por producto
+# -----------------------------
+def campo_ventana(dias):
+    """Nombre del campo de RotacionProducto para la ventana indicada (7, 30, 90 o None = total)."""
+    if dias in RotacionProducto.VENTANAS:
+        return f"movimientos_{dias}d"
+    return "movimientos_total"
+
+
+def registrar_rotacion(movimientos):
+    """
+    Suma los movimientos recién registrados a los contadores (incremental, con F()).
+    Un movimiento nuevo cae dentro de todas las ventanas; el vencimiento de las ventanas
+    lo hace recalcular_ventanas una vez al día. ultimo_movimiento solo avanza: un movimiento
+    con fecha anterior (capturado tarde o fuera de orden) no lo regresa.
+    """
+    if not movimientos:
+        return
+
+    por_dia = Counter()
+    ultimos = {}
+    for mov in movimientos:
+        fecha = mov.fecha or timezone.now()
+        por_dia[(mov.producto_id, timezone.localdate(fecha))] += 1
+        ultimos[mov.producto_id] = max(ultimos.get(mov.producto_id, fecha), fecha)
+
+    por_producto = Counter()
+    for (producto_id, _), n in por_dia.items():
+        por_producto[producto_id] += n
+
+    with transaction.atomic():
+        # Asegurar que existan las filas y luego incrementar agrupando por cantidad
+        RotacionDiaria.objects.bulk_create(
+            [RotacionDiaria(producto_id=p, dia=d) for p, d in por_dia],
+            ignore_conflicts=True,
+        )
+        RotacionProducto.objects.bulk_create(
+            [RotacionProducto(producto_id=p) for p in por_producto],
+            ignore_conflicts=True,
+        )
+
+        dias_por_n = defaultdict(lambda: defaultdict(list))
+        for (producto_id, dia), n in por_dia.items():
+            dias_por_n[n][dia].append(producto_id)
+        for n, dias in dias_por_n.items():
+            for dia, producto_ids in dias.items():
+                RotacionDiaria.objects.filter(producto_id__in=producto_ids, dia=dia).update(
+                    movimientos=F("movimientos") + n
+                )
+
+        productos_por_n = defaultdict(list)
+        for producto_id, n in por_producto.items():
+            productos_por_n[n].append(producto_id)
+        for n, producto_ids in productos_por_n.items():
+            RotacionProducto.objects.filter(producto_id__in=producto_ids).update(
+                movimientos_7d=F("movimientos_7d") + n,
+                movimientos_30d=F("movimientos_30d") + n,
+                movimientos_90d=F("movimientos_90d") + n,
+                movimientos_total=F("movimientos_total") + n,
+                ultimo_movimiento=_mas_reciente({p: ultimos[p] for p in producto_ids}),
+            )
+
+
+def _mas_reciente(ultimos):
+    """Expresión para ultimo_movimiento: el mayor entre el guardado y la fecha de cada producto."""
+    fechas = set(ultimos.values())
+    if len(fechas) == 1:
+        fecha = Value(fechas.pop(), output_field=DateTimeField())
+    else:
+        fecha = Case(
+            *[When(producto_id=p, then=Value(f)) for p, f in ultimos.items()],
+            output_field=DateTimeField(),
+        )
+    return Greatest(Coalesce("ultimo_movimiento", fecha), fecha)
+
+
+def reconstruir_rotacion_diaria():
+    """Reconstruye RotacionDiaria (y el último movimiento) a partir del historial completo."""
+    with transaction.atomic():
+        RotacionDiaria.objects.all().delete()
+        filas = (
+            MovimientoInventario.objects.order_by()
+            .annotate(dia=TruncDate("fecha"))
+            .values("producto_id", "dia")
+            .annotate(n=Count("id"))
+        )
+        RotacionDiaria.objects.bulk_create(
+            (RotacionDiaria(producto_id=f["producto_id"], dia=f["dia"], movimientos=f["n"]) for f in filas.iterator()),
+            batch_size=1000,
+        )
+
+        ultimos = (
+            MovimientoInventario.objects.order_by()
+            .values("producto_id")
+            .annotate(ultimo=Max("fecha"))
+        )
+        RotacionProducto.objects.bulk_create(
+            [RotacionProducto(producto_id=f["producto_id"], ultimo_movimiento=f["ultimo"]) for f in ultimos],
+            update_conflicts=True,
+            unique_fields=["producto"],
+            update_fields=["ultimo_movimiento"],
+            batch_size=1000,
+        )
+
+
+def crear_filas(producto_ids):
+    """Fila en 0 para productos nuevos: un producto sin movimientos es el que menos rota."""
+    RotacionProducto.objects.bulk_create(
+        [RotacionProducto(producto_id=p) for p in producto_ids],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+
+def _suma_diaria(desde=None):
+    """Subconsulta: movimientos del producto en RotacionDiaria desde `desde` (0 si no hay)."""
+    diarias = RotacionDiaria.objects.filter(producto_id=OuterRef("producto_id"))
+    if desde is not None:
+        diarias = diarias.filter(dia__gte=desde)
+    total = diarias.order_by().values("producto_id").annotate(n=Sum("movimientos")).values("n")
+    return Coalesce(Subquery(total), 0)
+
+
+def recalcular_ventanas(hoy=None):
+    """
+    Recalcula las ventanas 7/30/90 días y el total desde RotacionDiaria.
+    Pensado para correr una vez al día (comando actualizar_rotacion).
+    Las filas se bloquean antes del UPDATE: un registrar_rotacion que confirme en medio
+    espera y suma sobre el valor nuevo en lugar de perderse.
+    """
+    hoy = hoy or timezone.localdate()
+
+    with transaction.atomic():
+        # Todo producto tiene su fila (los que nunca se han movido quedan en 0)
+        crear_filas(Producto.objects.values_list("id", flat=True))
+
+        list(RotacionProducto.objects.select_for_update().order_by("pk").values_list("pk", flat=True))
+        RotacionProducto.objects.update(
+            recalculado=hoy,
+            movimientos_total=_suma_diaria(),
+            **{
+                campo_ventana(dias): _suma_diaria(hoy - timedelta(days=dias - 1))
+                for dias in RotacionProducto.VENTANAS
+            },
+        )
+
+
+def menos_rotacion(dias=30, limite=10):
+    """Top-N de productos con menor rotación leído directo del índice de la ventana."""
+    return (
+        RotacionProducto.objects
+        .select_related("producto")
+        .order_by(campo_ventana(dias), "producto_id")[:limite]
+    )
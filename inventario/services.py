@@ -1,20 +1,29 @@
 from django.core.exceptions import ValidationError
-from .models import Inventario, MovimientoInventario, TransferenciaInventario
-import random
+from .models import Atributo, Inventario, MovimientoInventario, TransferenciaInventario, ValorAtributo
 import io
 import base64
-from barcode import EAN13, Code128
 from barcode.writer import ImageWriter
 from django.db import transaction
+from django.db.models import F, Q
+from . import cache_reportes, codigos, lectura, resumen_diario
+from .cache_codigos import CLASES
+from .rotacion import registrar_rotacion
 
 
 
 #Funcion que solo actualiza el stock de inventario
-def actualizar_stock(inventario, *, sumar=0, restar=0, ajustar=None):
+def actualizar_stock(inventario, *, sumar=0, restar=0, ajustar=None, condicional=False):
     # Validar exclusividad de parámetros
     if ajustar is not None and (sumar or restar):
         raise ValidationError("No se puede usar 'ajustar' junto con 'sumar' o 'restar'.")
 
+    # Modo condicional: un solo UPDATE atómico en la base, sin leer ni bloquear antes.
+    # cantidad_actual queda diferida: solo se vuelve a leer si alguien la consulta.
+    if condicional and ajustar is None:
+        actualizar_stock_condicional(Inventario.objects.filter(pk=inventario.pk), sumar=sumar, restar=restar)
+        del inventario.cantidad_actual
+        return inventario
+
     if ajustar is not None:
         if ajustar < 0:
             raise ValidationError("No puedes ajustar el inventario a un valor negativo.")
@@ -29,11 +38,26 @@ def actualizar_stock(inventario, *, sumar=0, restar=0, ajustar=None):
     return inventario
 
 
+def actualizar_stock_condicional(inventarios, *, sumar=0, restar=0):
+    """
+    UPDATE ... SET cantidad_actual = cantidad_actual + sumar - restar
+    WHERE cantidad_actual >= restar - sumar
+    Si no se afecta ninguna fila es porque no hay stock suficiente (o no existe el registro).
+    """
+    neto = sumar - restar
+    filas = inventarios.filter(cantidad_actual__gte=-neto).update(
+        cantidad_actual=F("cantidad_actual") + neto
+    )
+    if not filas:
+        raise ValidationError("Inventario insuficiente para realizar la salida.")
+    return filas
+
+
 
 
 #RFuncion que registra el movimiento de inventario-
 def registrar_movimiento(producto, cantidad, origen=None, destino=None, empleado=None, motivo=None, tipo=None, transferencia=None):
-    return MovimientoInventario.objects.create(
+    movimiento = MovimientoInventario.objects.create(
         producto=producto,
         motivo=motivo,
         tipo=tipo,
@@ -43,13 +67,30 @@ def registrar_movimiento(producto, cantidad, origen=None, destino=None, empleado
         realizado_por=empleado,
         transferencia=transferencia   # 👈 vínculo al maestro
     )
+    despues_de_registrar([movimiento])
+    return movimiento
+
+
+#Todo lo que se mantiene a partir de la bitácora se actualiza aquí (uno o muchos movimientos).
+#actualizar_stock y actualizar_stock_condicional no invalidan la caché de reportes: todo cambio
+#de stock termina registrando su movimiento y la generación sube una sola vez, aquí.
+def despues_de_registrar(movimientos):
+    registrar_rotacion(movimientos)
+    resumen_diario.programar_cierre()
+    lectura.programar_stock({mov.producto_id for mov in movimientos})
+    cache_reportes.invalidar()
 
 
 def aplicar_movimiento_inventario(*, producto, cantidad, origen=None, destino=None, empleado=None, motivo=None, tipo=None, transferencia=None):
+    """
+    Aplica un movimiento y lo registra en la bitácora. Devuelve el Inventario destino ya
+    bloqueado y actualizado (entrada, ajuste, transferencia); la salida es un UPDATE
+    condicional sin releer la fila y devuelve None.
+    """
     try:
         cantidad = int(cantidad)
     except (ValueError, TypeError):
-        raise ValidationError("La cantidad debe ser un número entero válido.")
+        raise ValidationError("La cantidad debe ser un número entero válido.") from None
     if cantidad <= 0:
         raise ValidationError("La cantidad debe ser mayor que cero.")
 
@@ -68,12 +109,10 @@ def aplicar_movimiento_inventario(*, producto, cantidad, origen=None, destino=No
             return inv_dest
 
         elif tipo == "salida":
-            inv_orig = Inventario.objects.select_for_update().filter(producto=producto, ubicacion=origen).first()
-            if not inv_orig or inv_orig.cantidad_actual < cantidad:
-                raise ValidationError("Inventario insuficiente para realizar la salida.")
-            actualizar_stock(inv_orig, restar=cantidad)
+            # UPDATE condicional: no hace falta releer la fila con select_for_update
+            actualizar_stock_condicional(Inventario.objects.filter(producto=producto, ubicacion=origen), restar=cantidad)
             registrar_movimiento(producto, cantidad, origen=origen, empleado=empleado, motivo=motivo, tipo=tipo, transferencia=transferencia)
-            return inv_orig
+            return None
 
         elif tipo == "ajuste":
             inv_dest, _ = Inventario.objects.get_or_create(producto=producto, ubicacion=destino)
@@ -83,11 +122,11 @@ def aplicar_movimiento_inventario(*, producto, cantidad, origen=None, destino=No
             return inv_dest
 
         elif tipo == "transferencia":
-            # Bloquear inventario origen
-            inv_orig = Inventario.objects.select_for_update().filter(producto=producto, ubicacion=origen).first()
-            if not inv_orig or inv_orig.cantidad_actual < cantidad:
-                raise ValidationError("Inventario insuficiente en la ubicación de origen.")
-            actualizar_stock(inv_orig, restar=cantidad)
+            # Descontar origen con UPDATE condicional (falla si no alcanza el stock)
+            try:
+                actualizar_stock_condicional(Inventario.objects.filter(producto=producto, ubicacion=origen), restar=cantidad)
+            except ValidationError:
+                raise ValidationError("Inventario insuficiente en la ubicación de origen.") from None
 
             # Bloquear/crear inventario destino
             inv_dest, _ = Inventario.objects.get_or_create(producto=producto, ubicacion=destino)
@@ -112,31 +151,213 @@ def aplicar_movimiento_inventario(*, producto, cantidad, origen=None, destino=No
                 transferencia=transferencia
             )
 
-            return inv_orig, inv_dest
+            return inv_dest
+
+
+
+
+#Funcion para aplicar muchos movimientos en una sola transaccion (ej. factura de proveedor)
+def aplicar_movimientos_inventario_lote(lineas, *, empleado=None, transferencia=None):
+    """
+    Aplica una lista de movimientos en una sola transacción.
+    Cada línea es un dict (o tupla) con: producto, cantidad, origen, destino, motivo
+    y opcionalmente tipo. Se validan igual que en aplicar_movimiento_inventario;
+    si una sola línea falla se rechaza todo el lote.
+    Devuelve la lista de MovimientoInventario creados.
+    """
+    campos = ("producto", "cantidad", "origen", "destino", "motivo", "tipo")
+
+    # 1) Normalizar y validar todas las líneas antes de tocar la base
+    normalizadas = []
+    for i, linea in enumerate(lineas, start=1):
+        datos = dict(linea) if isinstance(linea, dict) else dict(zip(campos, linea))
+        producto = datos.get("producto")
+        origen = datos.get("origen")
+        destino = datos.get("destino")
+        motivo = datos.get("motivo")
+        tipo = datos.get("tipo")
+
+        try:
+            cantidad = int(datos.get("cantidad"))
+        except (ValueError, TypeError):
+            raise ValidationError(f"Línea {i}: la cantidad debe ser un número entero válido.") from None
+        if cantidad <= 0:
+            raise ValidationError(f"Línea {i}: la cantidad debe ser mayor que cero.")
+
+        if motivo:
+            tipo = MovimientoInventario.MAPEO_TIPO_POR_MOTIVO.get(motivo)
+            if not tipo:
+                raise ValidationError(f"Línea {i}: el motivo '{motivo}' no es válido.")
+
+        if tipo not in ("entrada", "salida", "ajuste", "transferencia"):
+            raise ValidationError(f"Línea {i}: el tipo de movimiento '{tipo}' no es válido.")
+        if tipo in ("entrada", "ajuste", "transferencia") and not destino:
+            raise ValidationError(f"Línea {i}: el movimiento requiere una ubicación destino.")
+        if tipo in ("salida", "transferencia") and not origen:
+            raise ValidationError(f"Línea {i}: el movimiento requiere una ubicación origen.")
+
+        normalizadas.append((i, producto, cantidad, origen, destino, motivo, tipo))
+
+    if not normalizadas:
+        return []
+
+    # Pares (producto, ubicacion) que se leen y los que pueden crearse
+    pares = set()
+    pares_destino = set()
+    for _, producto, _, origen, destino, _, tipo in normalizadas:
+        if tipo in ("salida", "transferencia"):
+            pares.add((producto.pk, origen.pk))
+        if tipo in ("entrada", "ajuste", "transferencia"):
+            pares.add((producto.pk, destino.pk))
+            pares_destino.add((producto.pk, destino.pk))
+
+    with transaction.atomic():
+        # 2) Crear los inventarios destino que falten (equivale al get_or_create)
+        if pares_destino:
+            Inventario.objects.bulk_create(
+                [Inventario(producto_id=p, ubicacion_id=u) for p, u in pares_destino],
+                ignore_conflicts=True,
+            )
+
+        # 3) Bloquear solo las filas de los pares del lote, por pk y en orden. Filtrar por
+        #    producto__in y ubicacion__in con select_for_update bloquearía el producto cartesiano
+        #    (todas las ubicaciones de todos los productos) y frenaría ventas ajenas al lote.
+        producto_ids = {p for p, _ in pares}
+        ubicacion_ids = {u for _, u in pares}
+        ids = [
+            pk for pk, producto_id, ubicacion_id in Inventario.objects
+            .filter(producto_id__in=producto_ids, ubicacion_id__in=ubicacion_ids)
+            .values_list("pk", "producto_id", "ubicacion_id")
+            if (producto_id, ubicacion_id) in pares
+        ]
+        inventarios = {
+            (inv.producto_id, inv.ubicacion_id): inv
+            for inv in Inventario.objects.select_for_update().filter(pk__in=ids).order_by("pk")
+        }
+
+        # 4) Aplicar en memoria, en orden, validando cada línea
+        modificados = {}
+        movimientos = []
+
+        def nuevo_movimiento(producto, cantidad, origen=None, destino=None, motivo=None, tipo=None):
+            movimientos.append(MovimientoInventario(
+                producto=producto,
+                motivo=motivo,
+                tipo=tipo,
+                cantidad=cantidad,
+                origen=origen,
+                destino=destino,
+                realizado_por=empleado,
+                transferencia=transferencia,
+            ))
+
+        for i, producto, cantidad, origen, destino, motivo, tipo in normalizadas:
+            if tipo in ("salida", "transferencia"):
+                inv_orig = inventarios.get((producto.pk, origen.pk))
+                if not inv_orig or inv_orig.cantidad_actual < cantidad:
+                    raise ValidationError(f"Línea {i}: inventario insuficiente para '{producto}' en {origen}.")
+                inv_orig.cantidad_actual -= cantidad
+                modificados[inv_orig.pk] = inv_orig
+
+            if tipo in ("entrada", "transferencia"):
+                inv_dest = inventarios[(producto.pk, destino.pk)]
+                inv_dest.cantidad_actual += cantidad
+                modificados[inv_dest.pk] = inv_dest
+            elif tipo == "ajuste":
+                inv_dest = inventarios[(producto.pk, destino.pk)]
+                inv_dest.cantidad_actual = cantidad
+                modificados[inv_dest.pk] = inv_dest
+
+            if tipo == "transferencia":
+                nuevo_movimiento(producto, cantidad, origen=origen, tipo="salida")
+                nuevo_movimiento(producto, cantidad, destino=destino, tipo="entrada")
+            elif tipo == "salida":
+                nuevo_movimiento(producto, cantidad, origen=origen, motivo=motivo, tipo=tipo)
+            else:
+                nuevo_movimiento(producto, cantidad, destino=destino, motivo=motivo, tipo=tipo)
+
+        # 5) Escribir stock y bitácora de una sola vez
+        Inventario.objects.bulk_update(list(modificados.values()), ["cantidad_actual"])
+        movimientos = MovimientoInventario.objects.bulk_create(movimientos)
+        despues_de_registrar(movimientos)
+        return movimientos
+
+
+
+
+#Alta de un producto nuevo con sus atributos, temporadas e inventario inicial (nuevo_producto y seleccionar_etiqueta_temp)
+def atributos_enviados(datos):
+    """{atributo_id: valor} de las llaves 'atributo_<id>' con valor (request.POST o lo guardado en sesión)."""
+    valores = {}
+    for key, value in datos.items():
+        if key.startswith("atributo_") and str(value).strip():
+            try:
+                valores[int(key.split("_")[1])] = str(value).strip()
+            except ValueError:
+                continue
+    return valores
+
+
+def validar_atributos(categoria_id, valores):
+    """
+    Revisa, sin escribir nada, que vengan todos los atributos de la subcategoría.
+    Devuelve {id: Atributo} con los de la subcategoría y los enviados (una sola consulta).
+    """
+    atributos = Atributo.objects.filter(Q(categoria_id=categoria_id) | Q(id__in=list(valores))).in_bulk()
+    faltantes = [
+        atributos[i].nombre for i in sorted(atributos)
+        if atributos[i].categoria_id == categoria_id and i not in valores
+    ]
+    if faltantes:
+        raise ValidationError(f"Faltan valores para: {', '.join(faltantes)}")
+    return atributos
+
+
+def crear_producto(producto, *, valores_atributos=None, temporadas=None, cantidad=0, ubicacion=None, empleado=None):
+    """
+    Guarda un producto nuevo (armado y sin guardar) con sus valores de atributo, temporadas e
+    inventario inicial en una sola transacción. Si faltan atributos obligatorios se lanza
+    ValidationError antes de escribir; los valores de atributo se insertan con un bulk_create.
+    """
+    valores_atributos = valores_atributos or {}
+    atributos = validar_atributos(producto.categoria_id, valores_atributos)
+
+    with transaction.atomic():
+        producto.save()
+        if temporadas:
+            producto.temporada.set(temporadas)
+        ValorAtributo.objects.bulk_create([
+            ValorAtributo(producto=producto, atributo=atributos[atributo_id], valor=valor)
+            for atributo_id, valor in valores_atributos.items()
+            if atributo_id in atributos
+        ])
+
+        # Producto recién creado: no hay inventario previo que leer ni bloquear
+        if cantidad > 0 and ubicacion:
+            Inventario.objects.create(producto=producto, ubicacion=ubicacion, cantidad_actual=cantidad)
+            registrar_movimiento(producto, cantidad, destino=ubicacion, empleado=empleado, motivo="nuevo", tipo="entrada")
+    return producto
+
+
 
 
 
-    
-    
 #Funciones para la generacion y manejo de codigo de barras
-def generar_codigo(producto_id, tamaño):
-    """
-    Genera un código de barras y su clase según el tamaño de etiqueta.
-    """
-    if tamaño == 'chica':
-        codigo = f"{producto_id:06d}{random.randint(100,999)}"
-        clase = Code128
-        tipo_str = 'code128'
-    elif tamaño == 'mediana':
-        codigo = f"{producto_id:06d}{random.randint(1000,9999)}"
-        clase = Code128
-        tipo_str = 'code128'
-    elif tamaño == 'grande':
-        # Genera un número de 12 dígitos para EAN13
-        codigo = f"{producto_id:06d}{random.randint(100000,999999)}"  # 6 + 6 = 12 dígitos
-        clase = EAN13
-        tipo_str = 'ean13'
-    return codigo, clase, tipo_str
+
+# Tamaños de etiqueta disponibles (los usa la selección de etiqueta y la hoja de etiquetas PDF)
+ETIQUETAS = [
+    {"nombre": "Pequeña", "tamaño": "50x20 mm", "tipo": "chica", "descripcion": "Ideal para empaques pequeños", "ancho_mm": 50, "alto_mm": 20},
+    {"nombre": "Mediana", "tamaño": "100x30 mm", "tipo": "mediana", "descripcion": "Para cajas medianas o productos estándar", "ancho_mm": 100, "alto_mm": 30},
+    {"nombre": "Grande", "tamaño": "135x32 mm", "tipo": "grande", "descripcion": "Para empaques grandes o logísticos", "ancho_mm": 135, "alto_mm": 32},
+]
+
+def generar_codigo(tamaño):
+    """
+    Asigna el siguiente código de barras libre para el tamaño de etiqueta (inventario.codigos)
+    y devuelve (código, clase, tipo_str).
+    """
+    codigo, tipo_str = codigos.siguiente_codigo(tamaño)
+    return codigo, CLASES[tipo_str], tipo_str
 
 
 def generar_base64(codigo, clase_barcode):
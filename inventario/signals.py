@@ -0,0 +1,177 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache_codigos, cache_productos, cache_reportes, codigos, lectura, rotacion
+from .busqueda import actualizar_texto_busqueda
+from .models import Atributo, Categoria, Inventario, Producto, Temporada, Ubicacion, ValorAtributo
+from tienda.models import Usuario
+
+
+# -----------------------------
+# Texto de búsqueda y modelo de lectura de productos
+# -----------------------------
+def refrescar_productos(producto_ids):
+    """Texto de búsqueda (ya) y lectura (al confirmar) de los productos cuyo catálogo cambió."""
+    producto_ids = list(producto_ids)
+    actualizar_texto_busqueda(producto_ids)
+    lectura.programar(producto_ids)
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refrescar_productos([instance.pk])
+
+
+@receiver(m2m_changed, sender=Producto.temporada.through)
+def temporadas_de_producto(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refrescar_productos([instance.pk])
+        return
+
+    # temporada.productos.add/remove/clear: instance es la Temporada
+    if action == "pre_clear":
+        instance._productos_antes_de_limpiar = list(instance.productos.values_list("id", flat=True))
+    elif action == "post_clear":
+        refrescar_productos(getattr(instance, "_productos_antes_de_limpiar", []))
+    elif action in ("post_add", "post_remove"):
+        refrescar_productos(pk_set)
+
+
+@receiver(post_save, sender=Categoria)
+def categoria_guardada(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    ids = Producto.objects.filter(categoria__in=[instance.pk, *instance.subcategorias.values_list("id", flat=True)])
+    refrescar_productos(ids.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Temporada)
+def temporada_guardada(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    refrescar_productos(instance.productos.values_list("id", flat=True))
+
+
+# -----------------------------
+# Modelo de lectura: atributos, existencias y nombres que aparecen en ProductoLectura.datos.
+# Va antes de la caché del escáner para que esta se borre después de regenerar la lectura.
+# -----------------------------
+@receiver(post_save, sender=ValorAtributo)
+@receiver(post_delete, sender=ValorAtributo)
+def valor_atributo_lectura(sender, instance, raw=False, **kwargs):
+    if not raw:
+        lectura.programar([instance.producto_id])
+
+
+@receiver(post_save, sender=Atributo)
+@receiver(post_delete, sender=Atributo)
+def atributo_lectura(sender, instance, raw=False, **kwargs):
+    if not raw:
+        lectura.programar(Producto.objects.filter(categoria_id=instance.categoria_id).values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Inventario)
+def inventario_borrado_lectura(sender, instance, **kwargs):
+    # Los cambios de stock llegan por services.despues_de_registrar
+    lectura.programar_stock([instance.producto_id])
+
+
+@receiver(post_save, sender=Ubicacion)
+def ubicacion_lectura(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        lectura.programar(Inventario.objects.filter(ubicacion=instance).values_list("producto_id", flat=True))
+
+
+@receiver(post_save, sender=Usuario)
+def usuario_lectura(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # Cada login guarda last_login: solo interesa el cambio de nombre de usuario de un dueño
+    if raw or created or (update_fields is not None and "username" not in update_fields):
+        return
+    lectura.programar(Producto.objects.filter(dueño__user=instance).values_list("id", flat=True))
+
+
+# -----------------------------
+# Caché de productos por código (escáner). Va antes de codigo_cambiado, que actualiza _codigo_original
+# -----------------------------
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def producto_cambiado_escaner(sender, instance, raw=False, **kwargs):
+    if not raw:
+        anterior = getattr(instance, "_codigo_original", (None, None))[0]
+        cache_productos.invalidar_codigos(anterior, instance.codigo_barras)
+
+
+@receiver(post_save, sender=ValorAtributo)
+@receiver(post_delete, sender=ValorAtributo)
+def valor_atributo_cambiado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache_productos.invalidar_producto(instance.producto_id)
+
+
+@receiver(post_save, sender=Atributo)
+@receiver(post_delete, sender=Atributo)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def atributos_cambiados(sender, raw=False, **kwargs):
+    if not raw:
+        cache_productos.invalidar_todo()
+
+
+# -----------------------------
+# Caché de imágenes de códigos de barras
+# -----------------------------
+@receiver(post_init, sender=Producto)
+def recordar_codigo(sender, instance, **kwargs):
+    instance._codigo_original = (instance.codigo_barras, instance.tipo_codigo)
+
+
+@receiver(pre_save, sender=Producto)
+def apartar_codigo(sender, instance, raw=False, **kwargs):
+    # Código capturado a mano (alta, edición, admin) con formato de una secuencia: se aparta antes
+    # de guardarlo para que la secuencia no lo vuelva a entregar. La importación aparta por lote.
+    anterior = getattr(instance, "_codigo_original", (None, None))[0]
+    if not raw and instance.codigo_barras and (instance._state.adding or instance.codigo_barras != anterior):
+        codigos.apartar_existentes([instance.codigo_barras])
+
+
+@receiver(post_save, sender=Producto)
+def codigo_cambiado(sender, instance, raw=False, **kwargs):
+    anterior = getattr(instance, "_codigo_original", (None, None))
+    actual = (instance.codigo_barras, instance.tipo_codigo)
+    if not raw and anterior != actual:
+        cache_codigos.invalidar(*anterior)
+    instance._codigo_original = actual
+
+
+@receiver(post_delete, sender=Producto)
+def producto_borrado(sender, instance, **kwargs):
+    cache_codigos.invalidar(instance.codigo_barras, instance.tipo_codigo)
+
+
+# -----------------------------
+# Caché de reportes: los movimientos invalidan desde services; aquí los cambios de catálogo
+# -----------------------------
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Temporada)
+@receiver(post_delete, sender=Temporada)
+@receiver(post_save, sender=Ubicacion)
+@receiver(post_delete, sender=Ubicacion)
+@receiver(post_delete, sender=Inventario)
+@receiver(m2m_changed, sender=Producto.temporada.through)
+def catalogo_cambiado(sender, raw=False, **kwargs):
+    if not raw:
+        cache_reportes.invalidar()
+
+
+# -----------------------------
+# Rotación: todo producto tiene su fila desde que se crea (aparece en "menos rotación")
+# -----------------------------
+@receiver(post_save, sender=Producto)
+def producto_creado_rotacion(sender, instance, raw=False, created=False, **kwargs):
+    if created and not raw:
+        rotacion.crear_filas([instance.pk])
@@ -1,3 +1,535 @@
+import io
+from datetime import timedelta
+
+import numpy as np
+
+from django.contrib.messages import get_messages
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
 from django.test import TestCase
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from tienda.models import Empleado, Usuario
+
+from . import bitacora, busqueda, cache_reportes, codigos, importacion, lectura, reabastecimiento, resumen_diario
+from .models import (
+    Atributo, Categoria, Inventario, MovimientoInventario, Producto, ProductoLectura, RotacionProducto,
+    SnapshotInventario, Ubicacion, ValorAtributo,
+)
+from .rotacion import registrar_rotacion
+from .services import (
+    aplicar_movimiento_inventario, aplicar_movimientos_inventario_lote, crear_producto, registrar_movimiento,
+)
+
+
+class MovimientosInventarioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Ubicacion.objects.create(nombre="Bodega Interna", direccion="x")
+        cls.piso = Ubicacion.objects.create(nombre="Piso", direccion="x")
+        cls.producto = Producto.objects.create(
+            nombre="Playera", descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4
+        )
+        cls.otro = Producto.objects.create(
+            nombre="Gorra", descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4
+        )
+
+    def setUp(self):
+        Inventario.objects.create(producto=self.producto, ubicacion=self.bodega, cantidad_actual=10)
+
+    def cantidad(self, producto, ubicacion):
+        return Inventario.objects.get(producto=producto, ubicacion=ubicacion).cantidad_actual
+
+    # -----------------------------
+    # Un movimiento (UPDATE condicional)
+    # -----------------------------
+    def test_venta_invalida_cache_de_reportes_una_vez(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            aplicar_movimiento_inventario(producto=self.producto, cantidad=1, origen=self.bodega, motivo="venta")
+        self.assertEqual(callbacks.count(cache_reportes._subir_generacion), 1)
+
+    def test_salida_descuenta_stock(self):
+        aplicar_movimiento_inventario(producto=self.producto, cantidad=4, origen=self.bodega, motivo="venta")
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 6)
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+
+    def test_salida_sin_stock_suficiente_se_rechaza(self):
+        with self.assertRaises(ValidationError):
+            aplicar_movimiento_inventario(producto=self.producto, cantidad=11, origen=self.bodega, motivo="venta")
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 10)
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_salida_sin_registro_de_inventario_se_rechaza(self):
+        with self.assertRaises(ValidationError):
+            aplicar_movimiento_inventario(producto=self.otro, cantidad=1, origen=self.bodega, motivo="venta")
+
+    def test_transferencia_sin_stock_no_crea_destino_ni_bitacora(self):
+        with self.assertRaises(ValidationError) as error:
+            aplicar_movimiento_inventario(
+                producto=self.producto, cantidad=20, origen=self.bodega, destino=self.piso, tipo="transferencia"
+            )
+        self.assertIsNone(error.exception.__cause__)
+        self.assertTrue(error.exception.__suppress_context__)
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 10)
+        self.assertFalse(Inventario.objects.filter(ubicacion=self.piso).exists())
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_transferencia_mueve_stock(self):
+        destino = aplicar_movimiento_inventario(
+            producto=self.producto, cantidad=3, origen=self.bodega, destino=self.piso, tipo="transferencia"
+        )
+        self.assertEqual(destino.cantidad_actual, 3)
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 7)
+        self.assertEqual(MovimientoInventario.objects.count(), 2)
+
+    def test_salida_no_relee_la_fila(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = aplicar_movimiento_inventario(producto=self.producto, cantidad=1, origen=self.bodega, motivo="venta")
+        self.assertIsNone(resultado)
+        lecturas = [q["sql"] for q in consultas if q["sql"].startswith("SELECT") and '"inventario_inventario"' in q["sql"]]
+        self.assertEqual(lecturas, [])
+
+    # -----------------------------
+    # Lote (todo o nada)
+    # -----------------------------
+    def test_lote_aplica_lineas_repetidas_en_orden(self):
+        movimientos = aplicar_movimientos_inventario_lote([
+            (self.producto, 4, self.bodega, None, "venta"),
+            (self.producto, 6, self.bodega, None, "venta"),
+            dict(producto=self.otro, cantidad=5, destino=self.piso, motivo="compra"),
+        ])
+        self.assertEqual(len(movimientos), 3)
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 0)
+        self.assertEqual(self.cantidad(self.otro, self.piso), 5)
+
+    def test_lote_lineas_repetidas_que_sobregiran_se_rechazan(self):
+        # Cada línea alcanza por separado, juntas no
+        with self.assertRaises(ValidationError):
+            aplicar_movimientos_inventario_lote([
+                (self.producto, 6, self.bodega, None, "venta"),
+                (self.producto, 6, self.bodega, None, "venta"),
+            ])
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 10)
+
+    def test_lote_con_una_linea_invalida_no_escribe_nada(self):
+        with self.assertRaises(ValidationError) as error:
+            aplicar_movimientos_inventario_lote([
+                dict(producto=self.otro, cantidad=5, destino=self.piso, motivo="compra"),
+                dict(producto=self.producto, cantidad=3, origen=self.bodega, destino=self.piso, tipo="transferencia"),
+                dict(producto=self.producto, cantidad=50, origen=self.bodega, motivo="venta"),
+            ])
+        self.assertIn("Línea 3", error.exception.messages[0])
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 10)
+        self.assertFalse(Inventario.objects.filter(ubicacion=self.piso).exists())
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_lote_no_toca_otras_ubicaciones_del_producto(self):
+        Inventario.objects.create(producto=self.producto, ubicacion=self.piso, cantidad_actual=8)
+        aplicar_movimientos_inventario_lote([
+            (self.producto, 2, self.bodega, None, "venta"),
+            dict(producto=self.otro, cantidad=1, destino=self.piso, motivo="compra"),
+        ])
+        self.assertEqual(self.cantidad(self.producto, self.bodega), 8)
+        self.assertEqual(self.cantidad(self.producto, self.piso), 8)
+
+
+class BitacoraTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Ubicacion.objects.create(nombre="Bodega Interna", direccion="x")
+        cls.piso = Ubicacion.objects.create(nombre="Piso", direccion="x")
+        cls.producto = Producto.objects.create(
+            nombre="Playera", descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4
+        )
+
+    def mover(self, **datos):
+        aplicar_movimiento_inventario(producto=self.producto, **datos)
+
+    def test_snapshot_mas_movimientos_igual_a_reproducir_todo(self):
+        self.mover(cantidad=10, destino=self.bodega, motivo="compra")
+        self.mover(cantidad=3, origen=self.bodega, motivo="venta")
+        self.mover(cantidad=2, origen=self.bodega, destino=self.piso, tipo="transferencia")
+        corte = bitacora.tomar_snapshot()
+        self.assertEqual(corte, MovimientoInventario.objects.latest("id").id)
+
+        self.mover(cantidad=7, destino=self.piso, motivo="conteo")
+        self.mover(cantidad=1, origen=self.bodega, motivo="venta")
+        esperado = {(self.producto.id, self.bodega.id): 4, (self.producto.id, self.piso.id): 7}
+        self.assertEqual(bitacora.calcular_saldos(), esperado)
+
+        # Sin snapshot se reproduce todo el historial y debe dar lo mismo
+        SnapshotInventario.objects.all().delete()
+        self.assertEqual(bitacora.calcular_saldos(), esperado)
+        self.assertEqual(bitacora.diferencias_inventario(), [])
+
+    def test_snapshot_filtra_por_ubicacion(self):
+        self.mover(cantidad=5, destino=self.bodega, motivo="compra")
+        self.mover(cantidad=2, origen=self.bodega, destino=self.piso, tipo="transferencia")
+        bitacora.tomar_snapshot()
+        self.mover(cantidad=1, origen=self.piso, motivo="venta")
+        self.assertEqual(
+            bitacora.calcular_saldos(producto_id=self.producto.id, ubicacion_id=self.piso.id),
+            {(self.producto.id, self.piso.id): 1},
+        )
+
+    def test_stock_a_fecha(self):
+        ahora = timezone.now()
+        for dias, datos in [
+            (10, dict(cantidad=10, destino=self.bodega, motivo="compra")),
+            (5, dict(cantidad=4, origen=self.bodega, motivo="venta")),
+            (1, dict(cantidad=20, destino=self.bodega, motivo="conteo")),
+        ]:
+            self.mover(**datos)
+            MovimientoInventario.objects.filter(id=MovimientoInventario.objects.latest("id").id).update(
+                fecha=ahora - timedelta(days=dias)
+            )
+
+        self.assertEqual(bitacora.stock_a_fecha(self.producto, self.bodega, ahora - timedelta(days=11)), 0)
+        self.assertEqual(bitacora.stock_a_fecha(self.producto, self.bodega, ahora - timedelta(days=7)), 10)
+        self.assertEqual(bitacora.stock_a_fecha(self.producto, self.bodega, ahora - timedelta(days=3)), 6)
+        self.assertEqual(bitacora.stock_a_fecha(self.producto.id, self.bodega.id, ahora), 20)
+
+    def test_reconstruir_corrige_filas_desviadas_y_faltantes(self):
+        self.mover(cantidad=10, destino=self.bodega, motivo="compra")
+        self.mover(cantidad=4, origen=self.bodega, destino=self.piso, tipo="transferencia")
+        Inventario.objects.filter(ubicacion=self.bodega).update(cantidad_actual=99)
+        Inventario.objects.filter(ubicacion=self.piso).delete()
+
+        diferencias = bitacora.reconstruir_inventario()
+
+        self.assertEqual(diferencias, [
+            (self.producto.id, self.bodega.id, 6, 99),
+            (self.producto.id, self.piso.id, 4, None),
+        ])
+        self.assertEqual(Inventario.objects.get(ubicacion=self.bodega).cantidad_actual, 6)
+        self.assertEqual(Inventario.objects.get(ubicacion=self.piso).cantidad_actual, 4)
+        self.assertEqual(bitacora.diferencias_inventario(), [])
+
+    def test_reconstruir_con_saldo_negativo_no_toca_nada(self):
+        Inventario.objects.create(producto=self.producto, ubicacion=self.bodega, cantidad_actual=5)
+        registrar_movimiento(self.producto, 3, origen=self.bodega, tipo="salida")
+        with self.assertRaises(ValueError):
+            bitacora.reconstruir_inventario()
+        self.assertEqual(Inventario.objects.get(ubicacion=self.bodega).cantidad_actual, 5)
+
+    def test_reconstruir_bloquea_inventario_antes_de_leer_la_bitacora(self):
+        self.mover(cantidad=10, destino=self.bodega, motivo="compra")
+        with CaptureQueriesContext(connection) as consultas:
+            bitacora.reconstruir_inventario()
+        lecturas = [q["sql"] for q in consultas if q["sql"].startswith("SELECT")]
+        primera = lambda tabla: next(i for i, sql in enumerate(lecturas) if f'FROM "{tabla}"' in sql)
+        self.assertLess(primera("inventario_inventario"), primera("inventario_movimientoinventario"))
+
+
+class RotacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Ubicacion.objects.create(nombre="Bodega Interna", direccion="x")
+        cls.productos = [
+            Producto.objects.create(nombre=n, descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4)
+            for n in ("Playera", "Gorra")
+        ]
+
+    def movimiento(self, producto, fecha):
+        return MovimientoInventario(producto=producto, tipo="entrada", cantidad=1, destino=self.bodega, fecha=fecha)
+
+    def ultimo(self, producto):
+        return RotacionProducto.objects.get(producto=producto).ultimo_movimiento
+
+    def test_ultimo_movimiento_es_el_de_cada_producto(self):
+        ahora = timezone.now()
+        playera, gorra = self.productos
+        registrar_rotacion([self.movimiento(playera, ahora - timedelta(days=3)), self.movimiento(gorra, ahora)])
+        self.assertEqual(self.ultimo(playera), ahora - timedelta(days=3))
+        self.assertEqual(self.ultimo(gorra), ahora)
+
+    def test_movimiento_atrasado_no_regresa_ultimo_movimiento(self):
+        ahora = timezone.now()
+        playera, gorra = self.productos
+        registrar_rotacion([self.movimiento(playera, ahora)])
+        registrar_rotacion([self.movimiento(playera, ahora - timedelta(days=10)), self.movimiento(gorra, ahora - timedelta(days=1))])
+        self.assertEqual(self.ultimo(playera), ahora)
+        self.assertEqual(self.ultimo(gorra), ahora - timedelta(days=1))
+        self.assertEqual(RotacionProducto.objects.get(producto=playera).movimientos_total, 2)
+
+
+class BusquedaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # El primero (el más viejo) es el que mejor coincide: texto corto con el término.
+        cls.productos = [
+            Producto.objects.create(
+                nombre="Playera" if i == 0 else f"Playera modelo {i} algodón manga corta",
+                descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4,
+            )
+            for i in range(8)
+        ]
+
+    def test_paginas_no_repiten_ni_omiten_resultados(self):
+        todos, hay_mas = busqueda.buscar_productos("playera", por_pagina=50)
+        self.assertFalse(hay_mas)
+        paginas, pagina, hay_mas = [], 1, True
+        while hay_mas:
+            resultados, hay_mas = busqueda.buscar_productos("playera", pagina=pagina, por_pagina=3)
+            paginas.extend(p.id for p in resultados)
+            pagina += 1
+        self.assertEqual(paginas, [p.id for p in todos])
+        self.assertCountEqual(paginas, [p.id for p in self.productos])
+
+    def test_producto_viejo_con_mejor_coincidencia_sale_primero(self):
+        resultados, _ = busqueda.buscar_productos("playera", por_pagina=3)
+        self.assertEqual(resultados[0].id, self.productos[0].id)
+
+
+class ReabastecimientoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.piso = Ubicacion.objects.create(nombre=reabastecimiento.UBICACION_PISO, direccion="x")
+        cls.bodega = Ubicacion.objects.create(nombre=reabastecimiento.UBICACION_BODEGA, direccion="x")
+        cls.productos = [
+            Producto.objects.create(nombre=n, descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4)
+            for n in ("Playera", "Gorra")
+        ]
+
+    # -----------------------------
+    # Pronóstico
+    # -----------------------------
+    def test_suavizado_igual_al_recorrido_dia_por_dia(self):
+        matriz = np.array([[3, 0, 5, 1, 0, 2, 4], [0, 0, 0, 0, 0, 0, 7], [1, 1, 1, 1, 1, 1, 1]], dtype=float)
+        esperado = []
+        for fila in matriz:
+            nivel = fila[0]
+            for x in fila[1:]:
+                nivel = reabastecimiento.ALFA * x + (1 - reabastecimiento.ALFA) * nivel
+            esperado.append(nivel)
+        np.testing.assert_allclose(reabastecimiento.pronosticar(matriz, "suavizado"), esperado)
+
+    def test_promedio_usa_solo_la_ventana(self):
+        matriz = np.zeros((1, reabastecimiento.VENTANA + 5))
+        matriz[0, :5] = 100
+        matriz[0, -reabastecimiento.VENTANA:] = 2
+        np.testing.assert_allclose(reabastecimiento.pronosticar(matriz), [2])
+
+    # -----------------------------
+    # Sugerencias
+    # -----------------------------
+    def test_transferencia_limitada_a_lo_que_hay_en_bodega(self):
+        hoy = timezone.localdate()
+        playera, gorra = self.productos
+        for producto, piso, bodega in ((playera, 3, 5), (gorra, 20, 10)):
+            Inventario.objects.create(producto=producto, ubicacion=self.piso, cantidad_actual=piso)
+            Inventario.objects.create(producto=producto, ubicacion=self.bodega, cantidad_actual=bodega)
+        # 2 piezas diarias de cada producto en toda la ventana del promedio
+        ventas = MovimientoInventario.objects.bulk_create(
+            MovimientoInventario(producto=producto, tipo="salida", motivo="venta", cantidad=2, origen=self.piso)
+            for producto in self.productos
+            for _ in range(reabastecimiento.VENTANA)
+        )
+        for i, venta in enumerate(ventas):
+            dia = hoy - timedelta(days=i % reabastecimiento.VENTANA + 1)
+            venta.fecha = resumen_diario.inicio_del_dia(dia) + timedelta(hours=12)
+        MovimientoInventario.objects.bulk_update(ventas, ["fecha"])
+
+        filas = reabastecimiento.sugerencias(Q(), hoy=hoy)
+
+        self.assertEqual([f["producto_id"] for f in filas], [playera.id, gorra.id])
+        self.assertEqual(filas[0]["demanda_diaria"], 2)
+        # Piso necesita 2 * DIAS_PISO - 3 pero en Bodega solo hay 5
+        self.assertEqual(filas[0]["transferir"], min(2 * reabastecimiento.DIAS_PISO - 3, 5))
+        self.assertEqual(filas[0]["comprar"], max(2 * reabastecimiento.DIAS_COMPRA - 8, 0))
+        self.assertEqual(filas[1]["transferir"], max(min(2 * reabastecimiento.DIAS_PISO - 20, 10), 0))
+        self.assertEqual(filas[1]["comprar"], max(2 * reabastecimiento.DIAS_COMPRA - 30, 0))
+
+
+class CodigosTests(TestCase):
+    def producto(self, codigo):
+        return Producto(
+            nombre="Playera", descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4, codigo_barras=codigo
+        )
+
+    def test_digito_control_gs1_de_codigos_conocidos(self):
+        self.assertEqual(codigos.digito_control_gs1("400638133393"), "1")   # EAN-13 4006381333931
+        self.assertEqual(codigos.digito_control_gs1("590123412345"), "7")   # EAN-13 5901234123457
+        self.assertEqual(codigos.digito_control_gs1("03600029145"), "2")    # UPC-A 036000291452
+        self.assertEqual(codigos.digito_control_gs1("9638507"), "4")        # EAN-8 96385074
+
+    def test_reservar_codigos_consecutivos(self):
+        tipo, primeros = codigos.reservar_codigos("grande", 3)
+        _, siguientes = codigos.reservar_codigos("grande", 2)
+        self.assertEqual(tipo, "ean13")
+        self.assertEqual(primeros + siguientes, [codigos.formatear("grande", n) for n in range(1, 6)])
+        for codigo in primeros + siguientes:
+            self.assertEqual(len(codigo), 13)
+            self.assertTrue(codigo.startswith(codigos.PREFIJO_EAN))
+            self.assertEqual(codigo[-1], codigos.digito_control_gs1(codigo[:-1]))
+        self.assertEqual(codigos.reservar_codigos("chica", 1), ("code128", ["C00000001"]))
+        with self.assertRaises(ValueError):
+            codigos.reservar_codigos("enorme")
+
+    def test_codigo_capturado_a_mano_adelanta_la_secuencia(self):
+        codigos.reservar_codigos("grande", 1)
+        crear_producto(self.producto(codigos.formatear("grande", 40)))
+        self.assertEqual(codigos.siguiente_codigo("grande")[0], codigos.formatear("grande", 41))
+
+    def test_codigo_editado_adelanta_la_secuencia(self):
+        codigos.reservar_codigos("mediana", 1)
+        producto = self.producto("")
+        producto.save()
+        producto.codigo_barras = codigos.formatear("mediana", 7)
+        producto.save()
+        self.assertEqual(codigos.siguiente_codigo("mediana")[0], codigos.formatear("mediana", 8))
+
+
+class ImportacionTests(TestCase):
+    CSV = (
+        "nombre,descripcion,precio_menudeo,precio_mayoreo,precio_docena,categoria,subcategoria,dueño,codigo_barras,cantidad,ubicacion,Talla\n"
+        "Playera lisa,Algodón,100,80,70,Ropa,Playeras,ana,M000000050,5,Bodega Interna,M\n"
+        "Playera rayas,Algodón,\"$1,200.00\",90,80,Ropa,Playeras,ana,,,,G\n"
+        "Playera cara,Algodón,50,80,70,Ropa,Playeras,ana,,,,\n"
+        "Playera copia,Algodón,100,80,70,Ropa,Playeras,ana,M000000050,,,M\n"
+        "Gorra,Algodón,100,80,70,Ropa,Playeras,ana,C00000099,,,M\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Ubicacion.objects.create(nombre="Bodega Interna", direccion="x")
+        ropa = Categoria.objects.create(nombre="Ropa")
+        cls.playeras = Categoria.objects.create(nombre="Playeras", padre=ropa)
+        cls.talla = Atributo.objects.create(nombre="Talla", categoria=cls.playeras)
+        usuario = Usuario.objects.create(username="ana", email="ana@example.com")
+        cls.dueño = Empleado.objects.create(
+            user=usuario, rol="dueño", direccion="x", numero_contacto="x",
+            contacto_emergencia="x", descripcion_contacto_emergencia="x",
+        )
+        Producto.objects.create(
+            nombre="Gorra", descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4,
+            codigo_barras="C00000099",
+        )
+
+    def importar(self, **opciones):
+        filas = importacion.leer_filas(io.BytesIO(self.CSV.encode("utf-8")), "productos.csv")
+        return importacion.importar_productos(filas, etiqueta="chica", **opciones)
+
+    def test_filas_buenas_se_guardan_y_las_malas_se_reportan(self):
+        resultado = self.importar()
+
+        self.assertEqual((resultado["filas"], resultado["creados"]), (5, 2))
+        errores = dict(resultado["errores"])
+        self.assertEqual(sorted(errores), [4, 5, 6])
+        self.assertIn("mayoreo no puede ser mayor", errores[4])
+        self.assertIn("Faltan valores para: Talla", errores[4])
+        self.assertIn("repetido en el archivo", errores[5])
+        self.assertIn("Ya existe un producto con el código C00000099", errores[6])
+
+        lisa = Producto.objects.get(nombre="Playera lisa")
+        rayas = Producto.objects.get(nombre="Playera rayas")
+        self.assertEqual(lisa.codigo_barras, "M000000050")
+        self.assertEqual(str(rayas.precio_menudeo), "1200.00")
+        self.assertEqual(lisa.dueño_id, self.dueño.id)
+        self.assertEqual(
+            dict(ValorAtributo.objects.filter(atributo=self.talla).values_list("producto__nombre", "valor")),
+            {"Playera lisa": "M", "Playera rayas": "G"},
+        )
+        self.assertEqual(Inventario.objects.get(producto=lisa, ubicacion=self.bodega).cantidad_actual, 5)
+        self.assertEqual(MovimientoInventario.objects.get(producto=lisa).motivo, "nuevo")
+        self.assertFalse(Inventario.objects.filter(producto=rayas).exists())
+
+        # El código generado sigue al más alto de la base y el capturado adelanta su secuencia
+        self.assertEqual(rayas.codigo_barras, "C00000100")
+        self.assertEqual(codigos.siguiente_codigo("mediana")[0], "M000000051")
+
+    def test_simular_solo_valida(self):
+        resultado = self.importar(simular=True)
+        self.assertEqual(resultado["creados"], 2)
+        self.assertEqual(sorted(dict(resultado["errores"])), [4, 5, 6])
+        self.assertEqual(Producto.objects.count(), 1)
+
+
+class NuevoProductoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_superuser(username="admin", email="admin@example.com", password="x")
+        cls.dueño = Empleado.objects.create(
+            user=Usuario.objects.create(username="ana", email="ana@example.com"), rol="dueño",
+            direccion="x", numero_contacto="x", contacto_emergencia="x", descripcion_contacto_emergencia="x",
+        )
+        cls.bodega = Ubicacion.objects.create(nombre="Bodega Interna", direccion="x")
+        cls.ropa = Categoria.objects.create(nombre="Ropa")
+        cls.playeras = Categoria.objects.create(nombre="Playeras", padre=cls.ropa)
+        cls.talla = Atributo.objects.create(nombre="Talla", categoria=cls.playeras)
+        cls.color = Atributo.objects.create(nombre="Color", categoria=cls.playeras)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def enviar(self, valores):
+        datos = {
+            "nombre": "Playera", "descripcion": "x", "precio_menudeo": "10", "precio_mayoreo": "5",
+            "precio_docena": "4", "dueño": self.dueño.id, "codigo_barras": "M000000050",
+            "categoria_padre": self.ropa.id, "subcategoria": self.playeras.id,
+            "cantidad_inicial": "3", "ubicacion": self.bodega.id,
+            **{f"atributo_{atributo.id}": valor for atributo, valor in valores.items()},
+        }
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(reverse("inventario:nuevo_producto"), datos)
+        return respuesta, consultas
+
+    def test_producto_con_codigo_usa_la_subcategoria_del_formulario(self):
+        respuesta, consultas = self.enviar({self.talla: "M", self.color: "Rojo"})
+
+        self.assertRedirects(respuesta, reverse("inventario:lista_productos"), fetch_redirect_response=False)
+        producto = Producto.objects.get(codigo_barras="M000000050")
+        self.assertEqual(producto.categoria_id, self.playeras.id)
+        self.assertEqual(
+            dict(producto.valores_atributo.values_list("atributo__nombre", "valor")), {"Talla": "M", "Color": "Rojo"}
+        )
+        self.assertEqual(Inventario.objects.get(producto=producto).cantidad_actual, 3)
+        # Los valores de atributo se escriben con un solo INSERT
+        inserts = [q["sql"] for q in consultas.captured_queries if q["sql"].startswith('INSERT INTO "inventario_valoratributo"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_atributo_faltante_no_guarda_nada(self):
+        respuesta, _ = self.enviar({self.talla: "M"})
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn("Faltan valores para: Color", [str(m) for m in get_messages(respuesta.wsgi_request)])
+        self.assertFalse(Producto.objects.exists())
+        self.assertFalse(ValorAtributo.objects.exists())
+
+
+class LecturaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bodega = Ubicacion.objects.create(nombre="Bodega Interna", direccion="x")
+        cls.piso = Ubicacion.objects.create(nombre="Piso", direccion="x")
+        cls.producto = Producto.objects.create(
+            nombre="Playera", descripcion="x", precio_mayoreo=5, precio_menudeo=10, precio_docena=4
+        )
+        Inventario.objects.create(producto=cls.producto, ubicacion=cls.bodega, cantidad_actual=10)
+        lectura.actualizar([cls.producto.id])
+
+    def datos(self):
+        return ProductoLectura.objects.get(producto=self.producto).datos
+
+    def test_venta_solo_reescribe_existencias(self):
+        # Si la venta volviera a armar todo, el nombre marcado se perdería
+        datos = self.datos()
+        datos["nombre"] = "sin rearmar"
+        ProductoLectura.objects.filter(producto=self.producto).update(datos=datos)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar_movimiento_inventario(
+                producto=self.producto, cantidad=3, origen=self.bodega, destino=self.piso, tipo="transferencia"
+            )
+
+        datos = self.datos()
+        self.assertEqual(datos["stock"], {"Bodega Interna": 7, "Piso": 3})
+        self.assertEqual(datos["stock_total"], 10)
+        self.assertEqual(datos["nombre"], "sin rearmar")
 
-# Create your tests here.
+    def test_producto_sin_fila_se_arma_completo(self):
+        ProductoLectura.objects.all().delete()
+        lectura.actualizar_stock([self.producto.id])
+        self.assertEqual(self.datos(), lectura.armar([self.producto.id])[self.producto.id])
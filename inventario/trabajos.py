@@ -0,0 +1,127 @@
+import hashlib
+import json
+from tempfile import SpooledTemporaryFile
+
+from django.core.files import File
+from django.db import DatabaseError
+from django.utils import timezone
+
+from . import reports
+from .models import ReporteJob
+
+
+# -----------------------------
+# Reportes en segundo plano
+# -----------------------------
+# La vista solo encola un ReporteJob; el comando procesar_reportes reclama los pendientes
+# y los genera en un pool de procesos, fuera de los workers web. El PDF terminado se
+# guarda en MEDIA_ROOT/reportes/ y se descarga desde la vista descargar_reporte.
+#   pendiente → procesando → terminado | error
+
+ACTIVOS = ("pendiente", "procesando")
+
+
+def clave_reporte(tipo, filtros):
+    """Hash estable de tipo + filtros (el dict de reports.parse_filtros)."""
+    datos = json.dumps([tipo, filtros], sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+def encolar_reporte(tipo, filtros, usuario=None):
+    """
+    Crea un trabajo pendiente, o devuelve el que ya está pendiente/procesando con los
+    mismos filtros. Devuelve (trabajo, creado).
+    """
+    clave = clave_reporte(tipo, filtros)
+    existente = ReporteJob.objects.filter(clave=clave, estado__in=ACTIVOS).order_by("creado").first()
+    if existente:
+        return existente, False
+
+    trabajo = ReporteJob.objects.create(
+        tipo=tipo,
+        filtros=filtros,
+        clave=clave,
+        solicitado_por=usuario if getattr(usuario, "pk", None) else None,
+        usuario_nombre=(usuario.get_full_name() or usuario.username) if usuario else "",
+    )
+    return trabajo, True
+
+
+def reclamar_siguiente():
+    """
+    Marca como 'procesando' el pendiente más antiguo y lo devuelve (None si no hay).
+    El UPDATE condicionado a estado='pendiente' evita que dos workers tomen el mismo.
+    """
+    for pk in ReporteJob.objects.filter(estado="pendiente").order_by("creado").values_list("pk", flat=True)[:10]:
+        tomado = ReporteJob.objects.filter(pk=pk, estado="pendiente").update(
+            estado="procesando", progreso=0, iniciado=timezone.now()
+        )
+        if tomado:
+            return ReporteJob.objects.get(pk=pk)
+    return None
+
+
+def reencolar_interrumpidos():
+    """Regresa a 'pendiente' los trabajos que quedaron procesando si el worker se detuvo."""
+    return ReporteJob.objects.filter(estado="procesando").update(estado="pendiente", progreso=0, iniciado=None)
+
+
+def marcar_error(trabajo_id, error):
+    return ReporteJob.objects.filter(pk=trabajo_id).update(
+        estado="error", error=str(error) or error.__class__.__name__, terminado=timezone.now()
+    )
+
+
+def inicializar_proceso():
+    """Initializer del pool: con 'spawn' cada proceso hijo necesita configurar Django."""
+    import django
+    django.setup()
+
+
+def ejecutar_reporte(trabajo_id):
+    """Genera el PDF de un trabajo ya reclamado. Corre dentro de un proceso del pool."""
+    trabajo = ReporteJob.objects.get(pk=trabajo_id)
+    filtros = trabajo.filtros
+    avance = {"ultimo": 0}
+
+    def guardar_progreso(porcentaje):
+        porcentaje = max(0, min(int(porcentaje), 99))
+        if porcentaje > avance["ultimo"]:
+            avance["ultimo"] = porcentaje
+            try:
+                ReporteJob.objects.filter(pk=trabajo_id).update(progreso=porcentaje)
+            except DatabaseError:
+                # En SQLite la lectura por lotes sigue abierta y otro proceso pudo escribir
+                # mientras tanto; el progreso es informativo, se reintenta en el siguiente lote
+                pass
+
+    try:
+        archivo = SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+        if trabajo.tipo == "criticos":
+            reports.escribir_pdf_criticos(archivo, trabajo.usuario_nombre, filtros.get("ubicacion"))
+        else:
+            total = reports.contar_datos_reporte(
+                trabajo.tipo,
+                categoria_id=filtros.get("categoria"),
+                subcategoria_id=filtros.get("subcategoria"),
+                temporada_id=filtros.get("temporada"),
+                ubicacion_id=filtros.get("ubicacion"),
+                dueño_id=filtros.get("dueño"),
+                movimiento_tipo=filtros.get("movimiento"),
+                desde=filtros.get("desde"),
+                hasta=filtros.get("hasta"),
+                pronostico=filtros.get("pronostico"),
+            )
+            reports.escribir_pdf_reporte(
+                archivo, trabajo.tipo, filtros, trabajo.usuario_nombre,
+                progreso=lambda filas: guardar_progreso(filas * 100 / max(total, 1)),
+            )
+
+        archivo.seek(0)
+        trabajo.archivo.save(f"reporte_{trabajo.tipo}_{trabajo.pk}.pdf", File(archivo), save=False)
+        trabajo.estado, trabajo.progreso = "terminado", 100
+    except Exception as e:
+        trabajo.estado, trabajo.error = "error", str(e) or e.__class__.__name__
+    trabajo.terminado = timezone.now()
+    trabajo.save(update_fields=["archivo", "estado", "progreso", "error", "terminado"])
+    return trabajo.pk, trabajo.estado
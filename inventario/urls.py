@@ -6,11 +6,21 @@ app_name = 'inventario'
 urlpatterns = [
     path('categorias/', views.categoria_view, name='categorias'),
     path('nuevo_producto/', views.nuevo_producto, name='nuevo_producto'),
+    path('importar_productos/', views.importar_productos, name='importar_productos'),
     path('productos/', views.lista_productos, name='lista_productos'),
+    path('api/kanban/<int:ubicacion_id>/', views.api_kanban, name='api_kanban'),
+    path('api/productos/buscar/', views.api_buscar_productos, name='api_buscar_productos'),
     path('reportes/', views.reportes, name='reportes'),
     path('reportes/pdf/', views.reporte_pdf, name='reporte_pdf'),
+    path('reportes/exportar.<str:formato>', views.reporte_exportar, name='reporte_exportar'),
+    path('api/reportes/cache/', views.api_cache_reportes, name='api_cache_reportes'),
+    path('reportes/trabajos/encolar/', views.encolar_reporte, name='encolar_reporte'),
+    path('reportes/trabajos/<int:trabajo_id>/', views.estado_reporte, name='estado_reporte'),
+    path('reportes/trabajos/<int:trabajo_id>/descargar/', views.descargar_reporte, name='descargar_reporte'),
     path('producto/<int:producto_id>/codigo_base64/', views.codigo_base64, name='codigo_base64'),
+    path('producto/<int:producto_id>/codigo.<str:formato>', views.codigo_imagen, name='codigo_imagen'),
     path('seleccionar_etiqueta_temp/', views.seleccionar_etiqueta_temp, name='seleccionar_etiqueta_temp'),
+    path('etiquetas/pdf/', views.etiquetas_pdf, name='etiquetas_pdf'),
     path('buscar_producto/', views.buscar_producto_por_codigo, name='buscar_producto'),    
     path('verificar_inventario/', views.verificar_inventario_existente, name='verificar_inventario'),
     path('agregar_inventario/<int:producto_id>/<int:ubicacion_id>/',views.agregar_inventario, name='agregar_inventario'),
@@ -1,22 +1,28 @@
+import base64
 import decimal
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.urls import reverse
-from .models import Categoria, Atributo, Producto, ValorAtributo, Ubicacion, Empleado, Inventario, Temporada, MovimientoInventario
-from django.http import HttpResponse, JsonResponse
+from .models import Categoria, Atributo, Producto, ValorAtributo, Ubicacion, Empleado, Inventario, Temporada, MovimientoInventario, RotacionProducto, ReporteJob
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
 from datetime import datetime
 from barcode import EAN13, Code128
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from .forms import CategoriaForm, TransferenciaInventarioForm, AgregarInventarioForm
-from .services import aplicar_movimiento_inventario, registrar_movimiento, generar_codigo, generar_base64, detectar_tipo_codigo
-from .forms import ProductoForm
+from .services import aplicar_movimiento_inventario, registrar_movimiento, generar_codigo, generar_base64, detectar_tipo_codigo, ETIQUETAS
+from .services import atributos_enviados, crear_producto, validar_atributos
+from .forms import ProductoForm, ImportarProductosForm
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count
-from inventario import reports
+from django.db.models import F, QuerySet, Sum
+from inventario import busqueda, cache_codigos, cache_productos, cache_reportes, importacion, lectura, reorden, reports, rotacion, trabajos
+from .rotacion import campo_ventana
 from django.core.files.uploadedfile import InMemoryUploadedFile
+from zipfile import BadZipFile
 
 
 
@@ -51,6 +57,18 @@ def nuevo_producto(request):
         if form.is_valid():
             # 🚨 Validar antes de guardar: si no hay código, mandar a seleccionar etiqueta
             if not codigo or codigo.strip() in ["", "0", "None"]:
+                # 🔍 Atributos obligatorios revisados aquí, antes de pasar a la etiqueta
+                subcategoria = form.cleaned_data.get('subcategoria')
+                try:
+                    validar_atributos(subcategoria.id if subcategoria else None, atributos_enviados(request.POST))
+                except ValidationError as e:
+                    messages.error(request, " ".join(e.messages))
+                    return render(request, 'inventario/nuevo_producto.html', {
+                        'form': form,
+                        'atributos': Atributo.objects.select_related('categoria').all(),
+                        'subcategorias': Categoria.objects.filter(padre__isnull=False),
+                    })
+
                 messages.info(request, "Este producto no tiene código de barras. Selecciona una etiqueta.")
 
                 # Guardamos datos limpios del formulario pero solo valores simples
@@ -60,7 +78,7 @@ def nuevo_producto(request):
                         pendiente[key] = str(value)
                     elif hasattr(value, "pk"):  # Model instance
                         pendiente[key] = value.pk
-                    elif isinstance(value, (list, tuple)):
+                    elif isinstance(value, (list, tuple, QuerySet)):
                         ids = []
                         for v in value:
                             ids.append(v.pk if hasattr(v, "pk") else str(v))
@@ -106,8 +124,8 @@ def nuevo_producto(request):
                 producto.dueño = dueño
 
             # 🔍 Subcategoría seleccionada en el formulario
-            subcategoria = form.cleaned_data.get('categoria')
-            if not subcategoria or subcategoria.padre is None:
+            subcategoria = form.cleaned_data.get('subcategoria')
+            if not subcategoria or subcategoria.padre_id is None:
                 messages.error(request, "Debes seleccionar una subcategoría válida.")
                 return render(request, 'inventario/nuevo_producto.html', {
                     'form': form,
@@ -122,56 +140,27 @@ def nuevo_producto(request):
             producto.precio_menudeo = form.cleaned_data.get("precio_menudeo") or 0
             producto.precio_docena = form.cleaned_data.get("precio_docena") or 0
 
-            producto.save()
-
-            # 🔍 Validar atributos requeridos
-            atributos_faltantes = []
-            atributos_requeridos = Atributo.objects.filter(categoria=subcategoria)
-            for atributo in atributos_requeridos:
-                key = f"atributo_{atributo.id}"
-                valor = request.POST.get(key, '').strip()
-                if not valor:
-                    atributos_faltantes.append(atributo.nombre)
+            # 🧠 Detectar tipo de código (antes de guardar: un solo INSERT)
+            producto.tipo_codigo = detectar_tipo_codigo(producto.codigo_barras)
 
-            if atributos_faltantes:
-                producto.delete()
-                messages.error(request, f"Faltan valores para: {', '.join(atributos_faltantes)}")
+            # 💾 Producto, atributos, temporadas e inventario inicial; los atributos se validan antes de escribir
+            try:
+                crear_producto(
+                    producto,
+                    valores_atributos=atributos_enviados(request.POST),
+                    temporadas=form.cleaned_data.get('temporada'),
+                    cantidad=cantidad,
+                    ubicacion=ubicacion,
+                    empleado=getattr(request.user, "empleado", None),
+                )
+            except ValidationError as e:
+                messages.error(request, " ".join(e.messages))
                 return render(request, 'inventario/nuevo_producto.html', {
                     'form': form,
                     'atributos': Atributo.objects.select_related('categoria').all(),
                     'subcategorias': Categoria.objects.filter(padre__isnull=False),
                 })
 
-            form.save_m2m()
-
-            # ✅ Guardar valores de atributos
-            for key, value in request.POST.items():
-                if key.startswith('atributo_') and value.strip():
-                    try:
-                        atributo_id = int(key.split('_')[1])
-                        atributo = Atributo.objects.get(id=atributo_id)
-                        ValorAtributo.objects.update_or_create(
-                            producto=producto,
-                            atributo=atributo,
-                            defaults={'valor': value.strip()}
-                        )
-                    except (ValueError, Atributo.DoesNotExist):
-                        continue
-
-            # 🧠 Detectar tipo de código
-            producto.tipo_codigo = detectar_tipo_codigo(producto.codigo_barras)
-            producto.save()
-
-            # 📦 Registrar inventario inicial
-            if cantidad and ubicacion:
-                aplicar_movimiento_inventario(
-                    producto=producto,
-                    cantidad=cantidad,
-                    destino=ubicacion,
-                    empleado=getattr(request.user, "empleado", None),
-                    motivo="nuevo"
-                )
-
             messages.success(request, "Producto registrado correctamente.")
             return redirect('inventario:lista_productos')
         else:
@@ -188,6 +177,49 @@ def nuevo_producto(request):
         'subcategorias': subcategorias,
     })
 
+
+
+
+#Importación masiva de productos desde CSV o XLSX (misma lógica que el comando importar_productos)
+MAX_ERRORES_EN_PANTALLA = 500
+
+@login_required
+def importar_productos(request):
+    if not request.user.is_superuser and not hasattr(request.user, 'empleado'):
+        raise PermissionDenied("Solo empleados o administradores pueden registrar productos.")
+
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarProductosForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            try:
+                resultado = importacion.importar_productos(
+                    importacion.leer_filas(archivo, archivo.name),
+                    empleado=getattr(request.user, "empleado", None),
+                    ubicacion=form.cleaned_data['ubicacion'],
+                    etiqueta=form.cleaned_data['etiqueta'],
+                    simular=form.cleaned_data['simular'],
+                )
+            except (ValidationError, ValueError, BadZipFile) as e:
+                # Archivo ilegible (codificación, XLSX dañado...)
+                messages.error(request, f"No se pudo leer el archivo: {e}")
+            else:
+                if form.cleaned_data['simular']:
+                    messages.info(request, f"{resultado['creados']} de {resultado['filas']} filas son válidas (no se guardó nada).")
+                elif resultado['creados']:
+                    messages.success(request, f"Se importaron {resultado['creados']} de {resultado['filas']} productos.")
+                if resultado['errores']:
+                    messages.error(request, f"{len(resultado['errores'])} filas tienen errores y no se importaron.")
+    else:
+        form = ImportarProductosForm()
+
+    return render(request, 'inventario/importar_productos.html', {
+        'form': form,
+        'resultado': resultado,
+        'errores': resultado['errores'][:MAX_ERRORES_EN_PANTALLA] if resultado else [],
+        'errores_ocultos': max(len(resultado['errores']) - MAX_ERRORES_EN_PANTALLA, 0) if resultado else 0,
+    })
     
     
     
@@ -213,43 +245,11 @@ def verificar_inventario_existente(request):
 #funcion para buscar productos por codigos y rellenar el formulario de productoForm
 @login_required
 def buscar_producto_por_codigo(request):
-    codigo = request.GET.get('codigo')
-    producto = Producto.objects.filter(codigo_barras=codigo).select_related('categoria').first()
-
-    if not producto:
+    # ⚡ Datos del formulario cacheados por código (inventario.cache_productos)
+    datos = cache_productos.datos_producto(request.GET.get('codigo'))
+    if datos is None:
         return JsonResponse({'existe': False})
-
-    # Subcategoría y padre
-    subcategoria = producto.categoria
-    categoria_padre = subcategoria.padre if subcategoria else None
-
-    # Atributos definidos para la subcategoría
-    atributos_definidos = Atributo.objects.filter(categoria=subcategoria) if subcategoria else []
-    atributos_list = []
-    for atributo in atributos_definidos:
-        valor_obj = ValorAtributo.objects.filter(producto=producto, atributo=atributo).first()
-        atributos_list.append({
-            'id': atributo.id,
-            'nombre': atributo.nombre,
-            'valor': valor_obj.valor if valor_obj else ''
-        })
-
-    return JsonResponse({
-        'existe': True,
-        'producto_id': producto.id,
-        'nombre': producto.nombre,
-        'descripcion': producto.descripcion,
-        'precio_menudeo': producto.precio_menudeo,
-        'precio_mayoreo': producto.precio_mayoreo,
-        'precio_docena': producto.precio_docena,
-        'tipo_codigo': producto.tipo_codigo,
-        'dueño_id': producto.dueño.id if producto.dueño else None,
-        'categoria_padre_id': categoria_padre.id if categoria_padre else None,
-        'categoria_padre_nombre': categoria_padre.nombre if categoria_padre else None,
-        'subcategoria_id': subcategoria.id if subcategoria else None,
-        'subcategoria_nombre': subcategoria.nombre if subcategoria else None,
-        'atributos': atributos_list,
-    })
+    return JsonResponse(datos)
 
 
     
@@ -425,10 +425,8 @@ def dashboard_inventario(request):
     ubicacion_id = request.GET.get("ubicacion_id")
     ubicacion_seleccionada = None
 
-    # 2) Base queryset (solo críticos). Ajusta el umbral si quieres
-    bajos_qs = Inventario.objects.filter(cantidad_actual__lt=100)
-
-    # 3) Si hay filtro, aplicar
+    # 2) Si hay filtro, aplicar
+    ubicacion_id_int = None
     if ubicacion_id:
         # Opcional: castear a int para evitar sorpresas de comparación
         try:
@@ -438,20 +436,31 @@ def dashboard_inventario(request):
 
         if ubicacion_id_int:
             ubicacion_seleccionada = get_object_or_404(Ubicacion, id=ubicacion_id_int)
-            bajos_qs = bajos_qs.filter(ubicacion=ubicacion_seleccionada)
 
-    # 4) Menor rotación (esto no depende de ubicación, salvo que quieras filtrarlo también)
-    menos_rotacion = Producto.objects.annotate(
-        movimientos_count=Count('movimientos')
-    ).order_by('movimientos_count')[:10]
+    # 3) Críticos según el punto de reorden de cada existencia (misma consulta que el PDF)
+    bajos = list(reorden.criticos(ubicacion_id_int))
+
+    # 4) Menor rotación: se lee de los contadores precalculados (ventana de 7, 30 o 90 días)
+    try:
+        ventana_rotacion = int(request.GET.get("rotacion", 30))
+    except (TypeError, ValueError):
+        ventana_rotacion = 30
+    if ventana_rotacion not in RotacionProducto.VENTANAS:
+        ventana_rotacion = 30
+    campo = campo_ventana(ventana_rotacion)
+    menos_rotacion = [
+        {"nombre": r.producto.nombre, "movimientos_count": getattr(r, campo)}
+        for r in rotacion.menos_rotacion(ventana_rotacion)
+    ]
 
     context = {
         "productos_total": productos_total,
         "stock_total": stock_total,
         "ubicaciones": ubicaciones,
         "ubicacion_seleccionada": ubicacion_seleccionada,
-        "bajos": bajos_qs,
+        "bajos": bajos,
         "menos_rotacion": menos_rotacion,
+        "ventana_rotacion": ventana_rotacion,
     }
     return render(request, "inventario/dashboard_inventario.html", context)
 
@@ -475,40 +484,35 @@ def exportar_criticos(request):
 
 
 
-#view para ver todos los productos en producto/
-@login_required
-def lista_productos(request):
-    # Base queryset con relaciones optimizadas
-    productos = Producto.objects.select_related(
-        'registrado_por__user',
-        'dueño__user',
-        'categoria',
-        'categoria__padre'
-    ).prefetch_related('inventarios__ubicacion', 'temporada').all()
-
-    # Filtros GET
-    dueño_id = request.GET.get('dueño')
-    registrado_por_id = request.GET.get('usuario')
-    categoria_padre_id = request.GET.get('categoria_padre')
-    subcategoria_id = request.GET.get('subcategoria')
-    precio_tipo = request.GET.get('precio_tipo')
-    precio_min = request.GET.get('precio_min')
-    precio_max = request.GET.get('precio_max')
+#Filtros GET del listado de productos (se aplican sobre Inventario → producto__)
+def filtrar_inventario_kanban(inventarios, params):
+    dueño_id = params.get('dueño')
+    registrado_por_id = params.get('usuario')
+    categoria_padre_id = params.get('categoria_padre')
+    subcategoria_id = params.get('subcategoria')
+    precio_tipo = params.get('precio_tipo')
+    precio_min = params.get('precio_min')
+    precio_max = params.get('precio_max')
 
     if dueño_id:
-        productos = productos.filter(dueño__id=dueño_id)
+        inventarios = inventarios.filter(producto__dueño__id=dueño_id)
     if registrado_por_id:
-        productos = productos.filter(registrado_por__id=registrado_por_id)
+        inventarios = inventarios.filter(producto__registrado_por__id=registrado_por_id)
     if subcategoria_id:
-        productos = productos.filter(categoria__id=subcategoria_id)
+        inventarios = inventarios.filter(producto__categoria__id=subcategoria_id)
     if categoria_padre_id:
-        productos = productos.filter(categoria__padre__id=categoria_padre_id)
+        inventarios = inventarios.filter(producto__categoria__padre__id=categoria_padre_id)
     if precio_tipo in ['menudeo', 'mayoreo', 'docena']:
         if precio_min:
-            productos = productos.filter(**{f'precio_{precio_tipo}__gte': precio_min})
+            inventarios = inventarios.filter(**{f'producto__precio_{precio_tipo}__gte': precio_min})
         if precio_max:
-            productos = productos.filter(**{f'precio_{precio_tipo}__lte': precio_max})
+            inventarios = inventarios.filter(**{f'producto__precio_{precio_tipo}__lte': precio_max})
+    return inventarios
+
 
+#view para ver todos los productos en producto/ (las columnas se llenan con api_kanban)
+@login_required
+def lista_productos(request):
     # Datos para filtros
     empleados = Empleado.objects.select_related('user').all()
     dueños = empleados.filter(rol='dueño')
@@ -522,7 +526,6 @@ def lista_productos(request):
     moderna = Ubicacion.objects.get(nombre="Moderna")
 
     return render(request, 'inventario/productos.html', {
-        'productos': productos,
         'empleados': empleados,
         'dueños': dueños,
         'registradores': registradores,
@@ -533,41 +536,162 @@ def lista_productos(request):
         'ubicacion_moderna': moderna,
     })
 
+
+#API paginada por ubicación para el Kanban (keyset sobre Inventario.id)
+@login_required
+def api_kanban(request, ubicacion_id):
+    try:
+        limite = min(max(int(request.GET.get('limite', 30)), 1), 100)
+    except (TypeError, ValueError):
+        limite = 30
+    try:
+        despues = int(request.GET.get('despues', 0))
+    except (TypeError, ValueError):
+        despues = 0
+
+    inventarios = Inventario.objects.filter(
+        ubicacion_id=ubicacion_id,
+        cantidad_actual__gt=0,
+        id__gt=despues,
+    )
+    inventarios = filtrar_inventario_kanban(inventarios, request.GET)
+    if request.GET.get('q'):
+        inventarios = busqueda.filtrar_por_texto(inventarios, request.GET['q'], campo='producto_id')
+    # 📇 Datos de la tarjeta desde el modelo de lectura, en el mismo SELECT (inventario.lectura)
+    pagina = list(
+        inventarios
+        .values('id', 'producto_id', 'ubicacion_id', 'cantidad_actual', datos=F('producto__lectura__datos'))
+        .order_by('id')[:limite + 1]
+    )
+
+    hay_mas = len(pagina) > limite
+    pagina = pagina[:limite]
+
+    # Productos que aún no tienen fila de lectura (p. ej. antes de reconstruir_lectura)
+    faltantes = [inv['producto_id'] for inv in pagina if inv['datos'] is None]
+    if faltantes:
+        armados = lectura.datos_de(faltantes)
+        for inv in pagina:
+            if inv['datos'] is None:
+                inv['datos'] = armados[inv['producto_id']]
+
+    html = "".join(
+        render_to_string('inventario/partials/producto_card.html', {
+            'producto': inv['datos'],
+            'inv': inv,
+            'actualizado': request.GET.get('updated'),
+            'cantidad_agregada': request.GET.get('cantidad'),
+        }, request=request)
+        for inv in pagina
+    )
+
+    return JsonResponse({
+        'items': [
+            {
+                'inventario_id': inv['id'],
+                'producto_id': inv['producto_id'],
+                'nombre': inv['datos']['nombre'],
+                'cantidad': inv['cantidad_actual'],
+            }
+            for inv in pagina
+        ],
+        'html': html,
+        'siguiente': pagina[-1]['id'] if hay_mas else None,
+    })
+
+
+#Buscador de productos del lado del servidor (nombre, descripción, código, categoría, temporada)
+@login_required
+def api_buscar_productos(request):
+    consulta = (request.GET.get('q') or '').strip()
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except (TypeError, ValueError):
+        pagina = 1
+
+    productos, hay_mas = busqueda.buscar_productos(consulta, pagina=pagina)
+
+    return JsonResponse({
+        'q': consulta,
+        'pagina': pagina,
+        'hay_mas': hay_mas,
+        'resultados': [
+            {
+                'id': p.id,
+                'nombre': p.nombre,
+                'descripcion': p.descripcion,
+                'codigo_barras': p.codigo_barras,
+                'categoria': p.categoria.nombre if p.categoria else None,
+                'categoria_padre': p.categoria.padre.nombre if p.categoria and p.categoria.padre else None,
+                'temporadas': [t.nombre for t in p.temporada.all()],
+            }
+            for p in productos
+        ],
+    })
+
     
 
 
 
+#Misma URL con un parámetro GET cambiado (o quitado si valor es None)
+def url_con_parametro(request, nombre, valor):
+    parametros = request.GET.copy()
+    parametros.pop(nombre, None)
+    if valor is not None:
+        parametros[nombre] = valor
+    return f"{request.path}?{parametros.urlencode()}"
+
+
 @login_required
 def reportes(request):
     filtros = reports.parse_filtros(request)
     tipo_reporte = filtros.get('tipo', '')
 
-    inventario, movimientos, resumen = [], [], []
+    inventario, movimientos, resumen, reabastecimiento = [], [], [], []
+    siguiente_pagina = None
 
+    # ⚡ Resultados cacheados por filtros; cualquier movimiento de inventario los invalida
     if tipo_reporte == 'general':
-        inventario = reports.get_datos_reporte(
+        inventario = cache_reportes.obtener('inventario', filtros, lambda: reports.get_datos_reporte(
             tipo_reporte,
             categoria_id=filtros.get('categoria'),
             subcategoria_id=filtros.get('subcategoria'),
             temporada_id=filtros.get('temporada'),
             ubicacion_id=filtros.get('ubicacion'),
             dueño_id=filtros.get('dueño')
-        )
+        ))
 
     elif tipo_reporte == 'movimientos':
-        movimientos = reports.get_datos_reporte(
-            tipo_reporte,
+        # 📄 Una página a la vez (paginación por fecha/id), nunca todo el historial
+        despues = request.GET.get('despues') or None
+        pagina = cache_reportes.obtener('movimientos', {**filtros, 'despues': despues}, lambda: reports.pagina_movimientos(
+            tipo=filtros.get('movimiento'),
             categoria_id=filtros.get('categoria'),
             subcategoria_id=filtros.get('subcategoria'),
             temporada_id=filtros.get('temporada'),
-            movimiento_tipo=filtros.get('movimiento')
-        )
-        resumen = reports.resumen_movimientos(
+            dueño_id=filtros.get('dueño'),
+            desde=filtros.get('desde'),
+            hasta=filtros.get('hasta'),
+            despues=despues
+        ))
+        movimientos, siguiente_pagina = pagina['filas'], pagina['siguiente']
+        resumen = cache_reportes.obtener('resumen', filtros, lambda: reports.resumen_movimientos(
             filtros.get('categoria'),
             filtros.get('subcategoria'),
             filtros.get('temporada'),
-            filtros.get('dueño')
-        )
+            filtros.get('dueño'),
+            desde=filtros.get('desde'),
+            hasta=filtros.get('hasta')
+        ))
+
+    elif tipo_reporte == 'reabastecimiento':
+        reabastecimiento = cache_reportes.obtener('reabastecimiento', filtros, lambda: reports.sugerencias_reabastecimiento(
+            filtros.get('categoria'),
+            filtros.get('subcategoria'),
+            filtros.get('temporada'),
+            filtros.get('dueño'),
+            pronostico=filtros.get('pronostico')
+        ))
 
     filtros_nombres = reports.nombres_filtros(filtros)
     contexto = {
@@ -578,6 +702,9 @@ def reportes(request):
         'filtro_subcategoria': filtros.get('subcategoria'),
         'filtro_temporada': filtros.get('temporada'),
         'filtro_dueño': filtros.get('dueño'),   # ✅ con acento
+        'filtro_desde': filtros.get('desde'),
+        'filtro_hasta': filtros.get('hasta'),
+        'filtro_pronostico': filtros.get('pronostico'),
         'ubicacion_nombre': filtros_nombres.get("ubicacion"),
         'categoria_nombre': filtros_nombres.get("categoria"),
         'subcategoria_nombre': filtros_nombres.get("subcategoria"),
@@ -592,17 +719,27 @@ def reportes(request):
         'dueños': reports.Empleado.objects.filter(rol='dueño'),  # revisa si tu modelo guarda con acento
         'inventario': inventario,
         'movimientos': movimientos,
+        'es_primera_pagina': not request.GET.get('despues'),
+        'url_siguiente_pagina': url_con_parametro(request, 'despues', siguiente_pagina) if siguiente_pagina else None,
+        'url_primera_pagina': url_con_parametro(request, 'despues', None),
         'resumen': resumen,
-        'total_global': reports.total_global(
+        'reabastecimiento': reabastecimiento,
+        'total_global': cache_reportes.obtener('total_global', filtros, lambda: reports.total_global(
             filtros.get('categoria'),
             filtros.get('subcategoria'),
             filtros.get('temporada'),
             filtros.get('dueño')
-        ),
+        )),
     }
     return render(request, 'inventario/reportes.html', contexto)
 
 
+#Aciertos/fallos de la caché de reportes
+@login_required
+def api_cache_reportes(request):
+    return JsonResponse(cache_reportes.estadisticas())
+
+
 
 
 
@@ -653,13 +790,117 @@ def reporte_pdf(request):
     )
 
 
+#Reportes en segundo plano: se encola el trabajo y el navegador consulta su estado hasta poder descargarlo
+def datos_reporte_job(trabajo):
+    datos = {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'error': trabajo.error,
+        'url_estado': reverse('inventario:estado_reporte', args=[trabajo.id]),
+        'url_descarga': None,
+    }
+    if trabajo.estado == 'terminado':
+        datos['url_descarga'] = reverse('inventario:descargar_reporte', args=[trabajo.id])
+    return datos
+
+
+@login_required
+def encolar_reporte(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método inválido'}, status=405)
+
+    # Mismos parámetros que reporte_pdf (en la URL); 'criticos' equivale a exportar_criticos
+    filtros = reports.parse_filtros(request)
+    if request.GET.get('tipo') == 'criticos':
+        tipo, filtros = 'criticos', {'ubicacion': filtros.get('ubicacion')}
+    else:
+        tipo = filtros['tipo']
+
+    trabajo, creado = trabajos.encolar_reporte(tipo, filtros, request.user)
+    return JsonResponse({**datos_reporte_job(trabajo), 'nuevo': creado}, status=201 if creado else 200)
+
+
+@login_required
+def estado_reporte(request, trabajo_id):
+    trabajo = get_object_or_404(ReporteJob, id=trabajo_id)
+    return JsonResponse(datos_reporte_job(trabajo))
+
+
+@login_required
+def descargar_reporte(request, trabajo_id):
+    trabajo = get_object_or_404(ReporteJob, id=trabajo_id, estado='terminado')
+    if not trabajo.archivo:
+        raise Http404("El archivo del reporte ya no existe.")
+    return FileResponse(
+        trabajo.archivo.open('rb'),
+        as_attachment=True,
+        filename=f"reporte_{trabajo.tipo}.pdf",
+        content_type='application/pdf',
+    )
+
+
+#Exportación CSV/XLSX con los mismos filtros que reporte_pdf
+@login_required
+def reporte_exportar(request, formato):
+    filtros = reports.parse_filtros(request)
+    if formato == 'csv':
+        return reports.exportar_csv(filtros['tipo'], filtros)
+    if formato == 'xlsx':
+        return reports.exportar_xlsx(filtros['tipo'], filtros)
+    raise Http404("Formato no soportado")
+
+
+#Hoja PDF con las etiquetas de muchos productos: productos=<id> o <id>:<copias>, o toda una temporada
+MAX_COPIAS = 500        # por producto
+MAX_ETIQUETAS = 5000    # por hoja; el PDF se arma dentro de la petición
+
+@login_required
+def etiquetas_pdf(request):
+    datos = request.POST if request.method == 'POST' else request.GET
+    tamaño = datos.get('tamaño') or 'chica'
+    if tamaño not in {e['tipo'] for e in ETIQUETAS}:
+        tamaño = 'chica'
+
+    def to_int(value, default):
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            return default
+
+    copias_default = to_int(datos.get('copias'), 1)
+    copias = {}
+    for valor in datos.getlist('productos'):
+        for parte in valor.split(','):
+            producto_id, _, n = parte.strip().partition(':')
+            if producto_id.isdigit():
+                copias[int(producto_id)] = to_int(datos.get(f'copias_{producto_id}') or n, copias_default)
+    if max([copias_default, *copias.values()]) > MAX_COPIAS:
+        return HttpResponse(f"Se permiten hasta {MAX_COPIAS} copias por producto.", status=400)
+
+    productos = Producto.objects.filter(codigo_barras__isnull=False).only(
+        'id', 'nombre', 'codigo_barras', 'tipo_codigo', 'precio_menudeo'
+    ).order_by('nombre')
+    temporada_id = datos.get('temporada')
+    if temporada_id:
+        if not temporada_id.isdigit():
+            return HttpResponse("Temporada no válida.", status=400)
+        productos = productos.filter(temporada__id=temporada_id)
+    elif copias:
+        productos = productos.filter(id__in=copias)
+    else:
+        return HttpResponse("Indica los productos o la temporada a etiquetar.", status=400)
+
+    items = [(p, copias.get(p.id, copias_default)) for p in productos]
+    if sum(n for _, n in items) > MAX_ETIQUETAS:
+        return HttpResponse(f"Se permiten hasta {MAX_ETIQUETAS} etiquetas por hoja; divide la impresión.", status=400)
+    return reports.generar_etiquetas_pdf(items, tamaño)
+
+
 @login_required
 def seleccionar_etiqueta_temp(request):
-    etiquetas = [
-        {"nombre": "Pequeña", "tamaño": "50x20 mm", "tipo": "chica", "descripcion": "Ideal para empaques pequeños"},
-        {"nombre": "Mediana", "tamaño": "100x30 mm", "tipo": "mediana", "descripcion": "Para cajas medianas o productos estándar"},
-        {"nombre": "Grande", "tamaño": "135x32 mm", "tipo": "grande", "descripcion": "Para empaques grandes o logísticos"},
-    ]
+    etiquetas = ETIQUETAS
 
     if request.method == "POST":
         tamaño = request.POST.get("tipo_codigo")
@@ -671,6 +912,10 @@ def seleccionar_etiqueta_temp(request):
             messages.error(request, "No hay datos de producto pendientes.")
             return redirect("inventario:nuevo_producto")
 
+        if tamaño not in {e["tipo"] for e in etiquetas}:
+            messages.error(request, "Selecciona un tamaño de etiqueta válido.")
+            return redirect("inventario:seleccionar_etiqueta_temp")
+
         # 🆕 Crear producto directamente con los datos de sesión
         producto = Producto(
             nombre=pendiente.get("nombre"),
@@ -701,42 +946,30 @@ def seleccionar_etiqueta_temp(request):
         if has_file and request.FILES:
             producto.foto_url = request.FILES.get("imagen")
 
-        producto.save()
-
-        # 🔑 Generar código de barras
-        codigo, clase_barcode, tipo_str = generar_codigo(producto.id or 0, tamaño)
+        # 🔑 Código de barras asignado antes de guardar (un solo INSERT)
+        codigo, clase_barcode, tipo_str = generar_codigo(tamaño)
         producto.codigo_barras = codigo
         producto.tipo_codigo = tipo_str
-        producto.save()
-
-        # ✅ Guardar valores de atributos
-        for key, value in pendiente.get("atributos", {}).items():
-            if key.startswith("atributo_") and value.strip():
-                try:
-                    atributo_id = int(key.split("_")[1])
-                    atributo = Atributo.objects.get(id=atributo_id)
-                    ValorAtributo.objects.update_or_create(
-                        producto=producto,
-                        atributo=atributo,
-                        defaults={"valor": value.strip()}
-                    )
-                except (ValueError, Atributo.DoesNotExist):
-                    continue
 
         # 📦 Inventario inicial
-        if inventario_pendiente:
-            cantidad = inventario_pendiente.get("cantidad")
-            ubicacion_id = inventario_pendiente.get("ubicacion_id")
-            if cantidad and ubicacion_id:
-                ubicacion = Ubicacion.objects.filter(id=ubicacion_id).first()
-                if ubicacion:
-                    aplicar_movimiento_inventario(
-                        producto=producto,
-                        cantidad=int(cantidad),
-                        destino=ubicacion,
-                        empleado=getattr(request.user, "empleado", None),
-                        motivo="nuevo"
-                    )
+        cantidad, ubicacion = 0, None
+        if inventario_pendiente and inventario_pendiente.get("ubicacion_id"):
+            cantidad = int(inventario_pendiente.get("cantidad") or 0)
+            ubicacion = Ubicacion.objects.filter(id=inventario_pendiente["ubicacion_id"]).first()
+
+        # 💾 Producto, atributos, temporadas e inventario inicial en una transacción
+        try:
+            crear_producto(
+                producto,
+                valores_atributos=atributos_enviados(pendiente.get("atributos", {})),
+                temporadas=pendiente.get("temporada") or None,
+                cantidad=cantidad,
+                ubicacion=ubicacion,
+                empleado=getattr(request.user, "empleado", None),
+            )
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("inventario:nuevo_producto")
 
         messages.success(request, "Producto registrado y etiqueta asignada correctamente.")
         return redirect("inventario:lista_productos")
@@ -745,13 +978,48 @@ def seleccionar_etiqueta_temp(request):
 
     
     
+#Respuesta condicional (ETag) y cabeceras de caché para imágenes de códigos
+def respuesta_codigo(request, producto, formato, construir):
+    # El ETag es la clave de la caché (código, tipo, formato): un 304 no lee ni genera la imagen
+    clave = cache_codigos.clave_imagen(producto.codigo_barras, producto.tipo_codigo, formato)
+    etag = f'"{clave}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        contenido, _ = cache_codigos.obtener_imagen(producto.codigo_barras, producto.tipo_codigo, formato)
+        response = construir(contenido)
+    response['ETag'] = etag
+    # Con ?v=<tipo>-<código> actuales la URL cambia junto con la imagen → se puede cachear para siempre
+    if request.GET.get('v') == cache_codigos.version(producto.codigo_barras, producto.tipo_codigo):
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 def codigo_base64(request, producto_id):
     producto = get_object_or_404(Producto, id=producto_id)
 
     if producto.codigo_barras and producto.tipo_codigo:
-        # Selecciona la clase correcta
-        clase = EAN13 if producto.tipo_codigo == 'ean13' else Code128
-        imagen_base64 = generar_base64(producto.codigo_barras, clase)
-        return JsonResponse({'imagen': imagen_base64})
+        # La imagen sale de la caché (memoria → disco → render)
+        return respuesta_codigo(
+            request, producto, 'png',
+            lambda png: JsonResponse({'imagen': base64.b64encode(png).decode('utf-8')}),
+        )
     else:
-        return JsonResponse({'imagen': None})
\ No newline at end of file
+        return JsonResponse({'imagen': None})
+
+
+#Imagen del código en binario (image/png o image/svg+xml), cacheable por navegador y proxy
+def codigo_imagen(request, producto_id, formato):
+    if formato not in cache_codigos.FORMATOS:
+        raise Http404("Formato no soportado.")
+    producto = get_object_or_404(Producto, id=producto_id)
+    if not (producto.codigo_barras and producto.tipo_codigo):
+        raise Http404("El producto no tiene código de barras.")
+
+    content_type = cache_codigos.FORMATOS[formato][0]
+    return respuesta_codigo(
+        request, producto, formato,
+        lambda contenido: HttpResponse(contenido, content_type=content_type),
+    )
\ No newline at end of file
@@ -91,6 +91,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # WAL: los reportes largos (procesar_reportes) leen sin bloquear las escrituras de la tienda
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL;',
+            'timeout': 20,
+        },
+    }
+}
+
+
+# Caché compartida entre procesos (reportes y escáner). LocMemCache es por proceso: con varios
+# workers de gunicorn la invalidación que hace uno no llega a los demás. Por defecto va en la base
+# de datos (la tabla la crea la migración inventario 0024_tabla_cache); para Redis, en el .env:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='cache_inventario'),
     }
 }
 
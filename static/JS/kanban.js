@@ -0,0 +1,79 @@
+// ============================
+// Kanban paginado: cada columna pide sus tarjetas por páginas al hacer scroll
+// ============================
+const columnasKanban = [];
+
+document.querySelectorAll('.kanban-lista').forEach(lista => {
+  const sentinela = lista.nextElementSibling;
+  let siguiente = null;
+  let cargando = false;
+  let terminado = false;
+  let busqueda = '';
+  let version = 0;
+
+  async function cargarPagina() {
+    if (cargando || terminado) return;
+    cargando = true;
+    const miVersion = version;
+
+    const url = new URL(lista.dataset.url, window.location.origin);
+    if (siguiente) url.searchParams.set('despues', siguiente);
+    if (busqueda) url.searchParams.set('q', busqueda);
+
+    try {
+      const res = await fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+      if (!res.ok) throw new Error('No se pudo cargar la columna');
+      const data = await res.json();
+      if (miVersion !== version) return;  // la búsqueda cambió mientras se cargaba
+
+      const plantilla = document.createElement('template');
+      plantilla.innerHTML = data.html;
+      plantilla.content.querySelectorAll('.producto-card').forEach(card => {
+        if (window.activarArrastre) window.activarArrastre(card);
+      });
+      lista.appendChild(plantilla.content);
+
+      siguiente = data.siguiente;
+      if (!siguiente) {
+        terminado = true;
+        sentinela.textContent = lista.children.length ? '' : lista.dataset.vacio;
+        observador.disconnect();
+      }
+    } catch (err) {
+      console.error(err);
+      sentinela.textContent = 'Error al cargar productos';
+      terminado = true;
+    } finally {
+      if (miVersion === version) cargando = false;
+    }
+    if (miVersion !== version) return;
+
+    // Si la página no llenó la columna, seguir cargando
+    if (!terminado && sentinela.getBoundingClientRect().top < window.innerHeight) {
+      cargarPagina();
+    }
+  }
+
+  const observador = new IntersectionObserver(entradas => {
+    if (entradas.some(e => e.isIntersecting)) cargarPagina();
+  }, { rootMargin: '400px' });
+
+  observador.observe(sentinela);
+
+  // Vaciar la columna y volver a cargar desde la primera página
+  columnasKanban.push(function (q) {
+    busqueda = q;
+    version += 1;
+    siguiente = null;
+    terminado = false;
+    cargando = false;
+    lista.innerHTML = '';
+    sentinela.textContent = 'Cargando…';
+    observador.observe(sentinela);
+    cargarPagina();
+  });
+});
+
+window.recargarKanban = function (q) {
+  columnasKanban.forEach(recargar => recargar(q));
+};
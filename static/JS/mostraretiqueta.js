@@ -14,6 +14,15 @@ document.addEventListener("DOMContentLoaded", function () {
       return;
     }
 
+    // Imagen binaria directa: la cachean el navegador y el proxy
+    const imgUrl = button.getAttribute("data-img");
+    if (imgUrl) {
+      img.onerror = () => { img.alt = "Error al cargar la etiqueta"; };
+      img.src = imgUrl;
+      contenedor.style.display = "block";
+      return;
+    }
+
     fetch(url)
       .then(res => {
         if (!res.ok) throw new Error("No se pudo cargar la etiqueta");
@@ -76,36 +85,17 @@ document.addEventListener("DOMContentLoaded", function () {
   };
 
   // ============================
-  // Buscador con animación
+  // Buscador: filtra en el servidor y recarga las columnas del Kanban
   // ============================
   const buscador = document.getElementById("buscador");
   if (buscador) {
+    let espera = null;
     buscador.addEventListener("input", function () {
-      let filtro = this.value.toLowerCase();
-      let cards = document.querySelectorAll(".producto-card");
-
-      cards.forEach(card => {
-        let nombre = card.getAttribute("data-nombre").toLowerCase();
-        let descripcion = card.getAttribute("data-descripcion").toLowerCase();
-        let categoria = card.getAttribute("data-categoria").toLowerCase();
-        let temporada = card.getAttribute("data-temporada").toLowerCase();
-
-        if (
-          nombre.includes(filtro) ||
-          descripcion.includes(filtro) ||
-          categoria.includes(filtro) ||
-          temporada.includes(filtro)
-        ) {
-          card.style.display = "block";
-          card.classList.add("animate-fadeIn");
-          card.classList.remove("animate-fadeOut");
-        } else {
-          card.classList.add("animate-fadeOut");
-          setTimeout(() => {
-            card.style.display = "none";
-          }, 300); // espera la animación
-        }
-      });
+      clearTimeout(espera);
+      const filtro = this.value.trim();
+      espera = setTimeout(() => {
+        if (window.recargarKanban) window.recargarKanban(filtro);
+      }, 300);
     });
   }
 });
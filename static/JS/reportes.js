@@ -84,3 +84,56 @@ form.addEventListener('submit', () => {
 // Botón de PDF: ya está en el template como <a href="...">
 // No necesita JS extra porque abre en otra pestaña con los filtros incluidos.
 // ===============================
+
+// ⏳ Reporte en segundo plano: se encola y se consulta el estado hasta que el PDF está listo
+const btnSegundoPlano = document.getElementById('btn-reporte-segundo-plano');
+const estadoReporte = document.getElementById('estado-reporte');
+
+async function consultarReporte(urlEstado) {
+  try {
+    const resp = await fetch(urlEstado, { headers: { "X-Requested-With": "XMLHttpRequest" } });
+    if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+    const trabajo = await resp.json();
+
+    if (trabajo.estado === 'terminado') {
+      estadoReporte.innerHTML = `✅ Reporte listo: <a href="${trabajo.url_descarga}" class="text-red-600 underline">descargar PDF</a>`;
+      btnSegundoPlano.disabled = false;
+    } else if (trabajo.estado === 'error') {
+      estadoReporte.textContent = `❌ Error al generar el reporte: ${trabajo.error}`;
+      btnSegundoPlano.disabled = false;
+    } else {
+      estadoReporte.textContent = trabajo.estado === 'pendiente'
+        ? '🕒 En cola…'
+        : `⚙️ Generando… ${trabajo.progreso}%`;
+      setTimeout(() => consultarReporte(urlEstado), 2000);
+    }
+  } catch (err) {
+    console.error('Error consultando el reporte:', err);
+    estadoReporte.textContent = 'No se pudo consultar el estado del reporte.';
+    btnSegundoPlano.disabled = false;
+  }
+}
+
+if (btnSegundoPlano) {
+  btnSegundoPlano.addEventListener('click', async () => {
+    // Mismos filtros que el enlace de descarga directa
+    const filtros = new URL(document.getElementById('link-reporte-pdf').href).search;
+    btnSegundoPlano.disabled = true;
+    estadoReporte.classList.remove('hidden');
+    estadoReporte.textContent = '🕒 En cola…';
+
+    try {
+      const resp = await fetch(btnSegundoPlano.dataset.url + filtros, {
+        method: 'POST',
+        headers: { "X-CSRFToken": btnSegundoPlano.dataset.csrf, "X-Requested-With": "XMLHttpRequest" }
+      });
+      if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+      const trabajo = await resp.json();
+      consultarReporte(trabajo.url_estado);
+    } catch (err) {
+      console.error('Error encolando el reporte:', err);
+      estadoReporte.textContent = 'No se pudo encolar el reporte.';
+      btnSegundoPlano.disabled = false;
+    }
+  });
+}
@@ -1,5 +1,6 @@
 // --- Drag & Drop con animaciones reales ---
-document.querySelectorAll('.producto-card').forEach(card => {
+// Se expone para las tarjetas que se cargan después (kanban.js)
+window.activarArrastre = function (card) {
   card.setAttribute('draggable', 'true');
 
   card.addEventListener('dragstart', e => {
@@ -13,7 +14,9 @@ document.querySelectorAll('.producto-card').forEach(card => {
   card.addEventListener('dragend', () => {
     card.classList.remove('ring-4', 'ring-blue-400', 'scale-105', 'shadow-xl');
   });
-});
+};
+
+document.querySelectorAll('.producto-card').forEach(card => activarArrastre(card));
 
 document.querySelectorAll('.dropzone').forEach(zone => {
   zone.addEventListener('dragover', e => {